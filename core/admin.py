@@ -1,8 +1,25 @@
 # core/admin.py
 
 from django.contrib import admin, messages
-from .models import LoteCargaDatos, EstudiantePeriodo
-from .services import procesar_y_guardar_datos_de_periodo
+from django.http import JsonResponse
+from django.urls import path
+from django.utils.html import format_html
+from .models import LoteCargaDatos, EstudiantePeriodo, PeriodoResumen, ResultadoBacktest
+from .jobs import encolar_lote
+from . import categorias
+
+
+class CategoriaListFilter(admin.AllValuesFieldListFilter):
+    """
+    Filtro de un campo categórico con las opciones de la tabla de categorías (en memoria), en
+    lugar de un SELECT DISTINCT sobre todos los estudiantes. Los conteos por opción (facetas)
+    comparan códigos enteros.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.lookup_choices = [*sorted(categorias.valores(field.name).values()), None]
+
 
 @admin.register(EstudiantePeriodo)
 class EstudiantePeriodoAdmin(admin.ModelAdmin):
@@ -12,65 +29,120 @@ class EstudiantePeriodoAdmin(admin.ModelAdmin):
     """
     list_display = ('id_estudiante', 'periodo', 'promedio_semestral', 'ultima_prob_riesgo', 'est_alum')
     search_fields = ('id_estudiante', 'periodo')
-    list_filter = ('periodo', 'discapacidad', 'programa', 'est_alum')
+    list_filter = (
+        'periodo',
+        ('discapacidad', CategoriaListFilter),
+        ('programa', CategoriaListFilter),
+        ('est_alum', CategoriaListFilter),
+    )
     readonly_fields = ('id_estudiante', 'periodo') # Campos que no deberían ser editados manualmente
 
+@admin.register(PeriodoResumen)
+class PeriodoResumenAdmin(admin.ModelAdmin):
+    """
+    Resúmenes materializados del dashboard. Solo lectura: se recalculan al procesar cada lote.
+    """
+    list_display = ('periodo', 'total_estudiantes', 'riesgo_alto_count', 'umbral', 'fecha_calculo')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ResultadoBacktest)
+class ResultadoBacktestAdmin(admin.ModelAdmin):
+    """
+    Métricas del backtest por periodo y programa. Solo lectura: las genera `python manage.py backtest`.
+    """
+    list_display = ('periodo', 'periodo_siguiente', 'programa', 'total_estudiantes', 'desertores', 'f1', 'roc_auc')
+    list_filter = ('periodo',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(LoteCargaDatos)
 class LoteCargaDatosAdmin(admin.ModelAdmin):
     """
     Configuración del panel de administrador para el modelo LoteCargaDatos.
     Gestiona la carga de nuevos reportes y permite el reprocesamiento de lotes existentes.
+    El procesamiento se encola y lo ejecuta el worker `python manage.py procesar_lotes`.
     """
-    list_display = ('periodo', 'fecha_carga', 'procesado')
-    readonly_fields = ('procesado',)
+    list_display = ('periodo', 'fecha_carga', 'estado', 'barra_progreso', 'filas_procesadas', 'resumen_cambios', 'duracion', 'procesado')
+    list_filter = ('estado',)
+    readonly_fields = (
+        'procesado', 'estado', 'etapa', 'progreso', 'filas_procesadas',
+        'fecha_inicio', 'tiempo_transcurrido', 'mensaje_error', 'cambios',
+    )
+    exclude = ('reprocesar',)
     actions = ['reprocesar_lotes_seleccionados'] # Registra la nueva acción
 
+    @admin.display(description="Progreso")
+    def barra_progreso(self, obj):
+        return format_html(
+            '<div class="progreso-lote" data-lote="{}" data-activo="{}">'
+            '<progress max="100" value="{}"></progress> <span>{}% &middot; {}</span></div>',
+            obj.pk, 'si' if obj.en_ejecucion else 'no', obj.progreso, obj.progreso, obj.etapa or '-',
+        )
+
+    @admin.display(description="Cambios")
+    def resumen_cambios(self, obj):
+        if not obj.cambios:
+            return '-'
+        return (
+            f"+{obj.cambios.get('nuevos', 0)} ~{obj.cambios.get('modificados', 0)} "
+            f"-{obj.cambios.get('eliminados', 0)} ={obj.cambios.get('sin_cambios', 0)}"
+        )
+
+    @admin.display(description="Duración")
+    def duracion(self, obj):
+        if obj.tiempo_transcurrido is None:
+            return '-'
+        return f"{obj.tiempo_transcurrido:.1f} s"
+
+    def get_urls(self):
+        urls = [
+            path('progreso/', self.admin_site.admin_view(self.progreso_view), name='core_lotecargadatos_progreso'),
+        ]
+        return urls + super().get_urls()
+
+    def progreso_view(self, request):
+        """Estado actual de los lotes pedidos (?ids=1,2,3); lo consulta el listado para mostrar el avance en vivo."""
+        ids = [i for i in request.GET.get('ids', '').split(',') if i.isdigit()]
+        lotes = LoteCargaDatos.objects.filter(pk__in=ids).values(
+            'pk', 'estado', 'etapa', 'progreso', 'filas_procesadas', 'tiempo_transcurrido', 'mensaje_error',
+        )
+        return JsonResponse({'lotes': list(lotes)})
+
     @admin.action(description="Reprocesar lotes de datos seleccionados")
     def reprocesar_lotes_seleccionados(self, request, queryset):
         """
-        Acción personalizada que borra los datos procesados antiguos y vuelve a ejecutar
-        el servicio de procesamiento sobre los archivos del lote seleccionado.
+        Acción personalizada que encola los lotes seleccionados para que el worker vuelva a
+        ejecutar el servicio de procesamiento, aplicando solo las diferencias con lo guardado.
         """
-        lotes_procesados_con_exito = 0
+        lotes_encolados = 0
         for lote in queryset:
-            print(f"Iniciando reprocesamiento para el periodo {lote.periodo}...")
-            
-            # Paso 1: Limpiar los datos viejos de este periodo para evitar duplicados
-            registros_borrados, _ = EstudiantePeriodo.objects.filter(periodo=lote.periodo).delete()
-            print(f"Se eliminaron {registros_borrados} registros antiguos del periodo {lote.periodo}.")
-
-            # Paso 2: Preparar y ejecutar el servicio de procesamiento
-            archivos_cargados = {
-                'caracterizacion': lote.reporte_caracterizacion.path,
-                'notas': lote.reporte_notas.path,
-                'pagos': lote.reporte_pagos.path,
-                'discapacidad': lote.reporte_discapacidad.path,
-            }
-            
-            exito = procesar_y_guardar_datos_de_periodo(archivos_cargados, lote.periodo)
-
-            # Paso 3: Actualizar el estado del lote y notificar al usuario
-            if exito:
-                lote.procesado = True
-                lote.save()
-                lotes_procesados_con_exito += 1
-            else:
-                self.message_user(
-                    request,
-                    f"Ocurrió un error al reprocesar el lote para el periodo {lote.periodo}. Revisa los logs del servidor.",
-                    messages.ERROR
-                )
-        
-        if lotes_procesados_con_exito > 0:
+            if lote.en_ejecucion:
+                self.message_user(request, f"El lote del periodo {lote.periodo} ya está en cola o en proceso.", messages.WARNING)
+                continue
+            encolar_lote(lote, reprocesar=True)
+            lotes_encolados += 1
+
+        if lotes_encolados > 0:
             self.message_user(
                 request,
-                f"{lotes_procesados_con_exito} lote(s) de datos fueron reprocesados exitosamente.",
+                f"{lotes_encolados} lote(s) de datos fueron encolados para reprocesamiento.",
                 messages.SUCCESS
             )
 
     def save_model(self, request, obj, form, change):
         """
-        Sobrescribe el método de guardado para ejecutar el procesamiento de datos
+        Sobrescribe el método de guardado para encolar el procesamiento de datos
         únicamente la primera vez que se crea un lote.
         """
         # El guardado inicial del objeto ocurre primero para que los archivos estén disponibles
@@ -78,19 +150,5 @@ class LoteCargaDatosAdmin(admin.ModelAdmin):
         
         # 'change' es Falso cuando se está creando un nuevo objeto
         if not change:
-            archivos_cargados = {
-                'caracterizacion': obj.reporte_caracterizacion.path,
-                'notas': obj.reporte_notas.path,
-                'pagos': obj.reporte_pagos.path,
-                'discapacidad': obj.reporte_discapacidad.path,
-            }
-            
-            print("Procesando lote por primera vez...")
-            exito = procesar_y_guardar_datos_de_periodo(archivos_cargados, obj.periodo)
-            
-            if exito:
-                obj.procesado = True
-                obj.save()
-                messages.success(request, f"Archivos del periodo {obj.periodo} procesados y guardados exitosamente.")
-            else:
-                messages.error(request, "Hubo un error al procesar los archivos. Revisa los logs del servidor.")
\ No newline at end of file
+            encolar_lote(obj)
+            messages.info(request, f"Los archivos del periodo {obj.periodo} fueron encolados; el avance se muestra en el listado de lotes.")
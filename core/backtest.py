@@ -0,0 +1,120 @@
+# core/backtest.py
+
+"""
+Backtest del modelo sobre todos los periodos cargados.
+
+Para cada par de periodos consecutivos (P, P+1) se toma como etiqueta real si cada
+estudiante de P vuelve a aparecer en EstudiantePeriodo de P+1: quien no reaparece cuenta
+como deserción (los graduados también desaparecen, igual que en la validación manual con el
+reporte del periodo siguiente). Con el riesgo guardado en P se calculan las métricas de
+core/metricas.py para el periodo completo y para cada programa, y se guardan en
+ResultadoBacktest, de modo que la evolución del modelo se consulta con una sola consulta.
+
+Los pares son independientes entre sí: con más de un proceso se evalúan en paralelo (cada
+proceso lee sus dos periodos con su propia conexión) y el proceso principal escribe todos los
+resultados en una única transacción.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import metricas
+from .models import EstudiantePeriodo, ResultadoBacktest
+
+PROGRAMA_TOTAL = ''  # Fila con las métricas de todo el periodo
+SIN_PROGRAMA = 'SIN PROGRAMA'
+
+
+def pares_consecutivos():
+    """Pares (periodo, periodo siguiente) con estudiantes cargados, del más antiguo al más reciente."""
+    periodos = sorted(EstudiantePeriodo.objects.values_list('periodo', flat=True).distinct().order_by())
+    return list(zip(periodos, periodos[1:]))
+
+
+def _fila(periodo, periodo_siguiente, programa, umbral, desertaron, probabilidades):
+    evaluacion = metricas.evaluar(desertaron, probabilidades, umbral)
+    matriz = evaluacion['matriz']
+    mejor = evaluacion['mejor_umbral_f1']
+    return {
+        'periodo': periodo,
+        'periodo_siguiente': periodo_siguiente,
+        'programa': programa,
+        'umbral': umbral,
+        'total_estudiantes': len(desertaron),
+        'desertores': int(desertaron.sum()),
+        'sin_probabilidad': int(np.isnan(probabilidades).sum()),
+        'verdaderos_positivos': matriz['tp'],
+        'falsos_positivos': matriz['fp'],
+        'falsos_negativos': matriz['fn'],
+        'verdaderos_negativos': matriz['tn'],
+        'precision': evaluacion['precision'],
+        'recall': evaluacion['recall'],
+        'f1': evaluacion['f1'],
+        'roc_auc': evaluacion['roc_auc'],
+        'pr_auc': evaluacion['pr_auc'],
+        'mejor_umbral_f1': mejor['umbral'] if mejor else None,
+        'calibracion': evaluacion['calibracion'],
+    }
+
+
+def evaluar_par(periodo, periodo_siguiente, umbral):
+    """Métricas de `periodo` contra la reaparición en `periodo_siguiente`: lista de filas (dicts)."""
+    filas = list(
+        EstudiantePeriodo.objects.filter(periodo=periodo)
+        .values_list('id_estudiante', 'ultima_prob_riesgo', 'programa')
+    )
+    if not filas:
+        return []
+    siguientes = np.array(
+        list(EstudiantePeriodo.objects.filter(periodo=periodo_siguiente).values_list('id_estudiante', flat=True)),
+        dtype=str,
+    )
+
+    ids, probabilidades, programas = zip(*filas)
+    probabilidades = np.array(probabilidades, dtype=float)  # None -> NaN
+    desertaron = ~np.isin(np.array(ids, dtype=str), siguientes)
+    programas = np.array([programa or SIN_PROGRAMA for programa in programas], dtype=str)
+
+    resultado = [_fila(periodo, periodo_siguiente, PROGRAMA_TOTAL, umbral, desertaron, probabilidades)]
+    nombres, grupo = np.unique(programas, return_inverse=True)
+    for i, programa in enumerate(nombres.tolist()):
+        mascara = grupo == i
+        resultado.append(
+            _fila(periodo, periodo_siguiente, programa, umbral, desertaron[mascara], probabilidades[mascara])
+        )
+    return resultado
+
+
+def ejecutar_backtest(periodos=None, procesos=None, umbral=None):
+    """
+    Evalúa los pares consecutivos (solo los que empiezan en `periodos`, si se indican) y
+    reemplaza sus filas de ResultadoBacktest. `procesos` es el número de procesos en paralelo
+    (por defecto, uno por CPU). Devuelve las filas guardadas del periodo completo.
+    """
+    umbral = settings.UMBRAL_PREDICCION if umbral is None else umbral
+    pares = pares_consecutivos()
+    if periodos:
+        pares = [par for par in pares if par[0] in periodos]
+    if not pares:
+        return []
+
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(pares)))
+    if procesos == 1:
+        resultados = [evaluar_par(periodo, siguiente, umbral) for periodo, siguiente in pares]
+    else:
+        # Cada proceso abre su propia conexión: no se hereda la del proceso principal
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos, initializer=django.setup) as ejecutor:
+            resultados = list(ejecutor.map(evaluar_par, *zip(*pares), repeat(umbral)))
+
+    filas = [ResultadoBacktest(**fila) for resultado in resultados for fila in resultado]
+    with transaction.atomic():
+        ResultadoBacktest.objects.filter(periodo__in=[periodo for periodo, _ in pares]).delete()
+        ResultadoBacktest.objects.bulk_create(filas)
+    return [fila for fila in filas if fila.programa == PROGRAMA_TOTAL]
@@ -0,0 +1,112 @@
+# core/busqueda.py
+
+"""
+Índice de búsqueda por subcadena de los IDs de estudiante (y del programa).
+
+En SQLite, `id_estudiante__icontains` es un LIKE '%q%' que recorre todo el periodo. Este
+módulo mantiene una tabla virtual FTS5 con tokenizador de trigramas, cuyo rowid es el id de
+EstudiantePeriodo: cualquier subcadena de 3 o más caracteres se resuelve con el índice. La
+tabla se reconstruye por periodo al terminar cada carga. Con otro motor de BD, o si SQLite no
+trae FTS5, se usa el filtro `icontains` de siempre.
+
+La búsqueda en el índice se hace al ejecutar el queryset filtrado, no al filtrarlo: si la
+página y el total salen de la caché de vistas, el índice no se consulta.
+"""
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import BigIntegerField, Expression, Q
+
+TABLA = 'core_busqueda_estudiantes'
+LONGITUD_MINIMA = 3  # El tokenizador de trigramas no indexa búsquedas más cortas
+# Hasta cuántas coincidencias se pasan como lista de ids; más allá la búsqueda es poco selectiva
+MAXIMO_IDS = 2000
+
+_disponible = {}
+
+
+def disponible():
+    """Si la BD actual tiene el índice de búsqueda (se consulta una vez por BD)."""
+    nombre = connection.settings_dict['NAME']
+    if nombre not in _disponible:
+        _disponible[nombre] = connection.vendor == 'sqlite' and TABLA in connection.introspection.table_names()
+    return _disponible[nombre]
+
+
+def indexar_periodo(periodo):
+    """Reconstruye las entradas del índice de un periodo a partir de EstudiantePeriodo."""
+    if not disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA} WHERE periodo = %s", [periodo])
+        cursor.execute(
+            f"INSERT INTO {TABLA} (rowid, id_estudiante, programa, periodo) "
+            f"SELECT e.id, e.id_estudiante, COALESCE(c.valor, ''), e.periodo "
+            # El programa se guarda como código: el texto sale de la tabla de categorías
+            f"FROM core_estudianteperiodo e LEFT JOIN core_categoria c ON c.id = e.programa "
+            # En orden de rowid: FTS5 inserta mucho más rápido así que en el orden del índice por riesgo
+            f"WHERE e.periodo = %s ORDER BY e.id",
+            [periodo],
+        )
+
+
+def optimizar():
+    """
+    Actualiza las estadísticas del planificador con PRAGMA optimize, que solo ejecuta ANALYZE
+    sobre las tablas sin estadísticas o que crecieron mucho desde el último. Sin ellas SQLite
+    recorre el periodo por el índice de riesgo en lugar de buscar directamente las pocas filas
+    que devuelve el índice de búsqueda. Se llama al terminar una carga, fuera de su transacción.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA optimize")
+
+
+class _Coincidencias(Expression):
+    """
+    Lado derecho de `pk__in`: los rowid del índice que coinciden con la búsqueda en el periodo.
+    Si son pocos se compila como la lista de ids (con una subconsulta, SQLite preferiría
+    recorrer el periodo en orden de riesgo y comprobar cada fila contra ella); si no, como la
+    subconsulta. El índice se consulta al compilar el SQL, una sola vez: las copias del
+    queryset (el conteo, cada página) comparten el resultado.
+    """
+    output_field = BigIntegerField()
+
+    def __init__(self, consulta, periodo):
+        super().__init__()
+        self.consulta = consulta
+        self.periodo = periodo
+        self._resultado = {}
+
+    def _ids(self, connection):
+        if 'ids' not in self._resultado:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s AND periodo = %s LIMIT %s",
+                    [self.consulta, self.periodo, MAXIMO_IDS + 1],
+                )
+                self._resultado['ids'] = [fila[0] for fila in cursor.fetchall()]
+        return self._resultado['ids']
+
+    def as_sql(self, compiler, connection):
+        ids = self._ids(connection)
+        if len(ids) > MAXIMO_IDS:
+            return f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s AND periodo = %s", [self.consulta, self.periodo]
+        if not ids:
+            raise EmptyResultSet
+        return f"({', '.join(['%s'] * len(ids))})", ids
+
+
+def filtrar(queryset, texto, periodo, incluir_programa=False):
+    """Filtra `queryset` a los estudiantes de `periodo` cuyo ID (o programa) contiene `texto`."""
+    texto = (texto or '').strip()
+    if len(texto) < LONGITUD_MINIMA or not disponible():
+        condicion = Q(id_estudiante__icontains=texto)
+        if incluir_programa:
+            condicion |= Q(programa__icontains=texto)
+        return queryset.filter(condicion, periodo=periodo)
+
+    columnas = '{id_estudiante programa}' if incluir_programa else 'id_estudiante'
+    frase = texto.replace('"', '""')  # El texto va como frase literal de FTS5
+    return queryset.filter(pk__in=_Coincidencias(f'{columnas} : "{frase}"', periodo))
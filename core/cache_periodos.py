@@ -0,0 +1,127 @@
+# core/cache_periodos.py
+
+"""
+Caché de vistas y consultas por periodo, sobre el framework de caché de Django.
+
+Los datos de un periodo solo cambian cuando se procesa un lote o se reevalúa el riesgo, y en
+ese momento se genera una nueva `PeriodoResumen.version_datos`. Cada entrada de caché incluye
+el periodo y su versión en la clave, así que una carga invalida exactamente las entradas de
+su periodo sin borrar nada: las anteriores dejan de consultarse y expiran solas. Como la
+versión vive en la BD, la invalidación funciona aunque el worker y el servidor web sean
+procesos distintos y la caché sea local a cada uno.
+
+Las vistas envueltas con `respuesta_condicional` responden además con ETag y contestan 304
+cuando el navegador ya tiene la versión vigente.
+"""
+
+import hashlib
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import PeriodoResumen, generar_version_datos
+
+ESTADISTICAS = {'aciertos': 0, 'fallos': 0, 'no_modificado': 0}
+_lock = threading.Lock()
+
+
+def _contar(evento):
+    with _lock:
+        ESTADISTICAS[evento] += 1
+
+
+def _activa():
+    return getattr(settings, 'CACHE_VISTAS_ACTIVA', True)
+
+
+def versiones_periodos(request=None):
+    """
+    Lista de (periodo, versión de datos) del más reciente al más antiguo. Es una consulta
+    sobre la tabla de resúmenes (una fila por periodo); se memoriza en el request.
+    """
+    if request is not None and hasattr(request, '_versiones_periodos'):
+        return request._versiones_periodos
+    versiones = list(PeriodoResumen.objects.values_list('periodo', 'version_datos').order_by('-periodo'))
+    if request is not None:
+        request._versiones_periodos = versiones
+    return versiones
+
+
+def periodos_disponibles(request=None):
+    """Periodos con datos cargados, del más reciente al más antiguo."""
+    return [periodo for periodo, _ in versiones_periodos(request)]
+
+
+def version_periodo(periodo, request=None):
+    return dict(versiones_periodos(request)).get(periodo, 'vacio')
+
+
+def invalidar_periodo(periodo):
+    """Genera una nueva versión de datos para el periodo (sus entradas en caché quedan obsoletas)."""
+    PeriodoResumen.objects.filter(periodo=periodo).update(version_datos=generar_version_datos())
+
+
+async def ainvalidar_periodo(periodo):
+    await PeriodoResumen.objects.filter(periodo=periodo).aupdate(version_datos=generar_version_datos())
+
+
+def _clave(nombre, periodo, version, partes):
+    # Las partes (filtros, página, umbral...) pueden traer texto libre; se resumen en un hash
+    resumen = hashlib.blake2b(repr(partes).encode(), digest_size=8).hexdigest()
+    return f"sipde:{nombre}:{periodo}:{version}:{resumen}"
+
+
+def obtener_o_calcular(nombre, periodo, partes, calcular, request=None):
+    """
+    Devuelve el valor en caché para (nombre, periodo, versión vigente, partes) o lo calcula
+    con `calcular()` y lo guarda por CACHE_VISTAS_TIMEOUT segundos.
+    """
+    if not _activa():
+        return calcular()
+
+    clave = _clave(nombre, periodo, version_periodo(periodo, request), partes)
+    valor = cache.get(clave)
+    if valor is not None:
+        _contar('aciertos')
+        return valor
+
+    _contar('fallos')
+    valor = calcular()
+    cache.set(clave, valor, getattr(settings, 'CACHE_VISTAS_TIMEOUT', 3600))
+    return valor
+
+
+def etag_de_request(request):
+    """ETag de una vista: depende del usuario, de la URL con sus parámetros y de las versiones de datos."""
+    partes = (
+        request.user.pk, request.get_full_path(), settings.UMBRAL_PREDICCION, versiones_periodos(request),
+    )
+    return '"%s"' % hashlib.blake2b(repr(partes).encode(), digest_size=12).hexdigest()
+
+
+def respuesta_condicional(vista):
+    """
+    Agrega ETag a las respuestas de la vista y contesta 304 (sin ejecutarla) cuando el
+    If-None-Match del navegador coincide con la versión vigente.
+    """
+    @wraps(vista)
+    def envuelta(request, *args, **kwargs):
+        if not _activa() or request.method not in ('GET', 'HEAD'):
+            return vista(request, *args, **kwargs)
+
+        etag = etag_de_request(request)
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            _contar('no_modificado')
+            return no_modificado
+
+        respuesta = vista(request, *args, **kwargs)
+        if respuesta.status_code == 200 and not respuesta.has_header('ETag'):
+            respuesta['ETag'] = etag
+            # El navegador puede guardar la página, pero debe revalidarla en cada visita
+            patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
+    return envuelta
@@ -0,0 +1,129 @@
+# core/cache_reportes.py
+
+"""
+Caché por contenido de los reportes ya normalizados.
+
+Cada reporte se identifica por el SHA-256 de su contenido, de modo que volver a procesar un
+lote (o subir de nuevo el mismo archivo) no vuelve a parsear el .xlsx/.csv: se lee el
+DataFrame normalizado desde un archivo Parquet local. Las entradas incluyen la versión de la
+lógica de normalización; al cambiarla, las entradas anteriores dejan de usarse y se purgan.
+El tamaño total de la caché se limita eliminando primero las entradas usadas hace más tiempo.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+
+# Incrementar cuando cambie la normalización de services.py (columnas, ID, filtros de
+# est_alum o agregados de notas) para invalidar todo lo guardado con la lógica anterior.
+VERSION_NORMALIZACION = 2
+
+_huellas = {}
+
+
+def huella_archivo(path):
+    """SHA-256 del contenido de un archivo; se memoriza por (ruta, tamaño, fecha de modificación)."""
+    info = os.stat(path)
+    clave = (str(path), info.st_size, info.st_mtime_ns)
+    if clave not in _huellas:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloque)
+        _huellas[clave] = sha.hexdigest()
+    return _huellas[clave]
+
+
+def _directorio():
+    directorio = Path(getattr(settings, 'CACHE_REPORTES_DIR', Path(settings.BASE_DIR) / 'cache_reportes'))
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _activa():
+    return getattr(settings, 'CACHE_REPORTES_ACTIVA', True)
+
+
+def _nombre_base(tipo, huella):
+    return f"{tipo}-{huella}-v{VERSION_NORMALIZACION}"
+
+
+def obtener(tipo, huella):
+    """Devuelve el DataFrame normalizado guardado para ese contenido, o None si no está en caché."""
+    if not _activa():
+        return None
+    directorio = _directorio()
+    for extension in ('parquet', 'pkl'):
+        ruta = directorio / f"{_nombre_base(tipo, huella)}.{extension}"
+        try:
+            df = pd.read_parquet(ruta) if extension == 'parquet' else pd.read_pickle(ruta)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            print(f"Entrada de caché ilegible, se descarta ({ruta.name}): {e}")
+            ruta.unlink(missing_ok=True)
+            continue
+        # Marca la entrada como usada recientemente para la política de desalojo
+        os.utime(ruta)
+        # Parquet devuelve None en los faltantes de columnas de texto; se restauran como NaN
+        return df.fillna(np.nan)
+    return None
+
+
+def guardar(tipo, huella, df):
+    """Guarda el DataFrame normalizado y aplica el límite de tamaño de la caché."""
+    if not _activa():
+        return
+    directorio = _directorio()
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    os.close(fd)
+    try:
+        try:
+            df.to_parquet(temporal)
+            extension = 'parquet'
+        except (pa.ArrowException, TypeError, ValueError):
+            # Columnas con tipos mezclados (frecuentes en Excel) no caben en Parquet sin
+            # alterar los valores; en ese caso se usa pickle, que los conserva tal cual.
+            with open(temporal, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            extension = 'pkl'
+        # El reemplazo atómico evita que otro proceso lea una entrada a medio escribir
+        os.replace(temporal, directorio / f"{_nombre_base(tipo, huella)}.{extension}")
+    except Exception as e:
+        print(f"No se pudo guardar el reporte '{tipo}' en la caché: {e}")
+        Path(temporal).unlink(missing_ok=True)
+        return
+    purgar()
+
+
+def purgar(max_bytes=None):
+    """
+    Elimina las entradas de versiones de normalización anteriores y, si la caché supera
+    `max_bytes` (por defecto settings.CACHE_REPORTES_MAX_BYTES), las menos usadas recientemente.
+    """
+    max_bytes = max_bytes if max_bytes is not None else getattr(settings, 'CACHE_REPORTES_MAX_BYTES', 1024 ** 3)
+    sufijos = (f"-v{VERSION_NORMALIZACION}.parquet", f"-v{VERSION_NORMALIZACION}.pkl")
+
+    entradas = []
+    for ruta in _directorio().iterdir():
+        if ruta.suffix not in ('.parquet', '.pkl'):
+            continue
+        if not ruta.name.endswith(sufijos):
+            ruta.unlink(missing_ok=True)
+            continue
+        info = ruta.stat()
+        entradas.append((info.st_mtime, info.st_size, ruta))
+
+    total = sum(tamano for _, tamano, _ in entradas)
+    for _, tamano, ruta in sorted(entradas, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        ruta.unlink(missing_ok=True)
+        total -= tamano
@@ -0,0 +1,190 @@
+# core/categorias.py
+
+"""
+Columnas categóricas de EstudiantePeriodo codificadas con diccionario.
+
+genero, programa, etnia, estado_civil, discapacidad y est_alum repiten en cada fila unos pocos
+textos distintos. En la BD cada fila guarda solo el código entero de su valor, que es el id de
+ese valor en la tabla Categoria. CategoriaField traduce en ambos sentidos: el ORM, las vistas,
+el admin y los filtros siguen trabajando con los textos (`programa='SISTEMAS'`), y en un
+DataFrame ya codificado (ver `codificar`) las columnas categóricas son esos códigos.
+
+Los códigos nunca cambian de significado ni se borran, así que cada proceso guarda la tabla en
+memoria y solo vuelve a leerla (una consulta, la tabla es pequeña) cuando aparece un código o
+un valor que no conoce, o cuando registra valores nuevos. La carga de un periodo registra en
+bloque todos sus valores nuevos (`registrar`) antes de guardar las filas ya codificadas.
+"""
+
+import numpy as np
+from django.apps import apps
+from django.db import connection as conexion_por_defecto
+from django.db import models
+from django.db.models.lookups import In, Lookup
+
+SIN_CODIGO = 0  # Código de un valor que no está en la tabla: ninguna fila lo tiene
+
+_tablas = {}  # nombre de la BD -> _Tabla
+
+
+class _Tabla:
+    """Contenido de la tabla Categoria en un momento dado; se reemplaza completa al recargarla."""
+
+    def __init__(self, filas):
+        self.valores = {}  # código -> valor
+        self.codigos = {}  # campo -> {valor: código}
+        for codigo, campo, valor in filas:
+            self.valores[codigo] = valor
+            self.codigos.setdefault(campo, {})[valor] = codigo
+
+
+def _modelo():
+    return apps.get_model('core', 'Categoria')
+
+
+def campos():
+    """Nombres de los campos de EstudiantePeriodo guardados como CategoriaField."""
+    return [
+        f.name for f in apps.get_model('core', 'EstudiantePeriodo')._meta.concrete_fields
+        if isinstance(f, CategoriaField)
+    ]
+
+
+def _tabla(conexion=None, recargar=False):
+    conexion = conexion or conexion_por_defecto
+    nombre = conexion.settings_dict['NAME']
+    if recargar or nombre not in _tablas:
+        filas = _modelo().objects.using(conexion.alias).values_list('pk', 'campo', 'valor')
+        _tablas[nombre] = _Tabla(list(filas))
+    return _tablas[nombre]
+
+
+def valor(codigo, conexion=None):
+    """Texto de un código (None si no existe)."""
+    tabla = _tabla(conexion)
+    if codigo not in tabla.valores:
+        tabla = _tabla(conexion, recargar=True)
+    return tabla.valores.get(codigo)
+
+
+def codigo(campo, texto, conexion=None):
+    """Código del valor `texto` de `campo`, o SIN_CODIGO si nunca se registró."""
+    tabla = _tabla(conexion)
+    if texto not in tabla.codigos.get(campo, {}):
+        tabla = _tabla(conexion, recargar=True)
+    return tabla.codigos.get(campo, {}).get(texto, SIN_CODIGO)
+
+
+def valores(campo, conexion=None):
+    """{código: valor} de todos los valores registrados de `campo`."""
+    return {c: v for v, c in _tabla(conexion).codigos.get(campo, {}).items()}
+
+
+def obtener_o_crear(campo, texto, conexion=None):
+    """
+    Código de `texto`, creándolo si no existe. Se consulta siempre la BD: la usan los guardados
+    de un solo registro, y así un código que quedó en memoria de una transacción revertida no
+    termina guardado en una fila.
+    """
+    conexion = conexion or conexion_por_defecto
+    categoria, creada = _modelo().objects.using(conexion.alias).get_or_create(campo=campo, valor=texto)
+    if creada or _tabla(conexion).valores.get(categoria.pk) != texto:
+        _tabla(conexion, recargar=True)
+    return categoria.pk
+
+
+def _textos(serie):
+    """Los valores de una columna como texto (None para los faltantes), como los guarda un CharField."""
+    return serie.astype(object).where(serie.notna(), None).map(lambda v: v if v is None else str(v))
+
+
+def registrar(df, conexion=None):
+    """
+    Registra en bloque los valores de las columnas categóricas de `df` que aún no tienen código
+    (una consulta para leer la tabla y, si hay valores nuevos, un INSERT). Devuelve la tabla.
+    Todos los valores se toman como texto, también los de columnas numéricas.
+    """
+    conexion = conexion or conexion_por_defecto
+    tabla = _tabla(conexion, recargar=True)
+    nuevos = []
+    for campo in campos():
+        if campo not in df.columns:
+            continue
+        conocidos = tabla.codigos.get(campo, {})
+        nuevos += [
+            _modelo()(campo=campo, valor=texto)
+            for texto in _textos(df[campo]).dropna().unique() if texto not in conocidos
+        ]
+    if nuevos:
+        _modelo().objects.using(conexion.alias).bulk_create(nuevos, ignore_conflicts=True)
+        tabla = _tabla(conexion, recargar=True)
+    return tabla
+
+
+def codificar(df, conexion=None):
+    """
+    Copia de `df` con las columnas categóricas reemplazadas por sus códigos, como enteros que
+    admiten nulos (Int64). Registra antes los valores nuevos. Los valores se toman siempre como
+    texto: una columna entera de un reporte (un `estado_civil` con 1 y 2) guarda '1' y '2',
+    no los códigos 1 y 2. Un DataFrame que ya pasó por aquí no se vuelve a codificar: quien lo
+    recibe lo indica con `ya_codificado`.
+    """
+    pendientes = [c for c in campos() if c in df.columns]
+    if not pendientes:
+        return df
+    tabla = registrar(df[pendientes], conexion)
+    df = df.copy()
+    for campo in pendientes:
+        df[campo] = _textos(df[campo]).map(tabla.codigos.get(campo, {})).astype('Int64')
+    return df
+
+
+def posiciones(campo, indices, conexion=None):
+    """
+    Arreglo código -> índice de la columna one-hot del modelo (-1 si el valor no tiene columna)
+    a partir de `indices` ({valor: índice}). Con él una columna de códigos se codifica con un
+    solo acceso por índice, sin convertir cada fila a texto.
+    """
+    codigos = valores(campo, conexion)
+    tabla = np.full(max(codigos, default=0) + 1, -1, dtype=np.int64)
+    for codigo_valor, texto in codigos.items():
+        tabla[codigo_valor] = indices.get(texto, -1)
+    return tabla
+
+
+class CategoriaField(models.Field):
+    """Texto categórico guardado como el código entero de su valor en la tabla Categoria."""
+
+    description = "Valor categórico codificado con diccionario"
+
+    def get_internal_type(self):
+        return 'IntegerField'
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else valor(value, connection)
+
+    def to_python(self, value):
+        return value if value is None or isinstance(value, str) else str(value)
+
+    def get_prep_value(self, value):
+        # Los enteros ya son códigos; los textos (filtros, lookups) se traducen sin crear nada
+        value = super().get_prep_value(value)
+        if value is None or (isinstance(value, (int, np.integer)) and not isinstance(value, bool)):
+            return None if value is None else int(value)
+        return codigo(self.name, str(value))
+
+    def get_db_prep_save(self, value, connection):
+        if not (value is None or hasattr(value, 'resolve_expression') or isinstance(value, (int, np.integer))):
+            return obtener_o_crear(self.name, str(value), connection)
+        return super().get_db_prep_save(value, connection)
+
+
+@CategoriaField.register_lookup
+class ContieneCategoria(Lookup):
+    """`campo__icontains=texto`: filas cuyo valor contiene `texto`, resuelto en la tabla Categoria."""
+
+    lookup_name = 'icontains'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        codigos = _modelo().objects.filter(campo=self.lhs.target.name, valor__icontains=self.rhs).values('pk')
+        return In(self.lhs, codigos.query).as_sql(compiler, connection)
@@ -0,0 +1,168 @@
+# core/consultas.py
+
+"""
+Consultas SQL por petición: conteo, tiempo total, las más lentas y presupuesto por vista.
+
+`ConsultasMiddleware` instala un `execute_wrapper` en las conexiones mientras se atiende cada
+petición (y mientras se envía el contenido de una respuesta en streaming, como las
+exportaciones), así que cuenta todas las consultas sin depender de DEBUG. Con
+CONSULTAS_ENCABEZADOS (por defecto, solo con DEBUG) la respuesta informa el conteo, el tiempo y
+la consulta más lenta en encabezados `X-Consultas-SQL`, `X-Tiempo-SQL-ms` y
+`X-Consulta-SQL-Mas-Lenta`, y en `Server-Timing`, que las herramientas de desarrollo del
+navegador muestran en la pestaña de red.
+
+Cada vista puede declarar cuántas consultas le bastan con `@presupuesto_consultas(n)`. Una
+petición que lo excede queda en el log como advertencia; con CONSULTAS_PRESUPUESTO_ESTRICTO
+lanza `PresupuestoConsultasExcedido`. Las pruebas de vistas heredan de
+`PresupuestoConsultasMixin`, que activa el modo estricto: una vista que vuelve a hacer una
+consulta por estudiante (N+1) o repite una consulta hace fallar sus pruebas.
+"""
+
+import heapq
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+MAX_CONSULTAS_LENTAS = 3
+LARGO_SQL_ENCABEZADO = 200
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Una vista hizo más consultas de las que declara en su presupuesto."""
+
+
+class RegistroConsultas:
+    """Conteo, tiempo total y las MAX_CONSULTAS_LENTAS consultas más lentas mientras está activo."""
+
+    def __init__(self):
+        self.conteo = 0
+        self.segundos = 0.0
+        self._lentas = []  # Montículo de (segundos, orden, sql) con las más lentas
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.conteo += 1
+            self.segundos += duracion
+            entrada = (duracion, self.conteo, sql)
+            if len(self._lentas) < MAX_CONSULTAS_LENTAS:
+                heapq.heappush(self._lentas, entrada)
+            elif duracion > self._lentas[0][0]:
+                heapq.heapreplace(self._lentas, entrada)
+
+    @property
+    def lentas(self):
+        """[(segundos, sql)] de la más lenta a la más rápida."""
+        return [(segundos, sql) for segundos, _, sql in sorted(self._lentas, reverse=True)]
+
+    @contextmanager
+    def activo(self):
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(self))
+            yield self
+
+
+def presupuesto_consultas(maximo):
+    """Decorador de vistas: la vista no debe necesitar más de `maximo` consultas por petición."""
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+def _encabezados_activos():
+    activos = getattr(settings, 'CONSULTAS_ENCABEZADOS', None)
+    return settings.DEBUG if activos is None else activos
+
+
+def _sql_para_encabezado(sql):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= LARGO_SQL_ENCABEZADO else sql[:LARGO_SQL_ENCABEZADO - 3] + '...'
+
+
+class ConsultasMiddleware:
+    """
+    Mide las consultas de cada petición, las informa en encabezados en modo de depuración y
+    verifica el presupuesto de la vista, si lo declara. Va antes de los middleware de sesión y
+    autenticación para contar también sus consultas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registro = RegistroConsultas()
+        request.consultas_sql = registro
+        with registro.activo():
+            respuesta = self.get_response(request)
+
+        if respuesta.streaming:
+            # Las consultas del contenido en streaming ocurren después, al enviarlo
+            respuesta.streaming_content = self._contenido_medido(request, registro, respuesta.streaming_content)
+            return respuesta
+
+        if _encabezados_activos():
+            respuesta['X-Consultas-SQL'] = str(registro.conteo)
+            respuesta['X-Tiempo-SQL-ms'] = f"{registro.segundos * 1000:.1f}"
+            if registro.lentas:
+                segundos, sql = registro.lentas[0]
+                respuesta['X-Consulta-SQL-Mas-Lenta'] = f"{segundos * 1000:.1f}ms {_sql_para_encabezado(sql)}"
+            respuesta['Server-Timing'] = f'sql;dur={registro.segundos * 1000:.1f};desc="{registro.conteo} consultas"'
+        self._terminar(request, registro)
+        return respuesta
+
+    def _contenido_medido(self, request, registro, contenido):
+        with registro.activo():
+            yield from contenido
+        self._terminar(request, registro)
+
+    def process_view(self, request, vista, view_args, view_kwargs):
+        request.presupuesto_consultas = getattr(vista, 'presupuesto_consultas', None)
+
+    def _terminar(self, request, registro):
+        coincidencia = getattr(request, 'resolver_match', None)
+        nombre = coincidencia.view_name if coincidencia else request.path
+        logger.debug(
+            "%s %s: %d consultas en %.1f ms; más lentas: %s", request.method, nombre, registro.conteo,
+            registro.segundos * 1000, '; '.join(f"{s * 1000:.1f} ms {_sql_para_encabezado(sql)}" for s, sql in registro.lentas),
+        )
+
+        presupuesto = getattr(request, 'presupuesto_consultas', None)
+        if presupuesto is None or registro.conteo <= presupuesto:
+            return
+        mensaje = f"La vista {nombre} hizo {registro.conteo} consultas; su presupuesto es {presupuesto}."
+        if getattr(settings, 'CONSULTAS_PRESUPUESTO_ESTRICTO', False):
+            raise PresupuestoConsultasExcedido(mensaje)
+        logger.warning(mensaje)
+
+
+class PresupuestoConsultasMixin:
+    """
+    Para TestCase: cada petición del cliente de pruebas a una vista con presupuesto falla si lo
+    excede. `assertConsultas` verifica además el conteo exacto de una petición.
+    """
+
+    def setUp(self):
+        from django.test.utils import override_settings
+
+        super().setUp()
+        self.enterContext(override_settings(CONSULTAS_PRESUPUESTO_ESTRICTO=True))
+
+    def assertConsultas(self, respuesta, esperadas):
+        registro = respuesta.wsgi_request.consultas_sql
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        self.assertEqual(
+            registro.conteo, esperadas,
+            f"Se esperaban {esperadas} consultas y hubo {registro.conteo}: "
+            + '; '.join(_sql_para_encabezado(sql) for _, sql in registro.lentas),
+        )
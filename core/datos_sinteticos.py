@@ -0,0 +1,198 @@
+# core/datos_sinteticos.py
+
+"""
+Reportes institucionales sintéticos para pruebas de escala.
+
+Genera los cuatro reportes que recibe `procesar_y_guardar_datos_de_periodo` (caracterización,
+notas, pagos y discapacidad) para N estudiantes, con las particularidades de los que exporta
+registro académico: encabezados con tildes, espacios y mayúsculas, columnas que el proceso no
+usa, estados del alumno con mayúsculas y espacios inconsistentes (incluidos graduados,
+egresados, inactivos y '--'), estudiantes repetidos en la caracterización, IDs con '.0',
+varias filas de notas y de pagos por estudiante, notas y fechas vacías o inválidas, y algunos
+estudiantes con notas pero sin caracterización.
+
+Todo sale de un generador con semilla: la misma semilla y el mismo número de estudiantes dan
+siempre los mismos reportes, así que una medición se puede repetir en otro commit.
+"""
+
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+MAX_FILAS_EXCEL = 1048575  # Filas de datos de una hoja de Excel (sin el encabezado)
+ID_INICIAL = 1000000
+
+GENEROS = ['Femenino', 'Masculino']
+ETNIAS = ['mestiza', 'blanca', 'afrodescendiente', 'indígena', 'ninguna']
+ESTADOS_CIVILES = ['Soltero', 'Casado', 'Union_libre', 'Separado']
+PROGRAMAS = [
+    'INGENIERÍA DE SISTEMAS', 'DERECHO', 'CONTADURÍA PÚBLICA', 'PSICOLOGÍA', 'ADMINISTRACIÓN DE EMPRESAS',
+    'ENFERMERÍA', 'INGENIERÍA INDUSTRIAL', 'LICENCIATURA EN EDUCACIÓN INFANTIL',
+]
+LUGARES = ['CALI', 'Cali', 'SANTIAGO DE CALI', 'PALMIRA', 'JAMUNDÍ', 'YUMBO', 'CANDELARIA', '']
+# Estados tal como vienen en el reporte, con su frecuencia relativa
+ESTADOS_ALUMNO = {
+    'ACTIVO': 80, 'Activo': 4, 'ACTIVO ': 2, 'GRADUADO': 5, 'EGRESADO': 3, 'INACTIVO': 3, '--': 3,
+}
+EXPERIENCIA = {'SI': 30, 'NO': 55, 'si': 3, '': 12}
+DISCAPACIDADES = ['NINGUNA', 'VISUAL', 'AUDITIVA', 'FÍSICA', 'COGNITIVA']
+MATERIAS = [
+    'CÁLCULO I', 'CÁLCULO II', 'FÍSICA I', 'ÁLGEBRA LINEAL', 'ÉTICA', 'INGLÉS I', 'INGLÉS II',
+    'PROGRAMACIÓN I', 'PROGRAMACIÓN II', 'ESTADÍSTICA', 'CONTABILIDAD GENERAL', 'DERECHO ROMANO',
+    'PSICOLOGÍA GENERAL', 'METODOLOGÍA DE LA INVESTIGACIÓN', 'CONSTITUCIÓN POLÍTICA', 'COMUNICACIÓN ORAL Y ESCRITA',
+    'ECONOMÍA', 'BIOLOGÍA', 'QUÍMICA', 'EMPRENDIMIENTO',
+]
+
+# Proporciones de las particularidades de los reportes
+TASA_REPETIDOS = 0.02  # Estudiantes con una segunda fila en la caracterización
+TASA_SOLO_NOTAS = 0.01  # Estudiantes con notas pero sin caracterización
+TASA_SIN_PAGOS = 0.05
+TASA_DISCAPACIDAD = 0.06
+TASA_NOTA_VACIA = 0.02
+TASA_FECHA_INVALIDA = 0.01
+TASA_ID_DECIMAL = 0.1  # IDs escritos como '1000123.0' en pagos
+
+
+def _elegir(rng, frecuencias, n):
+    valores = list(frecuencias)
+    pesos = np.array([frecuencias[v] for v in valores], dtype=float)
+    return np.array(valores, dtype=object)[rng.choice(len(valores), n, p=pesos / pesos.sum())]
+
+
+def _periodo_anterior(periodo, semestres):
+    """El periodo `semestres` semestres antes de `periodo` ('2025A' -> '2024B' con 1)."""
+    numero = int(periodo[:4]) * 2 + (periodo[4] == 'B') - semestres
+    return f"{numero // 2}{'AB'[numero % 2]}"
+
+
+def _fechas_pago(rng, periodo, n):
+    """Fechas dd/mm/YYYY alrededor del vencimiento del periodo (unas semanas antes y después)."""
+    year, sem = int(periodo[:4]), periodo[4]
+    vencimiento = np.datetime64(f"{year}-02-28" if sem == 'A' else f"{year}-08-31")
+    fechas = vencimiento + rng.integers(-45, 60, n).astype('timedelta64[D]')
+    texto = pd.Series(pd.to_datetime(fechas).strftime('%d/%m/%Y'), dtype=object)
+    invalidas = rng.random(n) < TASA_FECHA_INVALIDA
+    texto[invalidas] = rng.choice(['', '31/02/' + str(year), 'SIN FECHA'], int(invalidas.sum()))
+    return texto.to_numpy()
+
+
+def generar_reportes(num_estudiantes, periodo='2025A', semilla=0):
+    """
+    Devuelve {'caracterizacion', 'notas', 'pagos', 'discapacidad'} -> DataFrame con los
+    reportes de `num_estudiantes` estudiantes para `periodo`, con los encabezados originales.
+    """
+    rng = np.random.default_rng(semilla)
+    n = num_estudiantes
+    ids = np.array([str(ID_INICIAL + i) for i in range(n)], dtype=object)
+
+    # Algunos estudiantes tienen notas pero no aparecen en la caracterización
+    con_caracterizacion = rng.random(n) >= TASA_SOLO_NOTAS
+    filas = np.flatnonzero(con_caracterizacion)
+    # ... y otros aparecen dos veces (se queda la última fila)
+    repetidos = filas[rng.random(len(filas)) < TASA_REPETIDOS]
+    filas = np.sort(np.concatenate([filas, repetidos]), kind='stable')
+    m = len(filas)
+    ingresos = [_periodo_anterior(periodo, s) for s in range(10)]
+    caracterizacion = pd.DataFrame({
+        'Cédula': ids[filas].astype(np.int64),
+        'Nombre': [f"ESTUDIANTE {i}" for i in filas],
+        'Edad': rng.integers(16, 45, m),
+        'Género': rng.choice(GENEROS, m),
+        'Num_Est_Economico': rng.integers(1, 7, m),
+        'Etnia': rng.choice(ETNIAS, m),
+        'Estado Civil': rng.choice(ESTADOS_CIVILES, m),
+        'Programa': rng.choice(PROGRAMAS, m),
+        'Jornada': rng.choice(['DIURNA', 'NOCTURNA'], m),
+        'Periodo_Ingreso': rng.choice(ingresos, m),
+        'Lugar_Residencia': rng.choice(LUGARES, m),
+        'Correo': [f"est{i}@correo.edu.co" for i in filas],
+        'Experiencia_Laboral': _elegir(rng, EXPERIENCIA, m),
+        'Num_Grupo_Fam': rng.integers(1, 9, m),
+        'Posicion_Hermanos': rng.integers(1, 6, m),
+        'Est_Alum': _elegir(rng, ESTADOS_ALUMNO, m),
+    })
+
+    # Entre 2 y 8 materias por estudiante (pueden repetirse: materias vistas otra vez)
+    materias_por_estudiante = rng.integers(2, 9, n)
+    total = int(materias_por_estudiante.sum())
+    notas_def = rng.normal(3.6, 0.8, total).clip(0, 5).round(1)
+    notas_def[rng.random(total) < TASA_NOTA_VACIA] = np.nan
+    notas = pd.DataFrame({
+        'Ide_Estudiante': np.repeat(ids, materias_por_estudiante),
+        'Cod_Materia': rng.integers(1000, 9999, total),
+        'Nom_Materia': rng.choice(MATERIAS, total),
+        'Def_Historia': notas_def,
+        'Docente': rng.choice([f"DOCENTE {i}" for i in range(50)], total),
+    })
+
+    # Entre 1 y 3 pagos por estudiante; algunos no pagaron
+    pagos_por_estudiante = np.where(rng.random(n) < TASA_SIN_PAGOS, 0, rng.integers(1, 4, n))
+    total = int(pagos_por_estudiante.sum())
+    ids_pagos = np.repeat(ids, pagos_por_estudiante)
+    decimales = rng.random(total) < TASA_ID_DECIMAL
+    ids_pagos[decimales] = ids_pagos[decimales] + '.0'
+    pagos = pd.DataFrame({
+        'Num_Identificacion': ids_pagos,
+        'Concepto': rng.choice(['MATRÍCULA', 'DERECHOS DE GRADO', 'CERTIFICADOS'], total),
+        'Valor': rng.uniform(5e4, 5e6, total).round(0),
+        'Fecha_Pago': _fechas_pago(rng, periodo, total),
+    })
+
+    con_discapacidad = np.flatnonzero(rng.random(n) < TASA_DISCAPACIDAD)
+    discapacidad = pd.DataFrame({
+        'Identificacion': ids[con_discapacidad],
+        'Discapacidad': rng.choice(DISCAPACIDADES, len(con_discapacidad)),
+    })
+
+    return {'caracterizacion': caracterizacion, 'notas': notas, 'pagos': pagos, 'discapacidad': discapacidad}
+
+
+def generar_activos(num_estudiantes, tasa_continuidad=0.85, semilla=0):
+    """
+    Caracterización del periodo siguiente, como la que se sube en el módulo de validación:
+    `cedula` y `est_alum` de los estudiantes que siguen (activos, egresados o graduados).
+    """
+    rng = np.random.default_rng(semilla + 1)
+    siguen = np.flatnonzero(rng.random(num_estudiantes) < tasa_continuidad)
+    return pd.DataFrame({
+        'cedula': ID_INICIAL + siguen,
+        'est_alum': _elegir(rng, {'ACTIVO': 90, 'EGRESADO': 4, 'GRADUADO': 6}, len(siguen)),
+    })
+
+
+def _escribir_xlsx(df, ruta):
+    if len(df) > MAX_FILAS_EXCEL:
+        raise ValueError(
+            f"El reporte tiene {len(df)} filas y una hoja de Excel admite {MAX_FILAS_EXCEL}; usa formato csv."
+        )
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(list(df.columns))
+    # Celdas vacías para los faltantes y tipos de Python (openpyxl no acepta los de numpy)
+    for fila in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        hoja.append(fila)
+    libro.save(ruta)
+
+
+def escribir_reporte(df, ruta):
+    """Escribe un reporte en .csv (separado por ';', latin1) o .xlsx según la extensión de `ruta`."""
+    if str(ruta).endswith('.xlsx'):
+        _escribir_xlsx(df, ruta)
+    else:
+        df.to_csv(ruta, sep=';', encoding='latin1', index=False)
+
+
+def escribir_reportes(directorio, num_estudiantes, periodo='2025A', formato='csv', semilla=0):
+    """
+    Escribe los cuatro reportes en `directorio` en formato 'csv' o 'xlsx' y devuelve
+    {nombre del reporte: ruta}, listo para `procesar_y_guardar_datos_de_periodo`.
+    """
+    if formato not in ('csv', 'xlsx'):
+        raise ValueError(f"Formato no soportado: {formato}")
+    rutas = {}
+    for nombre, df in generar_reportes(num_estudiantes, periodo, semilla).items():
+        rutas[nombre] = os.path.join(directorio, f"{nombre}.{formato}")
+        escribir_reporte(df, rutas[nombre])
+    return rutas
@@ -0,0 +1,143 @@
+# core/exportacion.py
+
+"""
+Exportación de la lista de estudiantes en streaming.
+
+Las filas se leen de la BD en bloques (`iterator(chunk_size=...)`) y se escriben a medida
+que llegan, así que la memoria usada no depende del tamaño del periodo. CSV y CSV comprimido
+se envían al cliente mientras se generan; XLSX (modo write-only de openpyxl) y Parquet
+necesitan cerrar el archivo antes de enviarlo, por lo que se escriben en un temporal en disco
+y se sirven desde ahí.
+"""
+
+import csv
+import io
+import tempfile
+import zlib
+
+import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import models
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import EstudiantePeriodo
+
+TAMANO_BLOQUE = 2000
+
+# Columnas por defecto (las del CSV original) y sus encabezados
+COLUMNAS_POR_DEFECTO = ['id_estudiante', 'periodo', 'ultima_prob_riesgo', 'programa', 'promedio_semestral', 'genero']
+ENCABEZADOS = {
+    'id_estudiante': 'ID Estudiante',
+    'periodo': 'Periodo',
+    'ultima_prob_riesgo': 'Prob. Riesgo',
+    'programa': 'Programa',
+    'promedio_semestral': 'Promedio',
+    'genero': 'Género',
+}
+
+# Todas las features del estudiante más el riesgo; se excluyen los campos internos
+_CAMPOS_INTERNOS = {'id', 'version_modelo', 'huella_features'}
+COLUMNAS_EXPORTABLES = [
+    field.name for field in EstudiantePeriodo._meta.concrete_fields if field.name not in _CAMPOS_INTERNOS
+]
+
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def columnas_solicitadas(valores):
+    """
+    Columnas pedidas (parámetro `columnas`, repetido o separado por comas), en el orden en que
+    llegan. Las desconocidas se ignoran; si no queda ninguna se usan las columnas por defecto.
+    """
+    pedidas = [c.strip() for valor in valores for c in valor.split(',') if c.strip()]
+    columnas = [c for c in dict.fromkeys(pedidas) if c in COLUMNAS_EXPORTABLES]
+    return columnas or list(COLUMNAS_POR_DEFECTO)
+
+
+def _filas(queryset, columnas):
+    return queryset.values_list(*columnas).iterator(chunk_size=TAMANO_BLOQUE)
+
+
+def _bloques_csv(queryset, columnas):
+    """Genera el CSV en trozos de texto de unas cuantas decenas de KB."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([ENCABEZADOS.get(c, c) for c in columnas])
+    for i, fila in enumerate(_filas(queryset, columnas), 1):
+        escritor.writerow(fila)
+        if i % TAMANO_BLOQUE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _bloques_csv_gzip(queryset, columnas):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for bloque in _bloques_csv(queryset, columnas):
+        comprimido = compresor.compress(bloque.encode('utf-8'))
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def _escribir_xlsx(queryset, columnas, destino):
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Estudiantes')
+    hoja.append([ENCABEZADOS.get(c, c) for c in columnas])
+    for fila in _filas(queryset, columnas):
+        hoja.append(fila)
+    libro.save(destino)
+
+
+def _tipo_arrow(campo):
+    if isinstance(campo, models.FloatField):
+        return pa.float64()
+    if isinstance(campo, models.IntegerField):
+        return pa.int64()
+    return pa.string()
+
+
+def _escribir_parquet(queryset, columnas, destino):
+    esquema = pa.schema([(c, _tipo_arrow(EstudiantePeriodo._meta.get_field(c))) for c in columnas])
+    filas = _filas(queryset, columnas)
+    # Un row group por bloque de filas: solo un bloque está en memoria a la vez
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        while True:
+            bloque = [fila for _, fila in zip(range(TAMANO_BLOQUE), filas)]
+            if not bloque:
+                break
+            columnas_bloque = list(zip(*bloque))
+            escritor.write_table(pa.table(
+                [pa.array(valores, type=esquema.field(i).type) for i, valores in enumerate(columnas_bloque)],
+                schema=esquema,
+            ))
+
+
+def respuesta_exportacion(queryset, columnas, formato, nombre_base='lista_estudiantes'):
+    """Respuesta HTTP con las filas de `queryset` en el formato pedido ('csv' si no se reconoce)."""
+    if formato not in FORMATOS:
+        formato = 'csv'
+    tipo_contenido, extension = FORMATOS[formato]
+    nombre_archivo = f"{nombre_base}.{extension}"
+
+    if formato in ('csv', 'csv.gz'):
+        generador = _bloques_csv(queryset, columnas) if formato == 'csv' else _bloques_csv_gzip(queryset, columnas)
+        respuesta = StreamingHttpResponse(generador, content_type=tipo_contenido)
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return respuesta
+
+    # XLSX y Parquet se cierran al final; el temporal se borra al terminar de enviarse
+    temporal = tempfile.TemporaryFile()
+    if formato == 'xlsx':
+        _escribir_xlsx(queryset, columnas, temporal)
+    else:
+        _escribir_parquet(queryset, columnas, temporal)
+    temporal.seek(0)
+    return FileResponse(temporal, as_attachment=True, filename=nombre_archivo, content_type=tipo_contenido)
@@ -0,0 +1,96 @@
+# core/historial.py
+
+"""
+Features que dependen del periodo anterior de cada estudiante (tendencia).
+
+Se calculan en bloque: una sola consulta trae los valores del periodo anterior de todos los
+estudiantes y un merge por `id_estudiante` los cruza con el periodo actual. El "periodo
+anterior" es el periodo cargado inmediatamente anterior (en orden de nombre, p. ej. 2024B
+antes de 2025A). Los estudiantes sin registro en ese periodo quedan con diferencia 0 y
+`curso_periodo_anterior` = 0.
+
+Como las features de un periodo dependen del anterior, al (re)procesar un periodo se
+recalculan las del periodo siguiente (ver `cambios_periodo_siguiente`).
+"""
+
+import numpy as np
+import pandas as pd
+from django.db.models import Max, Min
+
+from .models import EstudiantePeriodo
+
+# feature -> columna base cuya diferencia con el periodo anterior se calcula
+DIFERENCIAS = {
+    'diferencia_promedio_anterior': 'promedio_semestral',
+    'diferencia_reprobadas_anterior': 'num_materias_reprobadas',
+}
+FEATURES = [*DIFERENCIAS, 'curso_periodo_anterior']
+
+
+def periodo_anterior(periodo):
+    return EstudiantePeriodo.objects.filter(periodo__lt=periodo).aggregate(p=Max('periodo'))['p']
+
+
+def periodo_siguiente(periodo):
+    return EstudiantePeriodo.objects.filter(periodo__gt=periodo).aggregate(p=Min('periodo'))['p']
+
+
+def valores_periodo(estudiantes):
+    """
+    (id_estudiante, columnas base) de los estudiantes del queryset `estudiantes` (o None si
+    no hay periodo), en una consulta.
+    """
+    columnas = ['id_estudiante', *dict.fromkeys(DIFERENCIAS.values())]
+    if estudiantes is None:
+        return pd.DataFrame(columns=columnas)
+    return pd.DataFrame.from_records(list(estudiantes.values_list(*columnas)), columns=columnas)
+
+
+def _valores_periodo(periodo):
+    return valores_periodo(None if periodo is None else EstudiantePeriodo.objects.filter(periodo=periodo))
+
+
+def calcular_features(df, anterior_df):
+    """
+    Agrega a `df` (una fila por estudiante, con las columnas base) las features respecto a
+    `anterior_df` (valores del periodo anterior). Devuelve un DataFrame nuevo.
+    """
+    anterior_df = anterior_df.rename(columns={c: f'{c}__anterior' for c in anterior_df.columns if c != 'id_estudiante'})
+    anterior_df['curso_periodo_anterior'] = 1
+    resultado = df.drop(columns=[c for c in FEATURES if c in df.columns]).merge(
+        anterior_df, on='id_estudiante', how='left',
+    )
+    for feature, base in DIFERENCIAS.items():
+        actual = pd.to_numeric(resultado[base], errors='coerce') if base in resultado.columns else np.nan
+        resultado[feature] = (actual - pd.to_numeric(resultado[f'{base}__anterior'], errors='coerce')).fillna(0)
+    resultado['curso_periodo_anterior'] = resultado['curso_periodo_anterior'].fillna(0).astype(int)
+    resultado['diferencia_reprobadas_anterior'] = resultado['diferencia_reprobadas_anterior'].astype(int)
+    return resultado.drop(columns=[c for c in resultado.columns if c.endswith('__anterior')])
+
+
+def agregar_features(df, periodo):
+    """Features del periodo `periodo` para el DataFrame que se está cargando."""
+    return calcular_features(df, _valores_periodo(periodo_anterior(periodo)))
+
+
+def cambios_periodo_siguiente(periodo):
+    """
+    Features recalculadas del periodo que sigue a `periodo`. Devuelve (periodo siguiente,
+    DataFrame con id_estudiante y las features solo de las filas que cambiaron), o
+    (None, None) si no hay periodo siguiente.
+    """
+    siguiente = periodo_siguiente(periodo)
+    if siguiente is None:
+        return None, None
+
+    guardadas = pd.DataFrame.from_records(
+        list(EstudiantePeriodo.objects.filter(periodo=siguiente).values_list('id_estudiante', *FEATURES)),
+        columns=['id_estudiante', *FEATURES],
+    )
+    nuevas = calcular_features(_valores_periodo(siguiente), _valores_periodo(periodo_anterior(siguiente)))
+    comparacion = nuevas[['id_estudiante', *FEATURES]].merge(guardadas, on='id_estudiante', suffixes=('', '__guardada'))
+    cambiaron = np.zeros(len(comparacion), dtype=bool)
+    for feature in FEATURES:
+        # Una feature nunca calculada (NULL) también cuenta como cambio
+        cambiaron |= ~np.isclose(comparacion[feature].astype(float), comparacion[f'{feature}__guardada'].astype(float))
+    return siguiente, comparacion.loc[cambiaron, ['id_estudiante', *FEATURES]]
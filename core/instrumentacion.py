@@ -0,0 +1,277 @@
+# core/instrumentacion.py
+
+"""
+Instrumentación de etapas: tiempo de pared, filas procesadas y memoria pico.
+
+`medir(etapa, filas, **etiquetas)` envuelve un bloque de código (cada etapa de la carga de un
+periodo, la carga del modelo, las predicciones) y `MetricasMiddleware` cada petición a una
+vista. Cada medición se escribe en el log `core.instrumentacion` y se acumula en un registro de
+este proceso por etapa y etiquetas: conteo, suma e histograma de segundos, filas y la mayor
+memoria pico observada. `exportar_prometheus()` lo entrega en el formato de texto de
+Prometheus (vista /metricas/). Como los contadores de la caché de vistas, el registro es de
+cada proceso: con varios workers, Prometheus los consulta por separado y los suma.
+
+La memoria pico es, por defecto, la memoria residente máxima del proceso (ru_maxrss) al
+terminar la etapa: no cuesta nada y muestra qué etapa la hizo crecer, pero nunca baja. Con
+INSTRUMENTACION_TRACEMALLOC se mide con tracemalloc el máximo asignado por Python y NumPy
+durante la etapa; es exacto por etapa pero hace varias veces más lenta la carga, así que es
+para diagnosticar en el worker o en benchmark_sipde, no para el servidor web. En Windows no
+existe el módulo `resource` (ru_maxrss) y la memoria pico se mide siempre con tracemalloc.
+
+Con INSTRUMENTACION_ACTIVA = False, `medir` devuelve un contexto vacío compartido y el
+middleware llama directo a la vista: el costo es leer un setting.
+"""
+
+import hmac
+import logging
+import math
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+from django.conf import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets del histograma de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, math.inf)
+
+_registro = {}  # (etapa, etiquetas ordenadas) -> _Acumulado
+_lock = threading.Lock()
+_local = threading.local()  # Picos de tracemalloc de las etapas anidadas en curso de cada hilo
+
+
+def activa():
+    return getattr(settings, 'INSTRUMENTACION_ACTIVA', True)
+
+
+def _usar_tracemalloc():
+    return resource is None or getattr(settings, 'INSTRUMENTACION_TRACEMALLOC', False)
+
+
+def memoria_pico_proceso():
+    """
+    Memoria residente máxima del proceso en bytes (ru_maxrss). Sin el módulo `resource`, el
+    máximo asignado según tracemalloc si está activo, o 0.
+    """
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+
+
+class _Acumulado:
+    __slots__ = ('conteo', 'segundos', 'filas', 'memoria_pico', 'buckets')
+
+    def __init__(self):
+        self.conteo = 0
+        self.segundos = 0.0
+        self.filas = None
+        self.memoria_pico = 0
+        self.buckets = [0] * len(BUCKETS)
+
+    def agregar(self, segundos, filas, memoria):
+        self.conteo += 1
+        self.segundos += segundos
+        if filas is not None:
+            self.filas = (self.filas or 0) + filas
+        self.memoria_pico = max(self.memoria_pico, memoria)
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                self.buckets[i] += 1
+                break
+
+
+class Medicion:
+    """
+    Una etapa en curso. `filas` se puede asignar dentro del bloque cuando solo se conoce al
+    final; `etiquetas` también, por ejemplo la vista que resolvió la petición.
+    """
+
+    def __init__(self, etapa, filas=None, etiquetas=None, nivel=logging.INFO):
+        self.etapa = etapa
+        self.filas = filas
+        self.etiquetas = etiquetas or {}
+        self.nivel = nivel
+
+    def __enter__(self):
+        self._tracemalloc = _usar_tracemalloc()
+        if self._tracemalloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            picos = getattr(_local, 'picos', None)
+            if picos is None:
+                picos = _local.picos = []
+            actual, pico = tracemalloc.get_traced_memory()
+            # El pico hasta aquí pertenece a la etapa que contiene a esta
+            if picos:
+                picos[-1] = max(picos[-1], pico)
+            tracemalloc.reset_peak()
+            picos.append(actual)
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        segundos = time.perf_counter() - self._inicio
+        if self._tracemalloc and tracemalloc.is_tracing():
+            picos = _local.picos
+            memoria = max(picos.pop(), tracemalloc.get_traced_memory()[1])
+            if picos:
+                picos[-1] = max(picos[-1], memoria)
+        else:
+            memoria = memoria_pico_proceso()
+        filas = None if self.filas is None else int(self.filas)
+        registrar(self.etapa, segundos, filas, memoria, **self.etiquetas)
+        if logger.isEnabledFor(self.nivel):
+            etiquetas = ''.join(f" {nombre}={valor}" for nombre, valor in self.etiquetas.items())
+            logger.log(
+                self.nivel, "%s%s: %.3f s, %s filas, memoria pico %.1f MB",
+                self.etapa, etiquetas, segundos, '-' if filas is None else filas, memoria / 1024 ** 2,
+                extra={'etapa': self.etapa, 'segundos': segundos, 'filas': filas, 'memoria_pico': memoria, **self.etiquetas},
+            )
+        return False
+
+
+class _MedicionInactiva:
+    """Contexto vacío que se usa con la instrumentación desactivada."""
+
+    filas = None
+    etiquetas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+_INACTIVA = _MedicionInactiva()
+
+
+def medir(etapa, filas=None, **etiquetas):
+    """Contexto que mide el bloque como una ejecución de `etapa` (con sus filas y etiquetas)."""
+    if not activa():
+        return _INACTIVA
+    return Medicion(etapa, filas, etiquetas)
+
+
+def instrumentado(etapa):
+    """Decorador: cada llamada a la función se mide como una ejecución de `etapa`."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar(etapa, segundos, filas=None, memoria=0, **etiquetas):
+    """Acumula una medición ya tomada."""
+    clave = (etapa, tuple(sorted((nombre, str(valor)) for nombre, valor in etiquetas.items())))
+    with _lock:
+        acumulado = _registro.get(clave)
+        if acumulado is None:
+            acumulado = _registro[clave] = _Acumulado()
+        acumulado.agregar(segundos, filas, memoria)
+
+
+def resumen():
+    """Lista de dicts con lo acumulado por cada etapa y etiquetas desde el último `reiniciar`."""
+    with _lock:
+        return [
+            {
+                'etapa': etapa, 'etiquetas': dict(etiquetas), 'conteo': a.conteo, 'segundos': a.segundos,
+                'filas': a.filas, 'memoria_pico': a.memoria_pico,
+            }
+            for (etapa, etiquetas), a in sorted(_registro.items())
+        ]
+
+
+def reiniciar():
+    with _lock:
+        _registro.clear()
+
+
+def _etiquetas_prometheus(etapa, etiquetas, extra=()):
+    pares = [('etapa', etapa), *etiquetas, *extra]
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{nombre}="{escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+def exportar_prometheus():
+    """El registro en el formato de texto de Prometheus (versión 0.0.4)."""
+    with _lock:
+        series = sorted((clave, a.conteo, a.segundos, a.filas, a.memoria_pico, list(a.buckets)) for clave, a in _registro.items())
+
+    lineas = [
+        '# HELP sipde_etapa_segundos Tiempo de pared de cada ejecución de la etapa.',
+        '# TYPE sipde_etapa_segundos histogram',
+    ]
+    for (etapa, etiquetas), conteo, segundos, _, _, buckets in series:
+        acumulado = 0
+        for limite, cantidad in zip(BUCKETS, buckets):
+            acumulado += cantidad
+            le = '+Inf' if limite == math.inf else repr(float(limite))
+            lineas.append(f"sipde_etapa_segundos_bucket{_etiquetas_prometheus(etapa, etiquetas, [('le', le)])} {acumulado}")
+        lineas.append(f"sipde_etapa_segundos_sum{_etiquetas_prometheus(etapa, etiquetas)} {segundos!r}")
+        lineas.append(f"sipde_etapa_segundos_count{_etiquetas_prometheus(etapa, etiquetas)} {conteo}")
+
+    lineas += [
+        '# HELP sipde_etapa_filas_total Filas procesadas por la etapa.',
+        '# TYPE sipde_etapa_filas_total counter',
+    ]
+    lineas += [
+        f"sipde_etapa_filas_total{_etiquetas_prometheus(etapa, etiquetas)} {filas}"
+        for (etapa, etiquetas), _, _, filas, _, _ in series if filas is not None
+    ]
+
+    lineas += [
+        '# HELP sipde_etapa_memoria_pico_bytes Mayor memoria pico observada al ejecutar la etapa.',
+        '# TYPE sipde_etapa_memoria_pico_bytes gauge',
+    ]
+    lineas += [
+        f"sipde_etapa_memoria_pico_bytes{_etiquetas_prometheus(etapa, etiquetas)} {memoria}"
+        for (etapa, etiquetas), _, _, _, memoria, _ in series
+    ]
+    return '\n'.join(lineas) + '\n'
+
+
+def token_valido(request):
+    """True si la petición trae `Authorization: Bearer <METRICAS_TOKEN>` (para Prometheus)."""
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    encabezado = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(encabezado.encode(), f"Bearer {token}".encode())
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición como la etapa 'vista', con el nombre de la ruta, el método y el código de
+    estado como etiquetas. En las respuestas en streaming (exportaciones) mide hasta que la
+    vista devuelve la respuesta, no el envío del contenido.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not activa():
+            return self.get_response(request)
+
+        with Medicion('vista', nivel=logging.DEBUG) as medicion:
+            respuesta = self.get_response(request)
+            coincidencia = getattr(request, 'resolver_match', None)
+            medicion.etiquetas = {
+                'vista': coincidencia.view_name if coincidencia else 'sin_ruta',
+                'metodo': request.method,
+                'estado': respuesta.status_code,
+            }
+        return respuesta
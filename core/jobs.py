@@ -0,0 +1,160 @@
+# core/jobs.py
+
+"""
+Cola de trabajos en segundo plano respaldada por la base de datos.
+
+Los lotes de carga se encolan marcando su estado como EN_COLA; el comando
+`python manage.py procesar_lotes` los toma uno a uno y ejecuta el pipeline fuera
+del ciclo de petición/respuesta, registrando etapa, progreso y tiempo en el propio
+LoteCargaDatos. No requiere ningún broker externo.
+"""
+
+import hashlib
+import time
+import traceback
+
+from django.utils import timezone
+
+from . import cache_reportes
+from .models import LoteCargaDatos
+from .services import procesar_y_guardar_datos_de_periodo
+
+
+def archivos_del_lote(lote):
+    """Rutas de los cuatro reportes de un lote, con las claves que espera el servicio de carga."""
+    return {
+        'caracterizacion': lote.reporte_caracterizacion.path,
+        'notas': lote.reporte_notas.path,
+        'pagos': lote.reporte_pagos.path,
+        'discapacidad': lote.reporte_discapacidad.path,
+    }
+
+
+def huella_lote(lote):
+    """Huella combinada del contenido de los cuatro reportes del lote."""
+    huellas = [cache_reportes.huella_archivo(path) for path in archivos_del_lote(lote).values()]
+    return hashlib.sha256('|'.join(huellas).encode()).hexdigest()
+
+
+def lote_identico_ya_cargado(lote):
+    """
+    Devuelve el lote anterior cuyos datos siguen vigentes para el periodo si tiene exactamente
+    los mismos archivos que `lote`; en ese caso no hace falta volver a ingerirlo.
+    """
+    ultimo = LoteCargaDatos.objects.filter(
+        periodo=lote.periodo, estado=LoteCargaDatos.Estado.COMPLETADO,
+    ).exclude(pk=lote.pk).order_by('-fecha_inicio', '-id').first()
+    if ultimo is not None and ultimo.huella_contenido and ultimo.huella_contenido == lote.huella_contenido:
+        return ultimo
+    return None
+
+
+def encolar_lote(lote, reprocesar=False):
+    """Deja el lote en la cola para que lo procese el worker."""
+    lote.estado = LoteCargaDatos.Estado.EN_COLA
+    lote.reprocesar = reprocesar
+    lote.etapa = 'En cola'
+    lote.progreso = 0
+    lote.filas_procesadas = 0
+    lote.fecha_inicio = None
+    lote.tiempo_transcurrido = None
+    lote.mensaje_error = ''
+    lote.cambios = {}
+    lote.save(update_fields=[
+        'estado', 'reprocesar', 'etapa', 'progreso', 'filas_procesadas',
+        'fecha_inicio', 'tiempo_transcurrido', 'mensaje_error', 'cambios',
+    ])
+
+
+def tomar_siguiente_lote():
+    """
+    Reclama el lote más antiguo de la cola. El UPDATE condicionado al estado garantiza
+    que, con varios workers, cada lote lo procese solo uno de ellos.
+    """
+    while True:
+        lote = LoteCargaDatos.objects.filter(estado=LoteCargaDatos.Estado.EN_COLA).order_by('fecha_carga', 'id').first()
+        if lote is None:
+            return None
+
+        tomado = LoteCargaDatos.objects.filter(pk=lote.pk, estado=LoteCargaDatos.Estado.EN_COLA).update(
+            estado=LoteCargaDatos.Estado.PROCESANDO,
+            etapa='Iniciando',
+            fecha_inicio=timezone.now(),
+        )
+        if tomado:
+            lote.refresh_from_db()
+            return lote
+
+
+def ejecutar_lote(lote):
+    """Ejecuta el pipeline de carga de un lote ya reclamado y registra el resultado."""
+    inicio = time.monotonic()
+
+    def reportar(etapa, porcentaje, filas=None):
+        campos = {'etapa': etapa, 'progreso': porcentaje, 'tiempo_transcurrido': time.monotonic() - inicio}
+        if filas is not None:
+            campos['filas_procesadas'] = filas
+        LoteCargaDatos.objects.filter(pk=lote.pk).update(**campos)
+
+    mensaje_error = ''
+    cambios = {}
+    try:
+        lote.huella_contenido = huella_lote(lote)
+        LoteCargaDatos.objects.filter(pk=lote.pk).update(huella_contenido=lote.huella_contenido)
+
+        identico = None if lote.reprocesar else lote_identico_ya_cargado(lote)
+        if identico is not None:
+            print(f"El lote {lote.pk} es idéntico al lote {identico.pk}; no se vuelve a ingerir.")
+            LoteCargaDatos.objects.filter(pk=lote.pk).update(
+                estado=LoteCargaDatos.Estado.COMPLETADO,
+                procesado=True,
+                progreso=100,
+                etapa=f"Sin cambios: idéntico al lote {identico.pk}",
+                filas_procesadas=identico.filas_procesadas,
+                tiempo_transcurrido=time.monotonic() - inicio,
+            )
+            return True
+
+        # Al reprocesar no se borra nada antes: el servicio compara con lo guardado, aplica solo
+        # las diferencias en una transacción y elimina a los estudiantes que ya no aparecen
+        cambios = procesar_y_guardar_datos_de_periodo(
+            archivos_del_lote(lote), lote.periodo, reportar_progreso=reportar, reprocesar=lote.reprocesar,
+        )
+        exito = bool(cambios)
+        if not exito:
+            mensaje_error = "El procesamiento falló. Revisa los logs del servidor."
+    except Exception as e:
+        traceback.print_exc()
+        exito = False
+        mensaje_error = str(e)
+
+    campos = {
+        'estado': LoteCargaDatos.Estado.COMPLETADO if exito else LoteCargaDatos.Estado.ERROR,
+        'etapa': 'Completado' if exito else 'Error',
+        'tiempo_transcurrido': time.monotonic() - inicio,
+        'mensaje_error': mensaje_error,
+    }
+    if exito:
+        campos.update(procesado=True, progreso=100, cambios=cambios)
+    LoteCargaDatos.objects.filter(pk=lote.pk).update(**campos)
+    return exito
+
+
+def procesar_cola(max_lotes=None):
+    """Procesa lotes en cola hasta vaciarla (o hasta `max_lotes`). Devuelve cuántos se procesaron."""
+    procesados = 0
+    while max_lotes is None or procesados < max_lotes:
+        lote = tomar_siguiente_lote()
+        if lote is None:
+            break
+        print(f"Procesando lote {lote.pk} del periodo {lote.periodo}...")
+        ejecutar_lote(lote)
+        procesados += 1
+    return procesados
+
+
+def reencolar_lotes_interrumpidos():
+    """Devuelve a la cola los lotes que quedaron en PROCESANDO porque el worker se detuvo."""
+    return LoteCargaDatos.objects.filter(estado=LoteCargaDatos.Estado.PROCESANDO).update(
+        estado=LoteCargaDatos.Estado.EN_COLA, etapa='En cola', progreso=0,
+    )
@@ -0,0 +1,172 @@
+# core/lector_activos.py
+
+"""
+Lectura del reporte de caracterización que se sube en el módulo de validación.
+
+De ese reporte solo interesan `cedula` y `est_alum`. La codificación y el separador se
+detectan con una muestra de los primeros KB del archivo, y luego se hace una única pasada
+por bloques (lector CSV en streaming de Arrow, o openpyxl en modo de solo lectura) que
+convierte solo esas dos columnas y va llenando el conjunto de IDs. Si Django
+guardó la subida en un temporal en disco, se lee desde esa ruta; si la tiene en memoria, se
+lee del mismo objeto: en ningún caso se copia el archivo completo.
+"""
+
+import codecs
+import csv
+import io
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+TAMANO_MUESTRA = 64 * 1024
+TAMANO_BLOQUE = 50000  # Filas por bloque de Excel
+TAMANO_BLOQUE_CSV = 4 * 1024 * 1024  # Bytes por bloque de CSV
+SEPARADORES = ';,\t|'
+LINEAS_SEPARADOR = 50  # El Sniffer de csv es lento con textos largos; bastan unas decenas de líneas
+ESTADOS_CONTINUIDAD = {'ACTIVO', 'EGRESADO', 'GRADUADO'}
+COLUMNAS = ('cedula', 'est_alum')
+
+
+def _origen(archivo):
+    """Ruta del temporal si la subida está en disco; si no, el propio objeto de archivo."""
+    if hasattr(archivo, 'temporary_file_path'):
+        return archivo.temporary_file_path()
+    archivo.seek(0)
+    return archivo
+
+
+def _muestra(archivo):
+    archivo.seek(0)
+    muestra = archivo.read(TAMANO_MUESTRA)
+    archivo.seek(0)
+    return muestra
+
+
+def detectar_codificacion(muestra):
+    """
+    UTF-8 (con o sin BOM) si la muestra es UTF-8 válido; si no, cp1252, y latin1 si aparecen
+    bytes que cp1252 no define. Un texto en cp1252 con tildes casi nunca es UTF-8 válido.
+    """
+    if muestra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    for codificacion in ('utf-8', 'cp1252'):
+        try:
+            # final=False: la muestra puede cortar un carácter de varios bytes por la mitad
+            codecs.getincrementaldecoder(codificacion)().decode(muestra, final=False)
+            return codificacion
+        except UnicodeDecodeError:
+            continue
+    return 'latin1'
+
+
+def detectar_separador(texto):
+    """Separador más probable según las líneas completas de la muestra (';' si no se distingue)."""
+    lineas = texto.splitlines()
+    if len(lineas) > 1:
+        lineas = lineas[:-1]  # La última línea de la muestra puede estar cortada
+    lineas = lineas[:LINEAS_SEPARADOR]
+    try:
+        return csv.Sniffer().sniff('\n'.join(lineas), delimiters=SEPARADORES).delimiter
+    except csv.Error:
+        encabezado = lineas[0] if lineas else ''
+        return max(SEPARADORES, key=encabezado.count) if any(s in encabezado for s in SEPARADORES) else ';'
+
+
+def _columna(nombre):
+    return str(nombre).strip().lower() in COLUMNAS
+
+
+def _ubicar_columnas(encabezado):
+    """Nombre original de cada columna necesaria en el encabezado (sin importar mayúsculas ni espacios)."""
+    nombres = {str(c).strip().lower(): c for c in encabezado if c is not None}
+    faltantes = [c for c in COLUMNAS if c not in nombres]
+    if faltantes:
+        raise ValueError(f"La columna '{faltantes[0]}' no se encontró en el archivo.")
+    return [nombres[c] for c in COLUMNAS]
+
+
+def _agregar_ids(ids, cedulas, estados):
+    """Agrega al conjunto las cédulas de los estudiantes con estado de continuidad."""
+    estados = estados.astype(str).str.strip().str.upper()
+    cedulas = cedulas[estados.isin(ESTADOS_CONTINUIDAD) & cedulas.notna()]
+    ids.update(cedulas.astype(str).str.strip().str.replace(r'\.0$', '', regex=True))
+
+
+def _ids_csv(archivo):
+    muestra = _muestra(archivo)
+    codificacion = detectar_codificacion(muestra)
+    texto = muestra.decode(codificacion, errors='replace')
+    separador = detectar_separador(texto)
+    cedula, estado = _ubicar_columnas(next(csv.reader(io.StringIO(texto), delimiter=separador), []))
+
+    # Lector en streaming de Arrow: tokeniza por bloques y solo convierte las dos columnas
+    lector = pacsv.open_csv(
+        _origen(archivo),
+        read_options=pacsv.ReadOptions(encoding=codificacion, block_size=TAMANO_BLOQUE_CSV),
+        parse_options=pacsv.ParseOptions(delimiter=separador),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=[cedula, estado], column_types={cedula: pa.string(), estado: pa.string()},
+        ),
+    )
+    continuidad = pa.array(sorted(ESTADOS_CONTINUIDAD))
+    ids = set()
+    for lote in lector:
+        estados = pc.utf8_upper(pc.utf8_trim_whitespace(lote.column(estado)))
+        cedulas = pc.utf8_trim_whitespace(pc.filter(lote.column(cedula), pc.is_in(estados, value_set=continuidad)))
+        cedulas = pc.replace_substring_regex(cedulas, pattern=r'\.0$', replacement='')
+        ids.update(cedulas.to_pylist())
+    ids.discard('')
+    ids.discard(None)
+    return ids
+
+
+def _ids_xlsx(archivo):
+    """Recorre la primera hoja en modo de solo lectura, tomando solo las dos columnas necesarias."""
+    libro = openpyxl.load_workbook(_origen(archivo), read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = list(next(filas, ()))
+        i_cedula, i_estado = (encabezado.index(c) for c in _ubicar_columnas(encabezado))
+
+        ids = set()
+        bloque = []
+        for fila in filas:
+            if len(fila) > max(i_cedula, i_estado):
+                bloque.append((fila[i_cedula], fila[i_estado]))
+            if len(bloque) == TAMANO_BLOQUE:
+                _agregar_ids_filas(ids, bloque)
+                bloque = []
+        _agregar_ids_filas(ids, bloque)
+        return ids
+    finally:
+        libro.close()
+
+
+def _agregar_ids_filas(ids, filas):
+    if filas:
+        df = pd.DataFrame.from_records(filas, columns=COLUMNAS)
+        _agregar_ids(ids, df['cedula'], df['est_alum'])
+
+
+def leer_ids_activos(archivo):
+    """
+    Conjunto de IDs (cédulas) con estado de continuidad (ACTIVO, EGRESADO o GRADUADO) de un
+    reporte .csv, .xlsx o .xls subido. Lanza ValueError si el formato no es soportado o faltan
+    las columnas `cedula` y `est_alum`.
+    """
+    nombre = archivo.name.lower()
+    if nombre.endswith('.csv'):
+        return _ids_csv(archivo)
+    if nombre.endswith('.xlsx'):
+        return _ids_xlsx(archivo)
+    if nombre.endswith('.xls'):
+        # Formato binario antiguo: openpyxl no lo lee; se usa pandas con las columnas justas
+        df = pd.read_excel(_origen(archivo), usecols=_columna, dtype=str)
+        cedula, estado = _ubicar_columnas(df.columns)
+        ids = set()
+        _agregar_ids(ids, df[cedula], df[estado])
+        return ids
+    raise ValueError("Formato de archivo no soportado. Por favor, sube un archivo .csv o .xlsx.")
@@ -0,0 +1,201 @@
+# core/lector_excel.py
+
+"""
+Lectura rápida de los reportes institucionales en .xlsx.
+
+pd.read_excel convierte cada celda de la hoja en un valor de pandas (incluidas las de las
+decenas de columnas que el proceso no usa) y arma todas las filas en memoria antes de inferir
+los tipos. Aquí la primera hoja se recorre en streaming con openpyxl en modo de solo lectura
+(`iter_rows(values_only=True)`): de cada fila se toman solo las columnas pedidas, cada valor se
+convierte como lo hace pandas sobre openpyxl (números enteros como int, celdas vacías) y los
+tipos de cada columna se infieren como en pd.read_excel: textos vacíos o 'NA' como faltantes,
+columnas numéricas (también las de textos numéricos) como int64 o float64, fechas como
+datetime64 y las demás como object. `leer_xlsx(path, usecols)` devuelve así el mismo DataFrame
+que `pd.read_excel(path, usecols=usecols)` en los reportes que llegan al sistema.
+
+Las celdas las lee siempre el parser XML de openpyxl, sin suponer el orden de sus atributos ni
+la ausencia de prefijos de espacio de nombres. Si openpyxl no puede abrir el libro como hoja de
+cálculo (o no tiene hojas), se usa pd.read_excel.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+# Textos que pd.read_excel toma como faltantes (los na_values por defecto de pandas)
+TEXTOS_FALTANTES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+# Errores de fórmula: openpyxl los entrega como texto y pandas como NaN
+ERRORES_EXCEL = frozenset({'#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A', '#GETTING_DATA'})
+TEXTOS_BOOLEANOS = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+
+class FormatoNoSoportado(Exception):
+    """El libro no se puede leer con el lector rápido; se lee con pd.read_excel."""
+
+
+def _valor(valor):
+    """Valor de una celda como lo entrega pandas sobre openpyxl ('' si está vacía)."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        entero = int(valor) if np.isfinite(valor) else None
+        return entero if entero == valor else valor
+    if isinstance(valor, str) and valor in ERRORES_EXCEL:
+        return np.nan
+    return valor
+
+
+def _es_faltante(valor):
+    if isinstance(valor, str):
+        return valor in TEXTOS_FALTANTES
+    return isinstance(valor, float) and np.isnan(valor)
+
+
+def _numero(valor):
+    """El valor como número (int o float), o None si no lo es, como lo convierte pandas."""
+    if isinstance(valor, (bool, np.bool_)):
+        return int(valor)
+    if isinstance(valor, (int, float, np.integer, np.floating)):
+        return valor
+    if isinstance(valor, str):
+        try:
+            return pd.to_numeric(valor)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _columna(valores):
+    """Serie de una columna con el tipo que le da pd.read_excel."""
+    faltantes = np.array([_es_faltante(v) for v in valores], dtype=bool)
+    presentes = [v for v, falta in zip(valores, faltantes) if not falta]
+
+    if all(isinstance(v, (bool, np.bool_)) for v in presentes) and presentes and not faltantes.any():
+        return pd.Series(presentes, dtype=bool)
+
+    numeros = [_numero(v) for v in presentes]
+    if all(n is not None for n in numeros):
+        serie = pd.Series(np.nan, index=range(len(valores)), dtype=float)
+        if not faltantes.any() and all(isinstance(n, (int, np.integer)) for n in numeros):
+            return pd.Series(numeros, dtype=np.int64)
+        serie[~faltantes] = np.array(numeros, dtype=float)
+        return serie
+
+    objetos = np.array(valores, dtype=object)
+    objetos[faltantes] = np.nan
+    if presentes and all(isinstance(v, (bool, np.bool_)) or (isinstance(v, str) and v in TEXTOS_BOOLEANOS) for v in presentes):
+        objetos[~faltantes] = [TEXTOS_BOOLEANOS.get(v, v) if isinstance(v, str) else v for v in presentes]
+        return pd.Series(objetos, dtype=object)
+    if presentes and all(isinstance(v, datetime) for v in presentes):
+        return pd.Series(pd.to_datetime(pd.Series(objetos)), dtype='datetime64[ns]')
+    if presentes and all(isinstance(v, timedelta) for v in presentes):
+        return pd.Series(pd.to_timedelta(pd.Series(objetos)), dtype='timedelta64[ns]')
+    return pd.Series(objetos, dtype=object)
+
+
+def _nombres(encabezado):
+    """Nombres de columna como los arma pandas: "Unnamed: i" sin encabezado y "X", "X.1" si se repiten."""
+    nombres = [nombre if nombre != '' else f"Unnamed: {i}" for i, nombre in enumerate(encabezado)]
+    vistos = {}
+    for i, nombre in enumerate(nombres):
+        repeticiones = vistos.get(nombre, 0)
+        while repeticiones > 0:
+            vistos[nombre] = repeticiones + 1
+            nombre = f"{nombre}.{repeticiones}"
+            repeticiones = vistos.get(nombre, 0)
+        nombres[i] = nombre
+        vistos[nombre] = repeticiones + 1
+    return nombres
+
+
+def _filas(path, usecols):
+    """
+    (nombres de las columnas pedidas, generador de listas con sus valores) de la primera hoja.
+    El generador incluye las filas intermedias sin valores en esas columnas (como listas de
+    ''), igual que pandas, y termina en la última fila con algún valor en cualquier columna.
+    """
+    try:
+        libro = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    except Exception as e:
+        raise FormatoNoSoportado(str(e)) from e
+    if not libro.worksheets:
+        libro.close()
+        raise FormatoNoSoportado("El libro no tiene hojas de cálculo.")
+    hoja = libro.worksheets[0]
+    # La dimensión declarada en el archivo puede ser incorrecta: pandas también la ignora
+    hoja.reset_dimensions()
+    filas = hoja.iter_rows(values_only=True)
+
+    encabezado = [_valor(v) for v in next(filas, ())]
+    while encabezado and encabezado[-1] == '':
+        encabezado.pop()
+    nombres = _nombres(encabezado)
+    indices = [i for i, nombre in enumerate(nombres) if usecols is None or usecols(nombre)]
+
+    def recorrer():
+        vacias = 0  # Filas sin valores pendientes de entregar: solo si después hay datos
+        try:
+            for fila in filas:
+                if all(v is None or v == '' for v in fila):
+                    vacias += 1
+                    continue
+                for _ in range(vacias):
+                    yield [''] * len(indices)
+                vacias = 0
+                yield [_valor(fila[i]) if i < len(fila) else '' for i in indices]
+        finally:
+            libro.close()
+
+    return [nombres[i] for i in indices], recorrer()
+
+
+def _a_dataframe(nombres, filas):
+    if not nombres:
+        return pd.DataFrame()
+    columnas = list(zip(*filas)) if filas else [()] * len(nombres)
+    return pd.DataFrame({nombre: _columna(list(valores)) for nombre, valores in zip(nombres, columnas)})
+
+
+def leer_xlsx(path, usecols=None):
+    """
+    Primera hoja de un .xlsx como DataFrame, igual que pd.read_excel(path, usecols=usecols).
+    `usecols` es None (todas las columnas) o una función que recibe el nombre de cada columna.
+    """
+    try:
+        nombres, filas = _filas(path, usecols)
+    except FormatoNoSoportado:
+        return pd.read_excel(path, usecols=usecols)
+    return _a_dataframe(nombres, list(filas))
+
+
+def leer_xlsx_por_bloques(path, tamano_bloque, usecols=None):
+    """
+    Itera sobre la primera hoja en DataFrames de como máximo `tamano_bloque` filas, con solo las
+    columnas pedidas. Se omiten las filas sin ningún valor en esas columnas.
+    """
+    try:
+        nombres, filas = _filas(path, usecols)
+    except FormatoNoSoportado:
+        yield from _bloques(pd.read_excel(path, usecols=usecols).dropna(how='all'), tamano_bloque)
+        return
+
+    bloque = []
+    for valores in filas:
+        if all(v == '' for v in valores):
+            continue
+        bloque.append(valores)
+        if len(bloque) == tamano_bloque:
+            yield _a_dataframe(nombres, bloque)
+            bloque = []
+    if bloque:
+        yield _a_dataframe(nombres, bloque)
+
+
+def _bloques(df, tamano_bloque):
+    for inicio in range(0, len(df), tamano_bloque):
+        yield df.iloc[inicio:inicio + tamano_bloque].reset_index(drop=True)
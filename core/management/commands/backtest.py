@@ -0,0 +1,40 @@
+# core/management/commands/backtest.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.backtest import ejecutar_backtest, pares_consecutivos
+
+
+class Command(BaseCommand):
+    help = (
+        "Evalúa el riesgo guardado de cada periodo contra los estudiantes que reaparecen en el "
+        "periodo siguiente y guarda las métricas por periodo y por programa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodos', nargs='+',
+            help="Periodos a evaluar (cada uno contra su siguiente). Por defecto, todos los pares consecutivos.",
+        )
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU).")
+        parser.add_argument('--umbral', type=float, default=None, help="Umbral de riesgo (por defecto, UMBRAL_PREDICCION).")
+
+    def handle(self, *args, **options):
+        if not pares_consecutivos():
+            self.stdout.write("Se necesitan al menos dos periodos cargados para el backtest.")
+            return
+
+        inicio = time.perf_counter()
+        totales = ejecutar_backtest(options['periodos'], options['procesos'], options['umbral'])
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(f"{'Periodo':<16}{'Estudiantes':>12}{'Desertores':>12}{'Precisión':>11}{'Recall':>9}{'F1':>8}{'ROC-AUC':>9}")
+        for fila in totales:
+            roc_auc = f"{fila.roc_auc:.3f}" if fila.roc_auc is not None else '-'
+            self.stdout.write(
+                f"{fila.periodo + ' -> ' + fila.periodo_siguiente:<16}{fila.total_estudiantes:>12}{fila.desertores:>12}"
+                f"{fila.precision:>11.1%}{fila.recall:>9.1%}{fila.f1:>8.3f}{roc_auc:>9}"
+            )
+        self.stdout.write(f"{len(totales)} periodo(s) evaluado(s) en {duracion:.2f} s.")
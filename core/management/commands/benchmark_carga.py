@@ -0,0 +1,92 @@
+# core/management/commands/benchmark_carga.py
+
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from core.models import EstudiantePeriodo
+from core.services import guardar_estudiantes_en_bloque
+
+
+def generar_periodo_sintetico(num_filas, semilla=0):
+    """Crea un DataFrame con la misma forma que `df_new` justo antes de guardarse."""
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'id_estudiante': [str(1000000 + i) for i in range(num_filas)],
+        'promedio_semestral': rng.uniform(0, 5, num_filas).round(2),
+        'num_materias_cursadas': rng.integers(1, 8, num_filas),
+        'num_materias_reprobadas': rng.integers(0, 4, num_filas),
+        'edad': rng.integers(16, 45, num_filas),
+        'genero': rng.choice(['Femenino', 'Masculino'], num_filas),
+        'num_est_economico': rng.integers(1, 6, num_filas),
+        'etnia': rng.choice(['blanca', 'mestiza', 'negra', 'indigena'], num_filas),
+        'estado_civil': rng.choice(['Soltero', 'Casado', 'Union_libre'], num_filas),
+        'programa': rng.choice(['SISTEMAS', 'DERECHO', 'CONTADURIA', 'PSICOLOGIA'], num_filas),
+        'periodo_ingreso': rng.choice(['2022A', '2022B', '2023A', '2023B'], num_filas),
+        'es_foraneo': rng.integers(0, 2, num_filas),
+        'experiencia_laboral': rng.integers(-1, 2, num_filas),
+        'num_grupo_fam': rng.integers(1, 8, num_filas),
+        'posicion_hermanos': rng.integers(1, 5, num_filas),
+        'est_alum': 'ACTIVO',
+        'discapacidad': rng.choice(['NINGUNA', 'VISUAL', None], num_filas),
+        'pago_tardio': rng.integers(0, 2, num_filas),
+        'dias_retraso_pago': rng.integers(0, 90, num_filas),
+        'diferencia_promedio_anterior': 0,
+        'antiguedad_estudiante': rng.integers(1, 10, num_filas),
+        'ultima_prob_riesgo': rng.uniform(0, 1, num_filas),
+    })
+
+
+def guardar_fila_a_fila(df, periodo):
+    """Ruta de guardado anterior: un update_or_create (y su commit) por estudiante."""
+    model_fields = [field.name for field in EstudiantePeriodo._meta.get_fields()]
+    for _, row in df.iterrows():
+        defaults_data = {key: value for key, value in row.to_dict().items() if key in model_fields}
+        EstudiantePeriodo.objects.update_or_create(
+            id_estudiante=row['id_estudiante'],
+            periodo=periodo,
+            defaults=defaults_data
+        )
+
+
+class Command(BaseCommand):
+    help = "Compara el guardado fila a fila contra el upsert por lotes de EstudiantePeriodo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10000, 50000, 200000])
+        parser.add_argument('--tamano-lote', type=int, default=None)
+        parser.add_argument('--periodo', default='BENCH', help="Periodo temporal usado para la prueba; se borra al terminar.")
+        parser.add_argument('--sin-fila-a-fila', action='store_true', help="Omite la ruta fila a fila (muy lenta con muchas filas).")
+
+    def handle(self, *args, **options):
+        periodo = options['periodo']
+        if EstudiantePeriodo.objects.filter(periodo=periodo).exists():
+            self.stderr.write(f"El periodo '{periodo}' ya tiene datos; usa otro valor de --periodo.")
+            return
+
+        self.stdout.write(f"{'filas':>8} {'ruta':>12} {'insertar (s)':>13} {'actualizar (s)':>15} {'filas/s':>10}")
+        try:
+            for num_filas in options['filas']:
+                df = generar_periodo_sintetico(num_filas)
+                rutas = [('lotes', lambda d: guardar_estudiantes_en_bloque(d, periodo, options['tamano_lote']))]
+                if not options['sin_fila_a_fila']:
+                    rutas.insert(0, ('fila_a_fila', lambda d: guardar_fila_a_fila(d, periodo)))
+
+                for nombre, guardar in rutas:
+                    EstudiantePeriodo.objects.filter(periodo=periodo).delete()
+                    # Primera pasada: todas las filas son nuevas (INSERT)
+                    inicio = time.perf_counter()
+                    guardar(df)
+                    t_insertar = time.perf_counter() - inicio
+                    # Segunda pasada: todas las filas existen (UPDATE), como en un reprocesamiento
+                    inicio = time.perf_counter()
+                    guardar(df)
+                    t_actualizar = time.perf_counter() - inicio
+
+                    self.stdout.write(
+                        f"{num_filas:>8} {nombre:>12} {t_insertar:>13.2f} {t_actualizar:>15.2f} {num_filas / t_insertar:>10.0f}"
+                    )
+        finally:
+            EstudiantePeriodo.objects.filter(periodo=periodo).delete()
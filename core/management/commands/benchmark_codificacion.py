@@ -0,0 +1,44 @@
+# core/management/commands/benchmark_codificacion.py
+
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from core.management.commands.benchmark_carga import generar_periodo_sintetico
+from core.predictions import PredictionService
+
+
+def codificar_con_get_dummies(datos, columnas_modelo):
+    """Codificación anterior: DataFrame de una fila, get_dummies y reindex."""
+    df_pred = pd.get_dummies(pd.DataFrame([datos]), drop_first=True)
+    return df_pred.reindex(columns=columnas_modelo, fill_value=0)
+
+
+class Command(BaseCommand):
+    help = "Mide el costo por fila de codificar las features del modelo (get_dummies contra el codificador precompilado)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=2000)
+
+    def medir(self, nombre, funcion, repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        total = time.perf_counter() - inicio
+        self.stdout.write(f"{nombre:<35} {total * 1e6 / repeticiones:>12.2f} µs/fila")
+
+    def handle(self, *args, **options):
+        paquete = PredictionService.paquete_activo()
+        if paquete is None:
+            self.stderr.write("El modelo de predicción no está disponible.")
+            return
+
+        columnas = paquete.columnas
+        codificador = paquete.codificador
+        df = generar_periodo_sintetico(options['filas'])
+        registros = df.to_dict('records')
+        n = len(registros)
+
+        self.medir("get_dummies + reindex (por fila)", lambda: [codificar_con_get_dummies(r, columnas) for r in registros], n)
+        self.medir("codificador.codificar_fila", lambda: [codificador.codificar_fila(r) for r in registros], n)
+        self.medir("codificador.codificar_frame (lote)", lambda: codificador.codificar_frame(df), n)
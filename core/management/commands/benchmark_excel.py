@@ -0,0 +1,83 @@
+# core/management/commands/benchmark_excel.py
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from core import instrumentacion, lector_excel
+from core.services import COLUMNAS_REPORTES, filtro_columnas
+
+
+def escribir_caracterizacion_xlsx(ruta, num_filas, columnas_extra=15, semilla=0):
+    """
+    Reporte de caracterización sintético en .xlsx: las columnas que usa el proceso más
+    `columnas_extra` columnas que no usa, como los reportes que exporta registro académico.
+    """
+    rng = np.random.default_rng(semilla)
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append([
+        'Cedula', 'Edad', 'Genero', 'Num_Est_Economico', 'Etnia', 'Estado_Civil', 'Programa',
+        'Periodo_Ingreso', 'Lugar_Residencia', 'Experiencia_Laboral', 'Num_Grupo_Fam',
+        'Posicion_Hermanos', 'Est_Alum', *[f'Dato_Adicional_{i}' for i in range(columnas_extra)],
+    ])
+    edades = rng.integers(16, 45, num_filas).tolist()
+    programas = rng.choice(['SISTEMAS', 'DERECHO', 'CONTADURIA', 'PSICOLOGIA'], num_filas).tolist()
+    estados = rng.choice(['ACTIVO', 'ACTIVO', 'ACTIVO', 'GRADUADO'], num_filas).tolist()
+    montos = rng.uniform(0, 1e6, num_filas).round(2).tolist()
+    for i in range(num_filas):
+        extra = [montos[i] if j % 3 == 0 else (f'OBS {i}' if j % 3 == 1 else i) for j in range(columnas_extra)]
+        hoja.append([
+            1000000 + i, edades[i], 'Femenino' if i % 2 else 'Masculino', i % 5 + 1, 'mestiza', 'Soltero',
+            programas[i], '2023A', 'CALI' if i % 4 else 'PALMIRA', 'SI' if i % 3 else None, i % 7 + 1,
+            i % 4 + 1, estados[i], *extra,
+        ])
+    libro.save(ruta)
+
+
+def _memoria_mb():
+    return instrumentacion.memoria_pico_proceso() / 1024 ** 2
+
+
+class Command(BaseCommand):
+    help = "Compara pd.read_excel contra el lector rápido de .xlsx sobre un reporte de caracterización."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=200000)
+        parser.add_argument('--archivo', help="Usa este .xlsx en lugar de generar uno sintético.")
+        parser.add_argument('--sin-pandas', action='store_true', help="Omite pd.read_excel (tarda minutos con 200k filas).")
+
+    def handle(self, *args, **options):
+        # Sin ru_maxrss (Windows) el pico se mide con tracemalloc, que hace más lentas ambas lecturas
+        if instrumentacion.resource is None:
+            tracemalloc.start()
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = options['archivo']
+            if not ruta:
+                ruta = os.path.join(directorio, 'caracterizacion.xlsx')
+                inicio = time.perf_counter()
+                escribir_caracterizacion_xlsx(ruta, options['filas'])
+                self.stdout.write(f"Libro de {options['filas']} filas generado en {time.perf_counter() - inicio:.1f} s.")
+            self.stdout.write(f"Tamaño: {os.path.getsize(ruta) / 1024 ** 2:.1f} MB")
+
+            usecols = filtro_columnas(COLUMNAS_REPORTES['caracterizacion'])
+            # El lector rápido va primero: el pico de memoria del proceso solo crece, así que el de
+            # pd.read_excel incluye también el del lector rápido
+            inicio = time.perf_counter()
+            rapido = lector_excel.leer_xlsx(ruta, usecols)
+            t_rapido = time.perf_counter() - inicio
+            self.stdout.write(f"{'lector rápido':<28} {t_rapido:>8.2f} s  pico {_memoria_mb():>7.0f} MB  {rapido.shape}")
+
+            if not options['sin_pandas']:
+                inicio = time.perf_counter()
+                completo = pd.read_excel(ruta, usecols=usecols)
+                t_pandas = time.perf_counter() - inicio
+                self.stdout.write(f"{'pd.read_excel(usecols)':<28} {t_pandas:>8.2f} s  pico {_memoria_mb():>7.0f} MB  {completo.shape}")
+                pd.testing.assert_frame_equal(rapido, completo)
+                self.stdout.write(f"Mismo DataFrame; {t_pandas / t_rapido:.1f}x más rápido.")
@@ -0,0 +1,100 @@
+# core/management/commands/benchmark_prediccion.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.management.commands.benchmark_carga import generar_periodo_sintetico
+from core.models import EstudiantePeriodo
+from core.predictions import PredictionService
+
+
+def estudiantes_en_memoria(num_filas):
+    """Registros sin guardar (sin pk), para medir solo la predicción y no la escritura en la BD."""
+    campos = {field.name for field in EstudiantePeriodo._meta.concrete_fields}
+    df = generar_periodo_sintetico(num_filas)
+    return [
+        EstudiantePeriodo(periodo='BENCH', **{k: v for k, v in fila.items() if k in campos})
+        for fila in df.to_dict('records')
+    ]
+
+
+def predecir_sin_reutilizar(estudiante):
+    # Se descarta el riesgo guardado para que cada petición llame al modelo
+    estudiante.ultima_prob_riesgo = None
+    inicio = time.perf_counter()
+    PredictionService.predict_estudiante(estudiante)
+    return time.perf_counter() - inicio
+
+
+async def apredecir_sin_reutilizar(estudiante):
+    estudiante.ultima_prob_riesgo = None
+    inicio = time.perf_counter()
+    await PredictionService.apredict_estudiante(estudiante)
+    return time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = "Mide latencia (p50/p99) y throughput de la predicción en línea con y sin micro-batching."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=4000)
+        parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 16, 64])
+        parser.add_argument('--espera-ms', type=float, nargs='+', default=[0, 2])
+        parser.add_argument('--tamano-maximo', type=int, default=64)
+
+    def medir_hilos(self, estudiantes, concurrencia):
+        """Peticiones síncronas desde un pool de hilos, como los workers con hilos de WSGI."""
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            latencias = list(pool.map(predecir_sin_reutilizar, estudiantes))
+        return latencias, time.perf_counter() - inicio
+
+    def medir_async(self, estudiantes, concurrencia):
+        """Peticiones en un event loop con `concurrencia` corrutinas en vuelo, como bajo ASGI."""
+        async def principal():
+            semaforo = asyncio.Semaphore(concurrencia)
+
+            async def una(estudiante):
+                async with semaforo:
+                    return await apredecir_sin_reutilizar(estudiante)
+
+            return await asyncio.gather(*(una(e) for e in estudiantes))
+
+        inicio = time.perf_counter()
+        latencias = asyncio.run(principal())
+        return latencias, time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        if PredictionService.paquete_activo() is None:
+            self.stderr.write("El modelo de predicción no está disponible.")
+            return
+
+        estudiantes = estudiantes_en_memoria(options['peticiones'])
+        self.stdout.write(
+            f"{'modo':<6} {'concurrencia':>12} {'micro-batch':>14} {'p50 ms':>9} {'p99 ms':>9} {'pred/s':>10}"
+        )
+        # Sin micro-batching y luego con cada ventana de espera indicada
+        variantes = [(False, 0)] + [(True, espera) for espera in options['espera_ms']]
+        for modo, medir in (('wsgi', self.medir_hilos), ('asgi', self.medir_async)):
+            for concurrencia in options['concurrencia']:
+                for activo, espera in variantes:
+                    with override_settings(
+                        MICROBATCH_ACTIVO=activo,
+                        MICROBATCH_ESPERA_MAXIMA_MS=espera,
+                        MICROBATCH_TAMANO_MAXIMO=options['tamano_maximo'],
+                    ):
+                        PredictionService._batcher = None
+                        latencias, total = medir(estudiantes, concurrencia)
+                    latencias = np.array(latencias) * 1000
+                    etiqueta = f"sí ({espera:g} ms)" if activo else 'no'
+                    self.stdout.write(
+                        f"{modo:<6} {concurrencia:>12} {etiqueta:>14} "
+                        f"{np.percentile(latencias, 50):>9.2f} {np.percentile(latencias, 99):>9.2f} "
+                        f"{len(estudiantes) / total:>10.0f}"
+                    )
+        PredictionService._batcher = None
@@ -0,0 +1,257 @@
+# core/management/commands/benchmark_sipde.py
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import django
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import busqueda, datos_sinteticos, instrumentacion, paginacion
+from core.models import EstudiantePeriodo, PeriodoResumen
+from core.predictions import PredictionService
+from core.services import procesar_y_guardar_datos_de_periodo
+
+USUARIO = 'benchmark_sipde'
+
+
+def _memoria_mb():
+    return instrumentacion.memoria_pico_proceso() / 1024 ** 2
+
+
+def _commit():
+    """Commit actual del repositorio (con '+' si hay cambios sin confirmar), o None."""
+    try:
+        def git(*args):
+            return subprocess.run(
+                ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        return git('rev-parse', '--short', 'HEAD') + ('+' if git('status', '--porcelain', '--untracked-files=no') else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _Cronometro:
+    """Callback de progreso de la carga que anota cuándo empieza cada etapa."""
+
+    def __init__(self):
+        self.marcas = []
+
+    def __call__(self, etapa, porcentaje, filas=None):
+        self.marcas.append((etapa, time.perf_counter()))
+
+    def etapas(self, fin):
+        """{etapa: segundos}: cada etapa dura hasta que empieza la siguiente (la última, hasta `fin`)."""
+        fines = [instante for _, instante in self.marcas[1:]] + [fin]
+        return {etapa: round(t_fin - inicio, 4) for (etapa, inicio), t_fin in zip(self.marcas, fines)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la carga de un periodo (por etapa), el puntaje del modelo y las vistas principales con "
+        "reportes sintéticos de distintos tamaños, y guarda los resultados en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, nargs='+', default=[1000, 10000, 100000, 500000])
+        parser.add_argument('--formato', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--periodo', default='2099A', help="Periodo temporal usado para la prueba; se borra al terminar.")
+        parser.add_argument('--repeticiones', type=int, default=5, help="Mediciones de cada vista con la caché llena.")
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto benchmark_<commit>_<fecha>.json).")
+        parser.add_argument('--comparar', help="JSON de una medición anterior; muestra la razón entre ambas.")
+
+    def handle(self, *args, **options):
+        periodo = options['periodo']
+        if EstudiantePeriodo.objects.filter(periodo=periodo).exists() or PeriodoResumen.objects.filter(periodo=periodo).exists():
+            raise CommandError(f"El periodo '{periodo}' ya tiene datos; usa otro valor de --periodo.")
+        if periodo != max([periodo, *PeriodoResumen.objects.values_list('periodo', flat=True)]):
+            # La lista de estudiantes muestra siempre el periodo más reciente
+            raise CommandError(f"El periodo '{periodo}' debe ser posterior a todos los periodos cargados.")
+
+        commit = _commit()
+        resultados = {
+            'commit': commit,
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'formato': options['formato'],
+            'semilla': options['semilla'],
+            'tamanos': [],
+        }
+
+        usuario = get_user_model().objects.create_user(USUARIO, password=USUARIO)
+        try:
+            for num_estudiantes in sorted(options['estudiantes']):
+                self.stdout.write(f"\n== {num_estudiantes} estudiantes ==")
+                resultado = self._medir_tamano(num_estudiantes, periodo, usuario, options)
+                resultados['tamanos'].append(resultado)
+                self._limpiar(periodo)
+        finally:
+            self._limpiar(periodo)
+            usuario.delete()
+
+        salida = options['salida'] or (
+            f"benchmark_{commit or 'sin_commit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+        )
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(f"\nResultados guardados en {salida}")
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                self._comparar(json.load(archivo), resultados)
+
+    def _limpiar(self, periodo):
+        EstudiantePeriodo.objects.filter(periodo=periodo).delete()
+        PeriodoResumen.objects.filter(periodo=periodo).delete()
+        busqueda.indexar_periodo(periodo)
+        cache.clear()
+
+    def _medir_tamano(self, num_estudiantes, periodo, usuario, options):
+        resultado = {'estudiantes': num_estudiantes}
+        with tempfile.TemporaryDirectory() as directorio:
+            inicio = time.perf_counter()
+            reportes = datos_sinteticos.generar_reportes(num_estudiantes, periodo, options['semilla'])
+            resultado['filas_reportes'] = {nombre: len(df) for nombre, df in reportes.items()}
+            rutas = {}
+            for nombre, df in reportes.items():
+                rutas[nombre] = os.path.join(directorio, f"{nombre}.{options['formato']}")
+                try:
+                    datos_sinteticos.escribir_reporte(df, rutas[nombre])
+                except ValueError as e:
+                    raise CommandError(f"{num_estudiantes} estudiantes: {e}")
+            del reportes
+            self.stdout.write(f"Reportes generados en {time.perf_counter() - inicio:.1f} s.")
+            resultado['bytes_reportes'] = {nombre: os.path.getsize(ruta) for nombre, ruta in rutas.items()}
+
+            # Carga: sin la caché de reportes, para medir también la lectura de los archivos
+            cronometro = _Cronometro()
+            instrumentacion.reiniciar()
+            inicio = time.perf_counter()
+            with override_settings(CACHE_REPORTES_ACTIVA=False), contextlib.redirect_stdout(io.StringIO()):
+                cambios = procesar_y_guardar_datos_de_periodo(rutas, periodo, reportar_progreso=cronometro)
+            fin = time.perf_counter()
+            if not cambios:
+                raise CommandError(f"La carga de {num_estudiantes} estudiantes falló.")
+            resultado['carga'] = {'total': round(fin - inicio, 4), 'etapas': cronometro.etapas(fin)}
+            # Con la instrumentación activa, también las etapas internas con sus filas y memoria pico
+            resultado['carga']['instrumentacion'] = [
+                {
+                    'etapa': m['etapa'], 'etiquetas': m['etiquetas'], 'segundos': round(m['segundos'], 4),
+                    'filas': m['filas'], 'memoria_pico_mb': round(m['memoria_pico'] / 1024 ** 2, 1),
+                }
+                for m in instrumentacion.resumen()
+            ]
+            resultado['filas_guardadas'] = EstudiantePeriodo.objects.filter(periodo=periodo).count()
+            self._mostrar('carga', resultado['carga']['total'])
+            for etapa, segundos in resultado['carga']['etapas'].items():
+                self._mostrar(f"  {etapa}", segundos)
+
+        # Puntaje del modelo sobre el periodo completo, ya leído de la BD
+        df = pd.DataFrame.from_records(EstudiantePeriodo.objects.filter(periodo=periodo).values())
+        inicio = time.perf_counter()
+        PredictionService.predict_frame(df)
+        resultado['puntaje'] = round(time.perf_counter() - inicio, 4)
+        self._mostrar('puntaje', resultado['puntaje'])
+        del df
+
+        resultado['vistas'] = self._medir_vistas(num_estudiantes, periodo, usuario, options)
+        resultado['memoria_pico_mb'] = round(_memoria_mb(), 1)
+        return resultado
+
+    def _medir_vistas(self, num_estudiantes, periodo, usuario, options):
+        """
+        Tiempo de cada vista con la caché de vistas vacía ('fria') y la mediana de
+        `repeticiones` peticiones con la caché llena ('caliente'), y las consultas SQL de la
+        última petición.
+        """
+        estudiantes = EstudiantePeriodo.objects.filter(periodo=periodo).order_by(*paginacion.ORDEN)
+        medio = estudiantes[estudiantes.count() // 2]
+        lista = reverse('lista_estudiantes')
+        activos = datos_sinteticos.generar_activos(num_estudiantes, semilla=options['semilla'])
+        csv_activos = activos.to_csv(sep=';', index=False).encode('latin1')
+
+        def validar(cliente):
+            archivo = SimpleUploadedFile('activos.csv', csv_activos, content_type='text/csv')
+            return cliente.post(reverse('validacion'), {'periodo_prediccion': periodo, 'archivo_activos': archivo})
+
+        vistas = {
+            'dashboard': lambda c: c.get(reverse('dashboard'), {'periodo': periodo}),
+            'lista_primera_pagina': lambda c: c.get(lista),
+            'lista_pagina_media': lambda c: c.get(lista, {'despues': paginacion.codificar_cursor(medio)}),
+            'lista_ultima_pagina': lambda c: c.get(lista, {'antes': paginacion.ULTIMA}),
+            'exportacion_csv': lambda c: c.get(lista, {'export': 'csv'}),
+            'detalle': lambda c: c.get(reverse('detalle_estudiante', args=[medio.id_estudiante])),
+            'validacion': validar,
+        }
+
+        tiempos = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            cliente = Client()
+            cliente.force_login(usuario)
+            for nombre, peticion in vistas.items():
+                cache.clear()
+                mediciones = []
+                for _ in range(1 + options['repeticiones']):
+                    inicio = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        respuesta = peticion(cliente)
+                        if respuesta.streaming:
+                            b''.join(respuesta.streaming_content)
+                    mediciones.append(time.perf_counter() - inicio)
+                    if respuesta.status_code not in (200, 302):
+                        raise CommandError(f"La vista '{nombre}' respondió {respuesta.status_code}.")
+                tiempos[nombre] = {
+                    'fria': round(mediciones[0], 4),
+                    'caliente': round(statistics.median(mediciones[1:]), 4) if mediciones[1:] else None,
+                    'consultas': respuesta.wsgi_request.consultas_sql.conteo,
+                }
+                self._mostrar(nombre, tiempos[nombre]['fria'], tiempos[nombre]['caliente'])
+        return tiempos
+
+    def _mostrar(self, nombre, segundos, caliente=None):
+        linea = f"{nombre:<52} {segundos:>9.3f} s"
+        if caliente is not None:
+            linea += f"  (caché llena {caliente:.3f} s)"
+        self.stdout.write(linea)
+
+    def _comparar(self, anterior, actual):
+        """Razón actual/anterior de cada medición presente en ambos archivos (>1 es más lento)."""
+        def aplanar(tamano):
+            valores = {'carga': tamano['carga']['total'], 'puntaje': tamano['puntaje']}
+            valores.update({f"carga: {etapa}": s for etapa, s in tamano['carga']['etapas'].items()})
+            for vista, t in tamano['vistas'].items():
+                valores.update({f"{vista} ({estado})": s for estado, s in t.items() if s is not None})
+            return valores
+
+        previos = {t['estudiantes']: aplanar(t) for t in anterior['tamanos']}
+        self.stdout.write(f"\nComparación con {anterior.get('commit')} (actual / anterior):")
+        for tamano in actual['tamanos']:
+            if tamano['estudiantes'] not in previos:
+                continue
+            self.stdout.write(f"-- {tamano['estudiantes']} estudiantes")
+            previo = previos[tamano['estudiantes']]
+            for nombre, segundos in aplanar(tamano).items():
+                if previo.get(nombre):
+                    razon = segundos / previo[nombre]
+                    marca = '  <-- más lento' if razon > 1.2 else ''
+                    self.stdout.write(f"{nombre:<52} {previo[nombre]:>9.3f} -> {segundos:>9.3f}  x{razon:.2f}{marca}")
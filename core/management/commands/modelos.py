@@ -0,0 +1,74 @@
+# core/management/commands/modelos.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.modelos import ErrorModelo, RegistroModelos
+from core.predictions import PredictionService
+from core.services import reevaluar_predicciones_obsoletas
+
+
+class Command(BaseCommand):
+    help = "Administra el registro de modelos de predicción: listar, registrar, promover y fijar candidata."
+
+    def add_arguments(self, parser):
+        acciones = parser.add_subparsers(dest='accion', required=True)
+
+        acciones.add_parser('listar', help="Muestra las versiones registradas.")
+
+        registrar = acciones.add_parser('registrar', help="Registra un modelo y sus columnas como nueva versión.")
+        registrar.add_argument('modelo', help="Ruta al archivo .json del modelo XGBoost.")
+        registrar.add_argument('columnas', help="Ruta al archivo .pkl con las columnas del modelo.")
+        registrar.add_argument('--etiqueta', default='')
+
+        promover = acciones.add_parser('promover', help="Activa una versión registrada.")
+        promover.add_argument('version')
+        promover.add_argument(
+            '--reevaluar', action='store_true',
+            help="Recalcula después el riesgo guardado con la versión anterior.",
+        )
+
+        candidata = acciones.add_parser('candidata', help="Fija la versión que se puntúa en sombra junto a la activa.")
+        candidata.add_argument('version', nargs='?', help="Omitir para quitar la candidata actual.")
+
+    def handle(self, *args, **options):
+        registro = RegistroModelos()
+        try:
+            getattr(self, f"accion_{options['accion']}")(registro, options)
+        except ErrorModelo as e:
+            raise CommandError(str(e))
+
+    def accion_listar(self, registro, options):
+        datos = registro.leer()
+        if not datos.get('versiones'):
+            self.stdout.write("No hay versiones registradas; se usa el modelo de la raíz de ml_models/.")
+        for version, entrada in datos.get('versiones', {}).items():
+            marcas = []
+            if version == datos.get('activa'):
+                marcas.append('activa')
+            if version == datos.get('candidata'):
+                marcas.append('candidata')
+            self.stdout.write(
+                f"{version}  {entrada.get('fecha_registro', '')}  {entrada.get('etiqueta', '')}"
+                f"{'  [' + ', '.join(marcas) + ']' if marcas else ''}"
+            )
+
+    def accion_registrar(self, registro, options):
+        version = registro.registrar(options['modelo'], options['columnas'], options['etiqueta'])
+        self.stdout.write(f"Versión {version} registrada.")
+
+    def accion_promover(self, registro, options):
+        PredictionService.promover(options['version'])
+        self.stdout.write(
+            f"Versión {options['version']} activa. Los procesos en ejecución la adoptarán en "
+            f"la próxima verificación del registro."
+        )
+        if options['reevaluar']:
+            resultado = reevaluar_predicciones_obsoletas()
+            self.stdout.write(f"{resultado['reevaluados']} de {resultado['evaluados']} predicciones recalculadas.")
+
+    def accion_candidata(self, registro, options):
+        registro.fijar_candidata(options['version'])
+        if options['version']:
+            self.stdout.write(f"Versión {options['version']} fijada como candidata.")
+        else:
+            self.stdout.write("Candidata retirada.")
@@ -0,0 +1,39 @@
+# core/management/commands/procesar_lotes.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import procesar_cola, reencolar_lotes_interrumpidos
+from core.predictions import PredictionService
+
+
+class Command(BaseCommand):
+    help = "Worker que procesa en segundo plano los lotes de carga encolados desde el admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help="Vacía la cola y termina en lugar de quedarse esperando.")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos entre consultas a la cola cuando está vacía.")
+        parser.add_argument(
+            '--recuperar', action='store_true',
+            help="Reencola los lotes que quedaron en 'Procesando' (usar solo con un único worker).",
+        )
+
+    def handle(self, *args, **options):
+        PredictionService.precargar()
+        if options['recuperar']:
+            reencolados = reencolar_lotes_interrumpidos()
+            self.stdout.write(f"{reencolados} lote(s) interrumpido(s) devueltos a la cola.")
+
+        if options['una_vez']:
+            procesados = procesar_cola()
+            self.stdout.write(f"{procesados} lote(s) procesado(s).")
+            return
+
+        self.stdout.write("Esperando lotes en cola (Ctrl+C para detener)...")
+        try:
+            while True:
+                if procesar_cola() == 0:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido.")
@@ -0,0 +1,19 @@
+# core/management/commands/reevaluar_riesgo.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import reevaluar_predicciones_obsoletas
+
+
+class Command(BaseCommand):
+    help = "Recalcula el riesgo de los estudiantes cuya predicción guardada es de otro modelo o de features distintas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', help="Limita la reevaluación a un periodo (por defecto, todos).")
+        parser.add_argument('--tamano-lote', type=int, default=None)
+
+    def handle(self, *args, **options):
+        resultado = reevaluar_predicciones_obsoletas(options['periodo'], options['tamano_lote'])
+        if 'error' in resultado:
+            raise CommandError(resultado['error'])
+        self.stdout.write(f"{resultado['reevaluados']} de {resultado['evaluados']} predicciones recalculadas.")
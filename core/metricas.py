@@ -0,0 +1,164 @@
+# core/metricas.py
+
+"""
+Métricas de clasificación sobre arreglos de NumPy, para validar las predicciones de riesgo.
+
+`y` es 1 si el estudiante desertó y 0 si continuó; `p` es la probabilidad de riesgo. Todas
+las funciones trabajan en una sola pasada vectorizada (un ordenamiento y sumas acumuladas),
+sin recorrer estudiantes en Python.
+"""
+
+import numpy as np
+
+
+def _division(a, b):
+    """a / b elemento a elemento, con 0 donde b es 0."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b > 0)
+
+
+def matriz_confusion(y, p, umbral):
+    prediccion = p >= umbral
+    real = y.astype(bool)
+    return {
+        'tp': int(np.count_nonzero(prediccion & real)),
+        'fp': int(np.count_nonzero(prediccion & ~real)),
+        'fn': int(np.count_nonzero(~prediccion & real)),
+        'tn': int(np.count_nonzero(~prediccion & ~real)),
+    }
+
+
+def barrido_umbrales(y, p):
+    """
+    Precisión, recall y F1 usando como umbral cada probabilidad distinta. Devuelve arreglos
+    ordenados de mayor a menor umbral, junto con TP y FP acumulados (base de ROC y PR).
+    """
+    orden = np.argsort(-p, kind='mergesort')
+    p_ordenado = p[orden]
+    y_ordenado = y[orden]
+
+    # Último índice de cada probabilidad distinta: ahí se evalúa el umbral p >= valor
+    cortes = np.r_[np.flatnonzero(np.diff(p_ordenado)), len(p_ordenado) - 1]
+    tp = np.cumsum(y_ordenado)[cortes]
+    fp = (cortes + 1) - tp
+    positivos = int(y.sum())
+
+    precision = _division(tp, tp + fp)
+    recall = _division(tp, positivos)
+    f1 = _division(2 * precision * recall, precision + recall)
+    return {
+        'umbrales': p_ordenado[cortes],
+        'tp': tp,
+        'fp': fp,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+    }
+
+
+def roc_auc(barrido, positivos, negativos):
+    if positivos == 0 or negativos == 0:
+        return None
+    tpr = np.r_[0, barrido['tp'] / positivos]
+    fpr = np.r_[0, barrido['fp'] / negativos]
+    return float(np.trapezoid(tpr, fpr))
+
+
+def pr_auc(barrido):
+    """Área bajo la curva precisión-recall como precisión promedio (average precision)."""
+    if not len(barrido['recall']) or barrido['recall'][-1] == 0:
+        return None
+    incrementos = np.diff(np.r_[0, barrido['recall']])
+    return float(np.sum(incrementos * barrido['precision']))
+
+
+def calibracion(y, p, bins=10):
+    """Por cada intervalo de probabilidad: estudiantes, probabilidad media y tasa real de deserción."""
+    indices = np.minimum((p * bins).astype(int), bins - 1)
+    conteos = np.bincount(indices, minlength=bins)
+    suma_p = np.bincount(indices, weights=p, minlength=bins)
+    suma_y = np.bincount(indices, weights=y, minlength=bins)
+    media_p = _division(suma_p, conteos)
+    tasa_real = _division(suma_y, conteos)
+    return [
+        {
+            'desde': i / bins,
+            'hasta': (i + 1) / bins,
+            'estudiantes': int(conteos[i]),
+            'prob_media': float(media_p[i]) if conteos[i] else None,
+            'tasa_real': float(tasa_real[i]) if conteos[i] else None,
+        }
+        for i in range(bins)
+    ]
+
+
+def en_grilla(barrido, puntos=101):
+    """
+    Métricas del barrido en umbrales fijos 0.00, 0.01, ..., 1.00 (para graficar): en cada
+    punto se usa el umbral más bajo del barrido que sea mayor o igual al de la grilla.
+    """
+    grilla = np.linspace(0, 1, puntos)
+    umbrales = barrido['umbrales'][::-1]  # ascendente
+    posiciones = np.searchsorted(umbrales, grilla, side='left')
+    resultado = []
+    for valor, posicion in zip(grilla, posiciones):
+        if posicion >= len(umbrales):
+            # Ningún estudiante supera el umbral: no hay alertas
+            resultado.append({'umbral': float(valor), 'precision': 0.0, 'recall': 0.0, 'f1': 0.0})
+            continue
+        i = len(umbrales) - 1 - posicion
+        resultado.append({
+            'umbral': float(valor),
+            'precision': float(barrido['precision'][i]),
+            'recall': float(barrido['recall'][i]),
+            'f1': float(barrido['f1'][i]),
+        })
+    return resultado
+
+
+def evaluar(y, p, umbral):
+    """
+    Matriz de confusión en `umbral` y métricas del barrido. Las probabilidades NaN (estudiantes
+    sin riesgo calculado) cuentan como "sin riesgo" en la matriz y quedan fuera del barrido,
+    las curvas y la calibración.
+    """
+    y = np.asarray(y, dtype=np.int64)
+    p = np.asarray(p, dtype=float)
+    matriz = matriz_confusion(y, p, umbral)
+
+    con_probabilidad = ~np.isnan(p)
+    y, p = y[con_probabilidad], p[con_probabilidad]
+    positivos = int(y.sum())
+    negativos = len(y) - positivos
+
+    precision = _division(matriz['tp'], matriz['tp'] + matriz['fp']).item()
+    recall = _division(matriz['tp'], matriz['tp'] + matriz['fn']).item()
+    f1 = _division(2 * precision * recall, precision + recall).item()
+
+    resultado = {
+        'matriz': matriz,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'roc_auc': None,
+        'pr_auc': None,
+        'mejor_umbral_f1': None,
+        'barrido': [],
+        'calibracion': calibracion(y, p),
+    }
+    if len(y):
+        barrido = barrido_umbrales(y, p)
+        mejor = int(np.argmax(barrido['f1']))
+        resultado.update(
+            roc_auc=roc_auc(barrido, positivos, negativos),
+            pr_auc=pr_auc(barrido),
+            mejor_umbral_f1={
+                'umbral': float(barrido['umbrales'][mejor]),
+                'precision': float(barrido['precision'][mejor]),
+                'recall': float(barrido['recall'][mejor]),
+                'f1': float(barrido['f1'][mejor]),
+            },
+            barrido=en_grilla(barrido),
+        )
+    return resultado
@@ -0,0 +1,109 @@
+# core/microbatch.py
+
+"""
+Agrupador de predicciones en línea (micro-batching).
+
+Con muchas peticiones concurrentes, cada vista llamaría al modelo con una sola fila y
+pagaría el costo fijo de `predict_proba` por cada estudiante. El agrupador reúne las filas
+que llegan dentro de una ventana corta (`espera_maxima`, o hasta `tamano_maximo` filas), las
+puntúa como una sola matriz en un hilo dedicado y entrega a cada llamador su resultado.
+
+Se usa igual desde vistas síncronas (WSGI: el hilo de la petición espera el Future) y
+asíncronas (ASGI: se espera con `await` sin bloquear el event loop).
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+
+    def __init__(self, funcion_lote, espera_maxima=0.0, tamano_maximo=64):
+        """
+        `funcion_lote(clave, X)` recibe una matriz con las filas de varias peticiones que
+        comparten la misma `clave` (el paquete del modelo) y devuelve un arreglo alineado.
+        """
+        self.funcion_lote = funcion_lote
+        self.espera_maxima = espera_maxima
+        self.tamano_maximo = tamano_maximo
+        self.estadisticas = {'lotes': 0, 'filas': 0}
+        self._lock = threading.Lock()
+        self._cola = None
+        self._pid = None
+
+    def _asegurar_hilo(self):
+        # El hilo se crea al primer uso y de nuevo tras un fork (p. ej. workers de gunicorn
+        # con --preload), ya que el proceso hijo no hereda los hilos del padre.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._cola = queue.SimpleQueue()
+            threading.Thread(target=self._bucle, args=(self._cola,), name='microbatch', daemon=True).start()
+            self._pid = os.getpid()
+
+    def enviar(self, clave, X):
+        """Encola las filas de `X` y devuelve un Future con sus resultados."""
+        self._asegurar_hilo()
+        futuro = Future()
+        self._cola.put((clave, X, futuro))
+        return futuro
+
+    def predecir(self, clave, X, timeout=None):
+        """Versión bloqueante, para vistas síncronas."""
+        return self.enviar(clave, X).result(timeout)
+
+    async def apredecir(self, clave, X):
+        """Versión asíncrona, para vistas `async def` bajo ASGI."""
+        return await asyncio.wrap_future(self.enviar(clave, X))
+
+    def _bucle(self, cola):
+        while True:
+            pendientes = [cola.get()]
+            filas = len(pendientes[0][1])
+            limite = time.monotonic() + self.espera_maxima
+            while filas < self.tamano_maximo:
+                # Lo que ya está en cola se toma siempre; solo se espera dentro de la ventana.
+                # Con espera_maxima=0 se agrupa únicamente lo acumulado mientras se puntuaba
+                # el lote anterior, sin añadir latencia cuando la carga es baja.
+                restante = limite - time.monotonic()
+                try:
+                    pendientes.append(cola.get(timeout=restante) if restante > 0 else cola.get_nowait())
+                except queue.Empty:
+                    break
+                filas += len(pendientes[-1][1])
+            self._procesar(pendientes)
+
+    def _procesar(self, pendientes):
+        # Las peticiones se agrupan por paquete: si hubo una promoción a mitad de la ventana,
+        # cada fila se puntúa con el mismo modelo con el que se codificó.
+        grupos = {}
+        for clave, X, futuro in pendientes:
+            if futuro.set_running_or_notify_cancel():
+                grupos.setdefault(id(clave), (clave, []))[1].append((X, futuro))
+
+        for clave, items in grupos.values():
+            try:
+                resultado = self.funcion_lote(clave, np.vstack([X for X, _ in items]))
+            except Exception as e:
+                logger.exception("Falló la predicción agrupada de %d peticiones.", len(items))
+                for _, futuro in items:
+                    futuro.set_exception(e)
+                continue
+
+            self.estadisticas['lotes'] += 1
+            self.estadisticas['filas'] += len(resultado)
+            inicio = 0
+            for X, futuro in items:
+                futuro.set_result(resultado[inicio:inicio + len(X)])
+                inicio += len(X)
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+def marcar_lotes_procesados(apps, schema_editor):
+    # Los lotes que ya se procesaron de forma síncrona quedan como completados
+    LoteCargaDatos = apps.get_model('core', 'LoteCargaDatos')
+    LoteCargaDatos.objects.filter(procesado=True).update(estado='COMPLETADO', progreso=100, etapa='Completado')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_estudianteperiodo_est_alum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_COLA', 'En cola'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], db_index=True, default='PENDIENTE', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='etapa',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='fecha_inicio',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='filas_procesadas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='mensaje_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='progreso',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Porcentaje de avance (0-100)'),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='reprocesar',
+            field=models.BooleanField(default=False, help_text='Si el trabajo en cola debe borrar primero los datos del periodo'),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='tiempo_transcurrido',
+            field=models.FloatField(blank=True, help_text='Segundos de procesamiento', null=True),
+        ),
+        migrations.RunPython(marcar_lotes_procesados, migrations.RunPython.noop),
+    ]
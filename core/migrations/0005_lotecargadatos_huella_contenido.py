@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_lotecargadatos_estado_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='huella_contenido',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='SHA-256 combinado de los cuatro reportes; detecta cargas idénticas', max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_lotecargadatos_huella_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estudianteperiodo',
+            name='huella_features',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='estudianteperiodo',
+            name='version_modelo',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def calcular_resumenes_existentes(apps, schema_editor):
+    # Los periodos cargados antes de esta migración también aparecen en el dashboard. La
+    # agregación se copia aquí (y no se importa de core.services) para que la migración siga
+    # dando el mismo resultado aunque cambie el código de la aplicación.
+    EstudiantePeriodo = apps.get_model('core', 'EstudiantePeriodo')
+    PeriodoResumen = apps.get_model('core', 'PeriodoResumen')
+    umbral = settings.UMBRAL_PREDICCION
+    en_riesgo = Q(ultima_prob_riesgo__gte=umbral)
+    deciles = {
+        f'decil_{i}': Count('pk', filter=Q(ultima_prob_riesgo__gte=i / 10) & (
+            Q(ultima_prob_riesgo__lt=(i + 1) / 10) if i < 9 else Q()
+        ))
+        for i in range(10)
+    }
+    for periodo in EstudiantePeriodo.objects.values_list('periodo', flat=True).distinct().order_by():
+        estudiantes = EstudiantePeriodo.objects.filter(periodo=periodo)
+        totales = estudiantes.aggregate(total=Count('pk'), riesgo=Count('pk', filter=en_riesgo), **deciles)
+        por_antiguedad = (
+            estudiantes.filter(en_riesgo, antiguedad_estudiante__isnull=False)
+            .values_list('antiguedad_estudiante').annotate(n=Count('pk')).order_by('antiguedad_estudiante')
+        )
+        por_programa = (
+            estudiantes.values_list('programa')
+            .annotate(total=Count('pk'), riesgo=Count('pk', filter=en_riesgo)).order_by('programa')
+        )
+        PeriodoResumen.objects.create(
+            periodo=periodo,
+            umbral=umbral,
+            total_estudiantes=totales['total'],
+            riesgo_alto_count=totales['riesgo'],
+            riesgo_por_antiguedad={str(semestre): n for semestre, n in por_antiguedad},
+            riesgo_por_programa={
+                programa or 'SIN PROGRAMA': {'total': total, 'riesgo': riesgo}
+                for programa, total, riesgo in por_programa
+            },
+            deciles_probabilidad=[totales[f'decil_{i}'] for i in range(10)],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_estudianteperiodo_version_y_huella'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodoResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(max_length=10, unique=True)),
+                ('umbral', models.FloatField(help_text='Umbral de riesgo con el que se calcularon los conteos')),
+                ('total_estudiantes', models.IntegerField(default=0)),
+                ('riesgo_alto_count', models.IntegerField(default=0)),
+                ('riesgo_por_antiguedad', models.JSONField(default=dict)),
+                ('riesgo_por_programa', models.JSONField(default=dict)),
+                ('deciles_probabilidad', models.JSONField(default=list)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(calcular_resumenes_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:44
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_periodoresumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='periodoresumen',
+            name='version_datos',
+            field=models.CharField(default=core.models.generar_version_datos, max_length=32),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_periodoresumen_version_datos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='estudianteperiodo',
+            index=models.Index(fields=['periodo', 'ultima_prob_riesgo'], name='estudiante_periodo_riesgo_idx'),
+        ),
+    ]
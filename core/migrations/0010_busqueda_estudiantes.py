@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:55
+
+from django.db import migrations
+
+
+TABLA = 'core_busqueda_estudiantes'
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    # Tabla FTS5 de trigramas (solo SQLite); se llena con los estudiantes ya cargados
+    conexion = schema_editor.connection
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} "
+                f"USING fts5(id_estudiante, programa, periodo UNINDEXED, tokenize='trigram')"
+            )
+        except Exception:
+            # SQLite sin FTS5 o anterior a 3.34 (sin tokenizador de trigramas): se busca con icontains
+            return
+    schema_editor.execute(
+        f"INSERT INTO {TABLA} (rowid, id_estudiante, programa, periodo) "
+        f"SELECT id, id_estudiante, COALESCE(programa, ''), periodo FROM core_estudianteperiodo ORDER BY id"
+    )
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_indice_periodo_riesgo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
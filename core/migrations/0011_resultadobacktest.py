@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_busqueda_estudiantes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoBacktest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(max_length=10)),
+                ('periodo_siguiente', models.CharField(max_length=10)),
+                ('programa', models.CharField(blank=True, default='', help_text='Vacío: todo el periodo', max_length=100)),
+                ('umbral', models.FloatField()),
+                ('total_estudiantes', models.IntegerField(default=0)),
+                ('desertores', models.IntegerField(default=0, help_text='Estudiantes que no aparecen en el periodo siguiente')),
+                ('sin_probabilidad', models.IntegerField(default=0)),
+                ('verdaderos_positivos', models.IntegerField(default=0)),
+                ('falsos_positivos', models.IntegerField(default=0)),
+                ('falsos_negativos', models.IntegerField(default=0)),
+                ('verdaderos_negativos', models.IntegerField(default=0)),
+                ('precision', models.FloatField(default=0)),
+                ('recall', models.FloatField(default=0)),
+                ('f1', models.FloatField(default=0)),
+                ('roc_auc', models.FloatField(blank=True, null=True)),
+                ('pr_auc', models.FloatField(blank=True, null=True)),
+                ('mejor_umbral_f1', models.FloatField(blank=True, null=True)),
+                ('calibracion', models.JSONField(default=list)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['periodo', 'programa'],
+                'unique_together': {('periodo', 'programa')},
+            },
+        ),
+    ]
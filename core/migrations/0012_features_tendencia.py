@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+FEATURES = ['diferencia_promedio_anterior', 'diferencia_reprobadas_anterior', 'curso_periodo_anterior']
+
+
+def _diferencia(actual, anterior):
+    return 0 if actual is None or anterior is None else actual - anterior
+
+
+def calcular_tendencia_existente(apps, schema_editor):
+    # Los periodos cargados antes de esta migración tenían la tendencia fija en 0. El cálculo
+    # (el de core.historial al crear esta migración) se copia aquí para que no dependa del
+    # código actual de la aplicación: el periodo anterior es el cargado inmediatamente antes.
+    EstudiantePeriodo = apps.get_model('core', 'EstudiantePeriodo')
+    anteriores = {}
+    for periodo in sorted(EstudiantePeriodo.objects.values_list('periodo', flat=True).distinct().order_by()):
+        actuales = {
+            id_estudiante: (promedio, reprobadas)
+            for id_estudiante, promedio, reprobadas in EstudiantePeriodo.objects.filter(periodo=periodo)
+            .values_list('id_estudiante', 'promedio_semestral', 'num_materias_reprobadas').iterator()
+        }
+        filas = []
+        for id_estudiante, (promedio, reprobadas) in actuales.items():
+            promedio_anterior, reprobadas_anterior = anteriores.get(id_estudiante, (None, None))
+            filas.append(EstudiantePeriodo(
+                id_estudiante=id_estudiante,
+                periodo=periodo,
+                diferencia_promedio_anterior=float(_diferencia(promedio, promedio_anterior)),
+                diferencia_reprobadas_anterior=int(_diferencia(reprobadas, reprobadas_anterior)),
+                curso_periodo_anterior=int(id_estudiante in anteriores),
+            ))
+        EstudiantePeriodo.objects.bulk_create(
+            filas,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['id_estudiante', 'periodo'],
+            update_fields=FEATURES,
+        )
+        anteriores = actuales
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_resultadobacktest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estudianteperiodo',
+            name='curso_periodo_anterior',
+            field=models.IntegerField(blank=True, help_text='1 si el estudiante tiene registro en el periodo anterior', null=True),
+        ),
+        migrations.AddField(
+            model_name='estudianteperiodo',
+            name='diferencia_reprobadas_anterior',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(calcular_tendencia_existente, migrations.RunPython.noop),
+    ]
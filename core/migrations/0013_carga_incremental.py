@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_features_tendencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estudianteperiodo',
+            name='huella_datos',
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='lotecargadatos',
+            name='cambios',
+            field=models.JSONField(blank=True, default=dict, help_text='Estudiantes nuevos, modificados, eliminados y sin cambios en la última ejecución'),
+        ),
+        migrations.AlterField(
+            model_name='lotecargadatos',
+            name='reprocesar',
+            field=models.BooleanField(default=False, help_text='Si el trabajo en cola reemplaza los datos del periodo (elimina a quienes ya no aparecen)'),
+        ),
+    ]
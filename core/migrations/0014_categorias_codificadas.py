@@ -0,0 +1,82 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:19
+
+import core.categorias
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+CAMPOS = ['genero', 'discapacidad', 'estado_civil', 'etnia', 'programa', 'est_alum']
+
+
+def codificar_categorias(apps, schema_editor):
+    # Registra los valores ya guardados y reemplaza cada texto por su código; la columna
+    # pasa a ser entera en las operaciones siguientes
+    EstudiantePeriodo = apps.get_model('core', 'EstudiantePeriodo')
+    Categoria = apps.get_model('core', 'Categoria')
+    for campo in CAMPOS:
+        textos = EstudiantePeriodo.objects.exclude(**{campo: None}).values_list(campo, flat=True).distinct().order_by()
+        Categoria.objects.bulk_create([Categoria(campo=campo, valor=texto) for texto in textos])
+        EstudiantePeriodo.objects.exclude(**{campo: None}).update(**{campo: Subquery(
+            Categoria.objects.filter(campo=campo, valor=OuterRef(campo)).values('pk')[:1]
+        )})
+
+
+def decodificar_categorias(apps, schema_editor):
+    EstudiantePeriodo = apps.get_model('core', 'EstudiantePeriodo')
+    Categoria = apps.get_model('core', 'Categoria')
+    for campo in CAMPOS:
+        EstudiantePeriodo.objects.exclude(**{campo: None}).update(**{campo: Subquery(
+            Categoria.objects.filter(campo=campo, pk=Cast(OuterRef(campo), IntegerField())).values('valor')[:1]
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_carga_incremental'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Categoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(max_length=50)),
+                ('valor', models.CharField(max_length=100)),
+            ],
+            options={
+                'unique_together': {('campo', 'valor')},
+            },
+        ),
+        migrations.RunPython(codificar_categorias, decodificar_categorias),
+        migrations.AlterField(
+            model_name='estudianteperiodo',
+            name='discapacidad',
+            field=core.categorias.CategoriaField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='estudianteperiodo',
+            name='est_alum',
+            field=core.categorias.CategoriaField(blank=True, null=True, verbose_name='Estado del Alumno'),
+        ),
+        migrations.AlterField(
+            model_name='estudianteperiodo',
+            name='estado_civil',
+            field=core.categorias.CategoriaField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='estudianteperiodo',
+            name='etnia',
+            field=core.categorias.CategoriaField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='estudianteperiodo',
+            name='genero',
+            field=core.categorias.CategoriaField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='estudianteperiodo',
+            name='programa',
+            field=core.categorias.CategoriaField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_categorias_codificadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoValidacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('periodo', models.CharField(max_length=10)),
+                ('resultados', models.JSONField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,276 @@
+# core/modelos.py
+
+"""
+Registro versionado de modelos de predicción sobre la carpeta ml_models/.
+
+Cada versión es un paquete (modelo XGBoost + columnas) guardado en ml_models/versiones/<version>/
+con el SHA-256 de sus archivos en registro.json; al cargarlo se verifica el checksum. La versión
+es un prefijo del hash del contenido, así que un mismo modelo tiene siempre el mismo
+identificador. registro.json indica la versión activa y, opcionalmente, una candidata que se
+puntúa "en sombra" junto a la activa. Si no existe registro.json se usa el paquete histórico de
+la raíz de ml_models/ (xgboost_final_model.json y model_columns.pkl).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from django.conf import settings
+from django.db import models
+
+from . import categorias, instrumentacion
+from .models import EstudiantePeriodo
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_MODELO = 'xgboost_final_model.json'
+ARCHIVO_COLUMNAS = 'model_columns.pkl'
+
+
+class ErrorModelo(Exception):
+    """El paquete de un modelo no existe, está incompleto o no coincide con su checksum."""
+
+
+def _a_numero(valor):
+    """Convierte un valor a float como pd.to_numeric(errors='coerce').fillna(0)."""
+    if valor is None:
+        return 0.0
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(numero) else numero
+
+
+class CodificadorFeatures:
+    """
+    One-Hot Encoding precompilado a partir de las columnas del modelo (model_columns.pkl).
+
+    Cada valor categórico conocido apunta directamente al índice de su columna y las
+    features se escriben en un arreglo de NumPy preasignado, sin DataFrames intermedios.
+    Equivale a la codificación del entrenamiento, pd.get_dummies(drop_first=True) seguido de
+    reindex(columns=MODEL_COLUMNS, fill_value=0): la categoría base no tiene columna y los
+    valores desconocidos o faltantes quedan en cero. Un DataFrame que ya pasó por
+    categorias.codificar se codifica por código en los campos guardados así
+    (`campos_codificados`), si se indica con `ya_codificado`.
+    """
+
+    def __init__(self, columnas_modelo, campos_categoricos, campos_codificados=()):
+        self.columnas = list(columnas_modelo)
+        self.campos_codificados = set(campos_codificados)
+        self.indices_numericos = {}
+        self.indices_categoricos = {}  # campo -> {valor: índice de columna}
+        for indice, columna in enumerate(self.columnas):
+            campo = next((c for c in campos_categoricos if columna.startswith(f"{c}_")), None)
+            if campo is None:
+                self.indices_numericos[columna] = indice
+            else:
+                self.indices_categoricos.setdefault(campo, {})[columna[len(campo) + 1:]] = indice
+
+    @classmethod
+    def desde_modelo(cls, columnas_modelo):
+        """Construye el codificador tomando como categóricos los campos de texto de EstudiantePeriodo."""
+        campos = [
+            f.name for f in EstudiantePeriodo._meta.concrete_fields
+            if isinstance(f, (models.CharField, categorias.CategoriaField))
+        ]
+        # Los nombres más largos primero, por si un campo es prefijo de otro
+        return cls(columnas_modelo, sorted(campos, key=len, reverse=True), categorias.campos())
+
+    def codificar_fila(self, datos):
+        """Codifica un único estudiante (un dict campo -> valor) en una matriz de 1 x N columnas."""
+        fila = np.zeros((1, len(self.columnas)))
+        for columna, indice in self.indices_numericos.items():
+            fila[0, indice] = _a_numero(datos.get(columna))
+        for campo, indices in self.indices_categoricos.items():
+            valor = datos.get(campo)
+            if valor is not None and valor == valor:
+                indice = indices.get(str(valor))
+                if indice is not None:
+                    fila[0, indice] = 1.0
+        return fila
+
+    def codificar_frame(self, df, ya_codificado=False):
+        """
+        Codifica todas las filas de un DataFrame en una matriz de len(df) x N columnas. Con
+        `ya_codificado`, las columnas de `campos_codificados` traen códigos de categoría y no
+        textos; sin él, un valor entero se toma como texto, igual que en el entrenamiento.
+        """
+        X = np.zeros((len(df), len(self.columnas)))
+        for columna, indice in self.indices_numericos.items():
+            if columna in df.columns:
+                X[:, indice] = pd.to_numeric(df[columna], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        filas = np.arange(len(df))
+        for campo, indices in self.indices_categoricos.items():
+            if campo not in df.columns:
+                continue
+            valores = df[campo]
+            if ya_codificado and campo in self.campos_codificados:
+                # Códigos de categoría: cada código apunta directamente a su columna one-hot
+                tabla = categorias.posiciones(campo, indices)
+                codigos = valores.to_numpy(dtype=float, na_value=np.nan)
+                validos = ~np.isnan(codigos) & (codigos >= 0) & (codigos < len(tabla))
+                posiciones = np.full(len(df), -1, dtype=np.int64)
+                posiciones[validos] = tabla[codigos[validos].astype(np.int64)]
+                conocidos = posiciones >= 0
+                X[filas[conocidos], posiciones[conocidos]] = 1.0
+                continue
+            posiciones = valores.where(valores.isna(), valores.astype(str)).map(indices).to_numpy(dtype=float)
+            conocidos = ~np.isnan(posiciones)
+            X[filas[conocidos], posiciones[conocidos].astype(int)] = 1.0
+        return X
+
+    @staticmethod
+    def huella(fila):
+        """Huella corta del vector de features codificado: cambia si cambia cualquier entrada del modelo."""
+        return hashlib.blake2b(np.ascontiguousarray(fila, dtype=np.float64).tobytes(), digest_size=8).hexdigest()
+
+
+def _sha256(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def version_de_archivos(ruta_modelo, ruta_columnas):
+    """Identificador de versión de un modelo a partir del contenido de sus archivos."""
+    sha = hashlib.sha256()
+    for ruta in (ruta_modelo, ruta_columnas):
+        with open(ruta, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()[:12]
+
+
+class PaqueteModelo:
+    """Un modelo cargado en memoria junto con sus columnas, su codificador y su versión."""
+
+    def __init__(self, version, modelo, columnas, etiqueta=''):
+        self.version = version
+        self.etiqueta = etiqueta
+        self.modelo = modelo
+        self.columnas = list(columnas)
+        self.codificador = CodificadorFeatures.desde_modelo(self.columnas)
+
+    @classmethod
+    def desde_archivos(cls, ruta_modelo, ruta_columnas, version=None, etiqueta=''):
+        with instrumentacion.medir('modelo.carga'):
+            modelo = xgb.XGBClassifier()
+            modelo.load_model(ruta_modelo)
+            columnas = joblib.load(ruta_columnas)
+        return cls(version or version_de_archivos(ruta_modelo, ruta_columnas), modelo, columnas, etiqueta)
+
+    def predecir(self, X):
+        """Probabilidad de la clase positiva (riesgo) para cada fila de la matriz codificada."""
+        with instrumentacion.medir('modelo.prediccion', len(X), version=self.version):
+            return self.modelo.predict_proba(X)[:, 1].astype(float)
+
+    def __repr__(self):
+        return f"<PaqueteModelo {self.version}{f' ({self.etiqueta})' if self.etiqueta else ''}>"
+
+
+class RegistroModelos:
+    """Versiones disponibles en ml_models/ y punteros a la versión activa y a la candidata."""
+
+    def __init__(self, directorio=None):
+        self.directorio = Path(directorio or getattr(settings, 'MODELOS_DIR', Path(settings.BASE_DIR) / 'ml_models'))
+        self.ruta_registro = self.directorio / 'registro.json'
+
+    def leer(self):
+        try:
+            with open(self.ruta_registro, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'activa': None, 'candidata': None, 'versiones': {}}
+
+    def _escribir(self, datos):
+        # Escritura atómica: los workers nunca leen un registro a medio escribir
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.ruta_registro)
+
+    def marca(self):
+        """Marca de modificación del registro; cambia cada vez que se promueve una versión."""
+        try:
+            return self.ruta_registro.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def registrar(self, ruta_modelo, ruta_columnas, etiqueta=''):
+        """Copia un modelo y sus columnas al registro y devuelve su versión (no lo activa)."""
+        version = version_de_archivos(ruta_modelo, ruta_columnas)
+        destino = self.directorio / 'versiones' / version
+        destino.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(ruta_modelo, destino / ARCHIVO_MODELO)
+        shutil.copy2(ruta_columnas, destino / ARCHIVO_COLUMNAS)
+
+        datos = self.leer()
+        datos.setdefault('versiones', {})[version] = {
+            'etiqueta': etiqueta,
+            'fecha_registro': datetime.now().isoformat(timespec='seconds'),
+            'sha256': {
+                'modelo': _sha256(destino / ARCHIVO_MODELO),
+                'columnas': _sha256(destino / ARCHIVO_COLUMNAS),
+            },
+        }
+        self._escribir(datos)
+        return version
+
+    def cargar(self, version):
+        """Carga una versión registrada verificando el checksum de sus archivos."""
+        entrada = self.leer().get('versiones', {}).get(version)
+        if entrada is None:
+            raise ErrorModelo(f"La versión '{version}' no está registrada.")
+
+        carpeta = self.directorio / 'versiones' / version
+        rutas = {'modelo': carpeta / ARCHIVO_MODELO, 'columnas': carpeta / ARCHIVO_COLUMNAS}
+        for nombre, ruta in rutas.items():
+            if not ruta.exists():
+                raise ErrorModelo(f"Falta el archivo de {nombre} de la versión '{version}'.")
+            if _sha256(ruta) != entrada['sha256'][nombre]:
+                raise ErrorModelo(f"El archivo de {nombre} de la versión '{version}' no coincide con su checksum.")
+        return PaqueteModelo.desde_archivos(rutas['modelo'], rutas['columnas'], version, entrada.get('etiqueta', ''))
+
+    def cargar_activo(self):
+        activa = self.leer().get('activa')
+        if activa:
+            return self.cargar(activa)
+
+        ruta_modelo = self.directorio / ARCHIVO_MODELO
+        ruta_columnas = self.directorio / ARCHIVO_COLUMNAS
+        if not ruta_modelo.exists() or not ruta_columnas.exists():
+            raise ErrorModelo(f"No hay una versión activa ni un modelo en {self.directorio}.")
+        return PaqueteModelo.desde_archivos(ruta_modelo, ruta_columnas)
+
+    def cargar_candidato(self):
+        candidata = self.leer().get('candidata')
+        return self.cargar(candidata) if candidata else None
+
+    def promover(self, version):
+        """Activa una versión registrada. Se carga antes para no activar nunca un paquete roto."""
+        self.cargar(version)
+        datos = self.leer()
+        datos['activa'] = version
+        if datos.get('candidata') == version:
+            datos['candidata'] = None
+        self._escribir(datos)
+
+    def fijar_candidata(self, version):
+        """Define (o quita, con None) la versión que se puntúa en sombra junto a la activa."""
+        if version is not None:
+            self.cargar(version)
+        datos = self.leer()
+        datos['candidata'] = version
+        self._escribir(datos)
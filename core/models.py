@@ -1,6 +1,10 @@
 # core/models.py
+import uuid
+
 from django.db import models
 
+from .categorias import CategoriaField
+
 class LoteCargaDatos(models.Model):
     periodo = models.CharField(max_length=10, help_text="Ej: 2025A")
     fecha_carga = models.DateTimeField(auto_now_add=True)
@@ -10,6 +14,35 @@ class LoteCargaDatos(models.Model):
     reporte_discapacidad = models.FileField(upload_to='uploads/')
     procesado = models.BooleanField(default=False)
 
+    # Estado del trabajo en segundo plano (ver core/jobs.py)
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_COLA = 'EN_COLA', 'En cola'
+        PROCESANDO = 'PROCESANDO', 'Procesando'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Error'
+
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE, db_index=True)
+    reprocesar = models.BooleanField(default=False, help_text="Si el trabajo en cola reemplaza los datos del periodo (elimina a quienes ya no aparecen)")
+    etapa = models.CharField(max_length=100, blank=True, default='')
+    progreso = models.PositiveSmallIntegerField(default=0, help_text="Porcentaje de avance (0-100)")
+    filas_procesadas = models.IntegerField(default=0)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    tiempo_transcurrido = models.FloatField(null=True, blank=True, help_text="Segundos de procesamiento")
+    mensaje_error = models.TextField(blank=True, default='')
+    huella_contenido = models.CharField(
+        max_length=64, blank=True, default='', db_index=True,
+        help_text="SHA-256 combinado de los cuatro reportes; detecta cargas idénticas",
+    )
+    cambios = models.JSONField(
+        default=dict, blank=True,
+        help_text="Estudiantes nuevos, modificados, eliminados y sin cambios en la última ejecución",
+    )
+
+    @property
+    def en_ejecucion(self):
+        return self.estado in (self.Estado.EN_COLA, self.Estado.PROCESANDO)
+
     def __str__(self):
         return f"Carga para el periodo {self.periodo} - {self.fecha_carga.strftime('%Y-%m-%d')}"
 
@@ -23,27 +56,35 @@ class EstudiantePeriodo(models.Model):
     num_materias_cursadas = models.IntegerField(null=True, blank=True)
     num_materias_reprobadas = models.IntegerField(null=True, blank=True)
     edad = models.IntegerField(null=True, blank=True)
-    genero = models.CharField(max_length=50, null=True, blank=True)
+    genero = CategoriaField(null=True, blank=True)
     es_foraneo = models.IntegerField(null=True, blank=True)
     pago_tardio = models.IntegerField(null=True, blank=True)
     dias_retraso_pago = models.IntegerField(null=True, blank=True)
     antiguedad_estudiante = models.IntegerField(null=True, blank=True)
-    discapacidad = models.CharField(max_length=100, null=True, blank=True)
+    discapacidad = CategoriaField(null=True, blank=True)
     
+    # Tendencia respecto al periodo anterior del estudiante (ver core/historial.py)
     diferencia_promedio_anterior = models.FloatField(null=True, blank=True)
-    estado_civil = models.CharField(max_length=100, null=True, blank=True)
-    etnia = models.CharField(max_length=100, null=True, blank=True)
+    diferencia_reprobadas_anterior = models.IntegerField(null=True, blank=True)
+    curso_periodo_anterior = models.IntegerField(null=True, blank=True, help_text="1 si el estudiante tiene registro en el periodo anterior")
+    estado_civil = CategoriaField(null=True, blank=True)
+    etnia = CategoriaField(null=True, blank=True)
     experiencia_laboral = models.IntegerField(null=True, blank=True) # Usamos Integer para 1 (SI), 0 (NO), -1 (N/A)
     num_est_economico = models.IntegerField(null=True, blank=True)
     num_grupo_fam = models.IntegerField(null=True, blank=True)
     periodo_ingreso = models.CharField(max_length=10, null=True, blank=True)
     posicion_hermanos = models.IntegerField(null=True, blank=True)
-    programa = models.CharField(max_length=100, null=True, blank=True)
+    programa = CategoriaField(null=True, blank=True)
     
-    est_alum = models.CharField(max_length=100, null=True, blank=True, verbose_name="Estado del Alumno")
+    est_alum = CategoriaField(null=True, blank=True, verbose_name="Estado del Alumno")
 
     # Campo para guardar la última predicción
     ultima_prob_riesgo = models.FloatField(null=True, blank=True)
+    # Con qué modelo y con qué features se calculó; si ambos coinciden se reutiliza el puntaje
+    version_modelo = models.CharField(max_length=64, null=True, blank=True)
+    huella_features = models.CharField(max_length=32, null=True, blank=True)
+    # Huella de todos los datos cargados de la fila; al reprocesar solo se reescriben las que cambian
+    huella_datos = models.CharField(max_length=16, null=True, blank=True)
 
     @property
     def riesgo_porcentaje(self):
@@ -54,6 +95,110 @@ class EstudiantePeriodo(models.Model):
 
     class Meta:
         unique_together = ('id_estudiante', 'periodo')
+        indexes = [
+            # Lista de estudiantes de un periodo ordenada por riesgo (paginación por cursor)
+            models.Index(fields=['periodo', 'ultima_prob_riesgo'], name='estudiante_periodo_riesgo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id_estudiante} - {self.periodo}"
+
+class Categoria(models.Model):
+    """
+    Valores de las columnas categóricas de EstudiantePeriodo (genero, programa...). Cada fila
+    guarda el id del valor en lugar del texto (ver core/categorias.py).
+    """
+    campo = models.CharField(max_length=50)
+    valor = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('campo', 'valor')
+
+    def __str__(self):
+        return f"{self.campo}: {self.valor}"
+
+
+def generar_version_datos():
+    return uuid.uuid4().hex
+
+
+class PeriodoResumen(models.Model):
+    """
+    Resumen materializado de un periodo para el dashboard. Se recalcula al terminar la carga
+    (y al reevaluar el riesgo), de modo que el dashboard se arma con una sola consulta.
+    """
+    periodo = models.CharField(max_length=10, unique=True)
+    umbral = models.FloatField(help_text="Umbral de riesgo con el que se calcularon los conteos")
+    total_estudiantes = models.IntegerField(default=0)
+    riesgo_alto_count = models.IntegerField(default=0)
+    # {"<semestre>": estudiantes en riesgo}
+    riesgo_por_antiguedad = models.JSONField(default=dict)
+    # {"<programa>": {"total": n, "riesgo": m}}
+    riesgo_por_programa = models.JSONField(default=dict)
+    # Estudiantes por decil de probabilidad: [0-10%, 10-20%, ..., 90-100%]
+    deciles_probabilidad = models.JSONField(default=list)
+    # Cambia cada vez que cambian los datos del periodo; las entradas de caché de las vistas
+    # del periodo se indexan con ella (ver core/cache_periodos.py)
+    version_datos = models.CharField(max_length=32, default=generar_version_datos)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    @property
+    def tasa_retencion(self):
+        if not self.total_estudiantes:
+            return None
+        return (self.total_estudiantes - self.riesgo_alto_count) / self.total_estudiantes * 100
+
+    def __str__(self):
+        return f"Resumen {self.periodo}"
+
+
+class ResultadoBacktest(models.Model):
+    """
+    Métricas del modelo en un periodo, usando como etiqueta real si cada estudiante reaparece
+    en el periodo siguiente (ver core/backtest.py). Por cada periodo hay una fila con
+    programa='' (todo el periodo) y una por programa.
+    """
+    periodo = models.CharField(max_length=10)
+    periodo_siguiente = models.CharField(max_length=10)
+    programa = models.CharField(max_length=100, blank=True, default='', help_text="Vacío: todo el periodo")
+    umbral = models.FloatField()
+    total_estudiantes = models.IntegerField(default=0)
+    desertores = models.IntegerField(default=0, help_text="Estudiantes que no aparecen en el periodo siguiente")
+    sin_probabilidad = models.IntegerField(default=0)
+    verdaderos_positivos = models.IntegerField(default=0)
+    falsos_positivos = models.IntegerField(default=0)
+    falsos_negativos = models.IntegerField(default=0)
+    verdaderos_negativos = models.IntegerField(default=0)
+    # Proporciones entre 0 y 1
+    precision = models.FloatField(default=0)
+    recall = models.FloatField(default=0)
+    f1 = models.FloatField(default=0)
+    roc_auc = models.FloatField(null=True, blank=True)
+    pr_auc = models.FloatField(null=True, blank=True)
+    mejor_umbral_f1 = models.FloatField(null=True, blank=True)
+    # [{"desde", "hasta", "estudiantes", "prob_media", "tasa_real"}, ...] (10 intervalos)
+    calibracion = models.JSONField(default=list)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('periodo', 'programa')
+        ordering = ['periodo', 'programa']
+
+    def __str__(self):
+        return f"Backtest {self.periodo} -> {self.periodo_siguiente} {self.programa or '(total)'}"
+
+
+class ResultadoValidacion(models.Model):
+    """
+    Resultados de una validación con la lista de activos (vista /validacion/), para paginar las
+    listas de IDs sin volver a subir el archivo. Están en la base de datos y no en la caché
+    porque la caché en memoria es de cada proceso: con varios workers, la página de resultados
+    la puede atender otro. Expiran tras CACHE_VISTAS_TIMEOUT segundos.
+    """
+    token = models.CharField(max_length=32, unique=True)
+    periodo = models.CharField(max_length=10)
+    resultados = models.JSONField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
-        return f"{self.id_estudiante} - {self.periodo}"
\ No newline at end of file
+        return f"Validación {self.periodo} - {self.fecha_creacion.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,121 @@
+# core/paginacion.py
+
+"""
+Paginación por cursor (keyset) de la lista de estudiantes, ordenada por riesgo descendente.
+
+En lugar de OFFSET, cada página continúa desde la última fila de la anterior con una
+condición sobre (ultima_prob_riesgo, id), que el índice compuesto (periodo, ultima_prob_riesgo)
+resuelve directamente: cualquier página cuesta lo mismo, sin importar su profundidad. Los
+estudiantes sin riesgo calculado van al final.
+"""
+
+from django.db.models import F, Q
+
+ORDEN = (F('ultima_prob_riesgo').desc(nulls_last=True), F('id').desc())
+ULTIMA = 'fin'
+
+
+def codificar_cursor(estudiante):
+    riesgo = 'n' if estudiante.ultima_prob_riesgo is None else repr(estudiante.ultima_prob_riesgo)
+    return f"{riesgo}_{estudiante.pk}"
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (riesgo, id) o None si el cursor no es válido."""
+    try:
+        riesgo, pk = cursor.rsplit('_', 1)
+        return (None if riesgo == 'n' else float(riesgo)), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _segmentos(queryset, cursor, hacia_atras):
+    """
+    Consultas que, leídas en orden, recorren las filas desde el cursor en la dirección pedida.
+    Los riesgos nulos van en un segmento aparte para que la condición sobre el riesgo sea un
+    rango del índice (periodo, ultima_prob_riesgo) y no un OR que obligue a recorrerlo.
+    """
+    no_nulos = queryset.filter(ultima_prob_riesgo__isnull=False)
+    nulos = queryset.filter(ultima_prob_riesgo__isnull=True)
+    riesgo, pk = cursor if cursor else (False, None)
+
+    if not hacia_atras:
+        if cursor is None:
+            return [no_nulos.order_by('-ultima_prob_riesgo', '-id'), nulos.order_by('-id')]
+        if riesgo is None:
+            return [nulos.filter(pk__lt=pk).order_by('-id')]
+        return [
+            no_nulos.filter(
+                Q(ultima_prob_riesgo__lt=riesgo) | Q(pk__lt=pk), ultima_prob_riesgo__lte=riesgo,
+            ).order_by('-ultima_prob_riesgo', '-id'),
+            nulos.order_by('-id'),
+        ]
+
+    if cursor is None:
+        return [nulos.order_by('id'), no_nulos.order_by('ultima_prob_riesgo', 'id')]
+    if riesgo is None:
+        return [nulos.filter(pk__gt=pk).order_by('id'), no_nulos.order_by('ultima_prob_riesgo', 'id')]
+    return [
+        no_nulos.filter(
+            Q(ultima_prob_riesgo__gt=riesgo) | Q(pk__gt=pk), ultima_prob_riesgo__gte=riesgo,
+        ).order_by('ultima_prob_riesgo', 'id'),
+    ]
+
+
+def _leer(segmentos, limite):
+    filas = []
+    for segmento in segmentos:
+        filas.extend(segmento[:limite - len(filas)])
+        if len(filas) >= limite:
+            break
+    return filas
+
+
+class PaginaKeyset:
+    """Una página de resultados y los cursores para ir a la siguiente y a la anterior."""
+
+    def __init__(self, filas, anterior, siguiente):
+        self.filas = filas
+        self.cursor_anterior = anterior
+        self.cursor_siguiente = siguiente
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __len__(self):
+        return len(self.filas)
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+def paginar_por_riesgo(queryset, despues=None, antes=None, tamano=15):
+    """
+    Página de `queryset` en orden de riesgo descendente. `despues` es el cursor de la última
+    fila de la página previa; `antes`, el de la primera fila de la página siguiente (o
+    ULTIMA para ir a la última página). Sin cursores se devuelve la primera página.
+    """
+    cursor_despues = decodificar_cursor(despues) if despues else None
+    cursor_antes = decodificar_cursor(antes) if antes and antes != ULTIMA else None
+
+    if antes and (antes == ULTIMA or cursor_antes):
+        # Hacia atrás: se recorre en orden inverso y se voltea el resultado
+        filas = _leer(_segmentos(queryset, cursor_antes, hacia_atras=True), tamano + 1)
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        anterior = codificar_cursor(filas[0]) if hay_mas else None
+        siguiente = codificar_cursor(filas[-1]) if filas and cursor_antes else None
+        return PaginaKeyset(filas, anterior, siguiente)
+
+    filas = _leer(_segmentos(queryset, cursor_despues, hacia_atras=False), tamano + 1)
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    anterior = codificar_cursor(filas[0]) if filas and cursor_despues else None
+    siguiente = codificar_cursor(filas[-1]) if hay_mas else None
+    return PaginaKeyset(filas, anterior, siguiente)
@@ -1,76 +1,278 @@
 # en una app de Django, por ejemplo 'core/predictions.py'
 
+import logging
+import threading
+import time
+
 import pandas as pd
-import joblib
-import xgboost as xgb
+import numpy as np
+from asgiref.sync import sync_to_async
 from django.conf import settings
-import os
+from . import instrumentacion
 from .models import EstudiantePeriodo
+from .microbatch import MicroBatcher
+from .modelos import RegistroModelos
+
+logger = logging.getLogger(__name__)
+
 
 class PredictionService:
-    MODEL = None
-    MODEL_COLUMNS = None
+    # Paquete (modelo + columnas + codificador + versión) vigente y candidato en sombra.
+    # Se reemplazan como una sola referencia, así que cada llamada trabaja con un paquete
+    # coherente aunque otro hilo promueva una nueva versión a mitad de camino.
+    _paquete = None
+    _candidato = None
+    _marca_registro = None
+    _ultima_verificacion = 0.0
+    _lock = threading.Lock()
+    _batcher = None
+
+    # Comparación acumulada entre el modelo candidato y el activo (puntuación en sombra)
+    ESTADISTICAS_SOMBRA = {'predicciones': 0, 'suma_diferencia_abs': 0.0, 'desacuerdos': 0}
 
     @classmethod
-    def load_model(cls):
-        """Carga el modelo y las columnas en memoria."""
-        if cls.MODEL is None or cls.MODEL_COLUMNS is None:
+    def load_model(cls, forzar=False):
+        """
+        Carga en memoria la versión activa del registro (y la candidata, si existe).
+        Con `forzar` vuelve a leer el registro y reemplaza el paquete en caliente; si la
+        carga falla se conserva el paquete anterior.
+        """
+        with cls._lock:
+            if cls._paquete is not None and not forzar:
+                return
+
+            registro = RegistroModelos()
+            marca = registro.marca()
+            try:
+                paquete = registro.cargar_activo()
+            except Exception:
+                logger.exception("Error crítico al cargar el modelo de predicción.")
+                return
+
             try:
-                model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'xgboost_final_model.json')
-                columns_path = os.path.join(settings.BASE_DIR, 'ml_models', 'model_columns.pkl')
-                
-                cls.MODEL = xgb.XGBClassifier()
-                cls.MODEL.load_model(model_path)
-                cls.MODEL_COLUMNS = joblib.load(columns_path)
-                print("Modelo de predicción cargado en memoria.")
-            except Exception as e:
-                print(f"Error crítico al cargar el modelo: {e}")
-                # Manejar el error apropiadamente
-                cls.MODEL = None
-                cls.MODEL_COLUMNS = None
+                candidato = registro.cargar_candidato()
+            except Exception:
+                logger.exception("No se pudo cargar el modelo candidato; se omite la puntuación en sombra.")
+                candidato = None
+
+            if cls._paquete is None or cls._paquete.version != paquete.version:
+                logger.info("Modelo de predicción %s cargado en memoria.", paquete.version)
+            cls._paquete = paquete
+            cls._candidato = candidato
+            cls._marca_registro = marca
+            cls._ultima_verificacion = time.monotonic()
 
     @classmethod
-    def predict(cls, id_estudiante, periodo):
+    def precargar(cls):
         """
-        Realiza una predicción para un estudiante y periodo específicos.
+        Carga el modelo al iniciar el servidor (wsgi.py, asgi.py) o el worker de lotes, para que
+        ninguna petición ni lote pague el costo de cargarlo. Las demás órdenes de manage.py
+        (migrate, test, shell...) no lo cargan. Se desactiva con PRECARGAR_MODELO = False.
+        """
+        if getattr(settings, 'PRECARGAR_MODELO', True):
+            cls.load_model()
+
+    @classmethod
+    def paquete_activo(cls):
         """
-        if cls.MODEL is None:
+        Paquete vigente, o None si no hay modelo disponible. Cada cierto intervalo revisa si el
+        registro cambió (por ejemplo, una promoción hecha desde otro proceso) y lo recarga.
+        """
+        if cls._paquete is None:
             cls.load_model()
-            if cls.MODEL is None:
-                return {"error": "El modelo de predicción no está disponible."}
+            return cls._paquete
+
+        intervalo = getattr(settings, 'INTERVALO_VERIFICACION_MODELO', 5)
+        ahora = time.monotonic()
+        if ahora - cls._ultima_verificacion >= intervalo:
+            cls._ultima_verificacion = ahora
+            if RegistroModelos().marca() != cls._marca_registro:
+                cls.load_model(forzar=True)
+        return cls._paquete
+
+    @classmethod
+    def promover(cls, version):
+        """Activa una versión registrada y la pone en uso de inmediato en este proceso."""
+        RegistroModelos().promover(version)
+        cls.load_model(forzar=True)
+
+    @classmethod
+    def _puntuar_en_sombra(cls, paquete, codificar, probabilidades):
+        """Puntúa con el modelo candidato y acumula su diferencia con el activo, sin afectar el resultado."""
+        candidato = cls._candidato
+        if candidato is None or candidato.version == paquete.version or not getattr(settings, 'PUNTUACION_SOMBRA', True):
+            return
+        try:
+            sombra = candidato.predecir(codificar(candidato.codificador))
+            umbral = getattr(settings, 'UMBRAL_PREDICCION', 0.515)
+            diferencia = np.abs(sombra - probabilidades)
+            desacuerdos = int(((sombra >= umbral) != (probabilidades >= umbral)).sum())
+            with cls._lock:
+                cls.ESTADISTICAS_SOMBRA['predicciones'] += len(sombra)
+                cls.ESTADISTICAS_SOMBRA['suma_diferencia_abs'] += float(diferencia.sum())
+                cls.ESTADISTICAS_SOMBRA['desacuerdos'] += desacuerdos
+            logger.info(
+                "Sombra %s contra %s: %d predicciones, diferencia media %.4f, %d desacuerdos.",
+                candidato.version, paquete.version, len(sombra), float(diferencia.mean()), desacuerdos,
+            )
+        except Exception:
+            logger.exception("Falló la puntuación en sombra del modelo %s.", candidato.version)
+
+    @classmethod
+    def _predecir_lote(cls, paquete, X):
+        """Puntúa una matriz ya codificada con el paquete dado (usado por el agrupador)."""
+        probabilidades = paquete.predecir(X)
+        candidato = cls._candidato
+        if candidato is not None and candidato.columnas == paquete.columnas:
+            cls._puntuar_en_sombra(paquete, lambda codificador: X, probabilidades)
+        return probabilidades
+
+    @classmethod
+    def batcher(cls):
+        """Agrupador de predicciones en línea, o None si MICROBATCH_ACTIVO está desactivado."""
+        if not getattr(settings, 'MICROBATCH_ACTIVO', False):
+            return None
+        if cls._batcher is None:
+            with cls._lock:
+                if cls._batcher is None:
+                    cls._batcher = MicroBatcher(
+                        cls._predecir_lote,
+                        espera_maxima=getattr(settings, 'MICROBATCH_ESPERA_MAXIMA_MS', 0) / 1000,
+                        tamano_maximo=getattr(settings, 'MICROBATCH_TAMANO_MAXIMO', 64),
+                    )
+        return cls._batcher
+
+    @classmethod
+    def predict_frame(cls, df):
+        """
+        Calcula la probabilidad de riesgo de todas las filas de un DataFrame en una sola
+        llamada al modelo. Devuelve un arreglo alineado con las filas de `df`, o None si
+        el modelo no está disponible.
+        """
+        paquete = cls.paquete_activo()
+        if paquete is None:
+            return None
+
+        if df.empty:
+            return np.empty(0, dtype=float)
 
+        # Codificación, modelo y puntuación en sombra (el modelo solo también se mide aparte)
+        with instrumentacion.medir('prediccion.lote', len(df)):
+            probabilidades = paquete.predecir(paquete.codificador.codificar_frame(df))
+            cls._puntuar_en_sombra(paquete, lambda codificador: codificador.codificar_frame(df), probabilidades)
+        return probabilidades
+
+    @classmethod
+    def puntuar_frame(cls, df, ya_codificado=False):
+        """
+        Como predict_frame, pero acompaña cada probabilidad de la versión del modelo y de la
+        huella de las features, listas para guardarse en EstudiantePeriodo. Devuelve un
+        DataFrame con el mismo índice que `df`, o None si el modelo no está disponible.
+        `ya_codificado` indica que las columnas categóricas ya son códigos (categorias.codificar).
+        """
+        paquete = cls.paquete_activo()
+        if paquete is None:
+            return None
+
+        with instrumentacion.medir('prediccion.lote', len(df)):
+            X = paquete.codificador.codificar_frame(df, ya_codificado)
+            probabilidades = paquete.predecir(X) if len(X) else np.empty(0)
+            if len(X):
+                cls._puntuar_en_sombra(paquete, lambda codificador: codificador.codificar_frame(df, ya_codificado), probabilidades)
+            return pd.DataFrame({
+                'ultima_prob_riesgo': probabilidades,
+                'version_modelo': paquete.version,
+                'huella_features': [paquete.codificador.huella(fila) for fila in X],
+            }, index=df.index)
+
+    @classmethod
+    def predict(cls, id_estudiante, periodo):
+        """
+        Realiza una predicción para un estudiante y periodo específicos.
+        """
         # 1. Obtener datos limpios desde la BD de Django
         try:
             estudiante_obj = EstudiantePeriodo.objects.get(id_estudiante=id_estudiante, periodo=periodo)
-            # Excluir campos que no son features
-            datos_dict = estudiante_obj.__dict__
-            datos_dict.pop('_state', None)
-            datos_dict.pop('id', None)
-            #... otras claves a excluir
-            
         except EstudiantePeriodo.DoesNotExist:
             return {"error": "Datos no encontrados para la predicción."}
 
-        # 2. Preparar el DataFrame para la predicción (lógica clave del script 2)
-        df_pred = pd.DataFrame([datos_dict])
-        
-        # Aplicar One-Hot Encoding
-        df_pred = pd.get_dummies(df_pred, drop_first=True)
-        
-        # Alinear columnas con las del modelo entrenado
-        df_pred = df_pred.reindex(columns=cls.MODEL_COLUMNS, fill_value=0)
-
-        # 3. Realizar la predicción
-        probabilidad = cls.MODEL.predict_proba(df_pred)[:, 1][0]
-        
-        # 4. Aplicar umbral de decisión
-        # El umbral puede estar en settings.py
-        UMBRAL = getattr(settings, 'UMBRAL_PREDICCION', 0.515) 
-        en_riesgo = probabilidad >= UMBRAL
+        return cls.predict_estudiante(estudiante_obj)
 
+    @classmethod
+    def _preparar_estudiante(cls, estudiante_obj):
+        """Codifica el registro y decide si su `ultima_prob_riesgo` guardada sigue vigente."""
+        paquete = cls.paquete_activo()
+        if paquete is None:
+            return None
+
+        datos_dict = {field.attname: getattr(estudiante_obj, field.attname) for field in EstudiantePeriodo._meta.concrete_fields}
+        X = paquete.codificador.codificar_fila(datos_dict)
+        huella = paquete.codificador.huella(X[0])
+        reutilizada = (
+            estudiante_obj.ultima_prob_riesgo is not None
+            and estudiante_obj.version_modelo == paquete.version
+            and estudiante_obj.huella_features == huella
+        )
+        return paquete, X, reutilizada
+
+    @classmethod
+    def _resultado_estudiante(cls, estudiante_obj, probabilidad, reutilizada):
+        # El umbral puede estar en settings.py
+        UMBRAL = getattr(settings, 'UMBRAL_PREDICCION', 0.515)
         return {
-            "id_estudiante": id_estudiante,
+            "id_estudiante": estudiante_obj.id_estudiante,
             "probabilidad": probabilidad,
-            "en_riesgo": en_riesgo,
-            "umbral_usado": UMBRAL
-        }
\ No newline at end of file
+            "en_riesgo": probabilidad >= UMBRAL,
+            "umbral_usado": UMBRAL,
+            "reutilizada": reutilizada,
+        }
+
+    @classmethod
+    def predict_estudiante(cls, estudiante_obj):
+        """
+        Predicción para un registro de EstudiantePeriodo ya cargado. Si su `ultima_prob_riesgo`
+        se calculó con el modelo vigente y con las mismas features, se reutiliza sin llamar al
+        modelo; si no, se vuelve a calcular (agrupada con otras peticiones si el micro-batching
+        está activo). El puntaje nuevo no se guarda: la llaman vistas GET, y escribirlo
+        invalidaría la caché de todo el periodo por cada detalle consultado después de cambiar
+        el modelo. Los puntajes guardados se actualizan en bloque con `reevaluar_riesgo`.
+        """
+        preparado = cls._preparar_estudiante(estudiante_obj)
+        if preparado is None:
+            return {"error": "El modelo de predicción no está disponible."}
+        paquete, X, reutilizada = preparado
+
+        if reutilizada:
+            probabilidad = estudiante_obj.ultima_prob_riesgo
+        else:
+            batcher = cls.batcher()
+            if batcher is not None:
+                probabilidad = float(batcher.predecir(paquete, X)[0])
+            else:
+                probabilidad = float(cls._predecir_lote(paquete, X)[0])
+
+        return cls._resultado_estudiante(estudiante_obj, probabilidad, reutilizada)
+
+    @classmethod
+    async def apredict_estudiante(cls, estudiante_obj):
+        """
+        Equivalente asíncrono de predict_estudiante, para vistas `async def` bajo ASGI. Sin
+        micro-batching todo el trabajo (incluida la carga del modelo, si hace falta) es síncrono:
+        se hace en un hilo aparte para no detener el bucle de eventos y las demás peticiones.
+        """
+        batcher = cls.batcher()
+        if batcher is None:
+            return await sync_to_async(cls.predict_estudiante, thread_sensitive=False)(estudiante_obj)
+
+        preparado = await sync_to_async(cls._preparar_estudiante, thread_sensitive=False)(estudiante_obj)
+        if preparado is None:
+            return {"error": "El modelo de predicción no está disponible."}
+        paquete, X, reutilizada = preparado
+
+        if reutilizada:
+            probabilidad = estudiante_obj.ultima_prob_riesgo
+        else:
+            probabilidad = float((await batcher.apredecir(paquete, X))[0])
+
+        return cls._resultado_estudiante(estudiante_obj, probabilidad, reutilizada)
+
@@ -1,191 +1,695 @@
 # core/services.py
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
 import pandas as pd
 import numpy as np
+import unicodedata
 from datetime import datetime
-from .models import EstudiantePeriodo
+from . import busqueda, cache_reportes, categorias, historial, instrumentacion, lector_excel, metricas
+from .models import EstudiantePeriodo, PeriodoResumen, generar_version_datos
 from .predictions import PredictionService
 
-def procesar_y_guardar_datos_de_periodo(archivos_cargados, periodo_actual):
+
+# Estado de cada estudiante del reporte frente a lo guardado del periodo
+NUEVOS = 'nuevos'
+MODIFICADOS = 'modificados'
+SIN_CAMBIOS = 'sin_cambios'
+COLUMNAS_PUNTAJE = ('ultima_prob_riesgo', 'version_modelo', 'huella_features')
+
+MAPEO_ID = {'ide_estudiante': 'id_estudiante', 'cedula': 'id_estudiante', 'num_identificacion': 'id_estudiante', 'identificacion': 'id_estudiante'}
+
+
+# Columnas que usa el proceso de cada reporte (nombres ya normalizados); las demás no se leen
+COLUMNAS_REPORTES = {
+    'caracterizacion': {
+        'id_estudiante', *MAPEO_ID, 'edad', 'genero', 'num_est_economico', 'etnia', 'estado_civil',
+        'programa', 'periodo_ingreso', 'lugar_residencia', 'experiencia_laboral', 'num_grupo_fam',
+        'posicion_hermanos', 'est_alum',
+    },
+    'notas': {'id_estudiante', *MAPEO_ID, 'nom_materia', 'def_historia'},
+    'pagos': {'id_estudiante', *MAPEO_ID, 'fecha_pago'},
+    'discapacidad': {'id_estudiante', *MAPEO_ID, 'discapacidad'},
+}
+
+
+def normalizar_nombre(nombre):
+    """Un nombre de columna normalizado igual que en `normalizar_columnas`."""
+    nombre = str(nombre).lower().strip().replace(' ', '_')
+    return unicodedata.normalize('NFKD', nombre).encode('ascii', errors='ignore').decode('utf-8')
+
+
+def normalizar_columnas(df):
+    """Estandarización robusta de nombres de columna: minúsculas, sin espacios ni tildes."""
+    df.columns = df.columns.str.lower().str.strip()
+    df.columns = df.columns.str.replace(' ', '_').str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
+    return df
+
+
+def estandarizar_id_estudiante(df):
+    """Renombra la columna de identificación a 'id_estudiante' y normaliza sus valores como texto."""
+    df.rename(columns=MAPEO_ID, inplace=True)
+    if 'id_estudiante' in df.columns:
+        df['id_estudiante'] = df['id_estudiante'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return df
+
+
+def excluir_estudiantes_inactivos(caracterizacion_df):
+    """Excluye estudiantes graduados/egresados ANTES de cualquier otro procesamiento."""
+    if 'est_alum' in caracterizacion_df.columns:
+        estados_a_excluir = ['--', 'INACTIVO', 'GRADUADO', 'EGRESADO']
+        caracterizacion_df['est_alum'] = caracterizacion_df['est_alum'].astype(str).str.strip().str.upper()
+        caracterizacion_df = caracterizacion_df[~caracterizacion_df['est_alum'].isin(estados_a_excluir)]
+        print(f" -> Se han excluido estudiantes graduados/egresados. Población activa: {len(caracterizacion_df)}")
+    return caracterizacion_df
+
+
+def filtro_columnas(columnas):
+    """Función para `usecols` que acepta las columnas cuyo nombre normalizado está en `columnas`."""
+    if columnas is None:
+        return None
+    return lambda nombre: normalizar_nombre(nombre) in columnas
+
+
+def leer_reporte(path, columnas=None):
+    """
+    Lee un reporte completo (.csv, .xlsx o .xls) con solo las columnas cuyo nombre normalizado
+    está en `columnas` (todas si es None). Los .xlsx se leen con el lector rápido de
+    core/lector_excel.py, que devuelve el mismo DataFrame que pd.read_excel.
+    """
+    usecols = filtro_columnas(columnas)
+    if str(path).endswith('.csv'):
+        return pd.read_csv(path, sep=';', encoding='latin1', low_memory=False, usecols=usecols)
+    if str(path).lower().endswith(('.xlsx', '.xlsm')):
+        return lector_excel.leer_xlsx(path, usecols)
+    return pd.read_excel(path, usecols=usecols)
+
+
+def cargar_reporte_normalizado(key, path):
+    """
+    Lee un reporte y aplica la normalización común (nombres de columna, ID de estudiante y,
+    para la caracterización, exclusión de inactivos). El resultado se guarda en la caché por
+    contenido, así que un archivo idéntico nunca se vuelve a parsear.
+    """
+    huella = cache_reportes.huella_archivo(path)
+    df = cache_reportes.obtener(key, huella)
+    if df is not None:
+        print(f" -> Reporte '{key}' recuperado de la caché.")
+        return df
+
+    with instrumentacion.medir('carga.lectura', reporte=key) as medicion:
+        df = leer_reporte(path, COLUMNAS_REPORTES.get(key))
+        medicion.filas = len(df)
+    with instrumentacion.medir('carga.normalizacion', len(df), reporte=key):
+        df = estandarizar_id_estudiante(normalizar_columnas(df))
+        if key == 'caracterizacion':
+            df = excluir_estudiantes_inactivos(df)
+
+    cache_reportes.guardar(key, huella, df)
+    return df
+
+
+def agregar_notas(notas_df):
+    """Agregados por estudiante del reporte de notas completo, cargado en memoria."""
+    return notas_df.groupby('id_estudiante').agg(
+        promedio_semestral=('def_historia', 'mean'),
+        num_materias_cursadas=('nom_materia', 'nunique'),
+        num_materias_reprobadas=('def_historia', lambda x: (pd.to_numeric(x, errors='coerce') < 3.0).sum())
+    ).reset_index()
+
+
+def leer_reporte_por_bloques(path, tamano_bloque, columnas=None):
+    """
+    Itera sobre un reporte (.csv o .xlsx) en DataFrames de como máximo `tamano_bloque` filas,
+    sin cargar nunca el archivo completo y con solo las columnas indicadas en `columnas`
+    (nombres normalizados). Los CSV se leen como texto para que el tipo de cada columna no
+    cambie de un bloque a otro; los Excel se recorren en streaming con el lector de
+    core/lector_excel.py, omitiendo las filas sin valores en esas columnas.
+    """
+    usecols = filtro_columnas(columnas)
+    if str(path).endswith('.csv'):
+        yield from pd.read_csv(path, sep=';', encoding='latin1', dtype=str, chunksize=tamano_bloque, usecols=usecols)
+        return
+    yield from lector_excel.leer_xlsx_por_bloques(path, tamano_bloque, usecols)
+
+
+class AgregadorNotas:
+    """
+    Acumula, bloque a bloque, los mismos agregados por estudiante que `agregar_notas`:
+    suma y conteo de notas (para el promedio), materias distintas y materias reprobadas.
+
+    La memoria depende del número de estudiantes y de pares (estudiante, materia) distintos,
+    no del tamaño del archivo: cada par se guarda como un único entero de 64 bits.
+    """
+    BITS_MATERIA = 24
+
+    def __init__(self):
+        self.estudiantes = pd.Index([], dtype=object)
+        self.materias = pd.Index([], dtype=object)
+        self.suma = np.zeros(0)
+        self.conteo = np.zeros(0, dtype=np.int64)
+        self.reprobadas = np.zeros(0, dtype=np.int64)
+        self.pares = []
+
+    @staticmethod
+    def _codificar(vocabulario, valores):
+        """Asigna a cada valor un código estable, ampliando el vocabulario con los nuevos."""
+        codigos = vocabulario.get_indexer(valores)
+        nuevos = pd.unique(valores[codigos == -1])
+        if len(nuevos):
+            vocabulario = vocabulario.append(pd.Index(nuevos, dtype=object))
+            codigos = vocabulario.get_indexer(valores)
+        return vocabulario, codigos
+
+    def agregar(self, bloque):
+        self.estudiantes, cod_estudiante = self._codificar(self.estudiantes, bloque['id_estudiante'].to_numpy(dtype=object))
+        n = len(self.estudiantes)
+        faltantes = n - len(self.suma)
+        if faltantes:
+            self.suma = np.concatenate([self.suma, np.zeros(faltantes)])
+            self.conteo = np.concatenate([self.conteo, np.zeros(faltantes, dtype=np.int64)])
+            self.reprobadas = np.concatenate([self.reprobadas, np.zeros(faltantes, dtype=np.int64)])
+
+        notas = pd.to_numeric(bloque['def_historia'], errors='coerce').to_numpy(dtype=float)
+        validas = ~np.isnan(notas)
+        self.suma += np.bincount(cod_estudiante[validas], weights=notas[validas], minlength=n)
+        self.conteo += np.bincount(cod_estudiante[validas], minlength=n)
+        self.reprobadas += np.bincount(cod_estudiante[notas < 3.0], minlength=n)
+
+        con_materia = bloque['nom_materia'].notna().to_numpy()
+        self.materias, cod_materia = self._codificar(self.materias, bloque['nom_materia'].to_numpy(dtype=object)[con_materia])
+        claves = (cod_estudiante[con_materia].astype(np.int64) << self.BITS_MATERIA) | cod_materia
+        self.pares.append(np.unique(claves))
+        if len(self.pares) >= 16:
+            self.pares = [np.unique(np.concatenate(self.pares))]
+
+    def resultado(self):
+        pares = np.unique(np.concatenate(self.pares)) if self.pares else np.zeros(0, dtype=np.int64)
+        n = len(self.estudiantes)
+        with np.errstate(invalid='ignore'):
+            promedio = self.suma / self.conteo
+        df = pd.DataFrame({
+            'id_estudiante': self.estudiantes,
+            'promedio_semestral': np.where(self.conteo > 0, promedio, np.nan),
+            'num_materias_cursadas': np.bincount(pares >> self.BITS_MATERIA, minlength=n),
+            'num_materias_reprobadas': self.reprobadas,
+        })
+        return df.sort_values('id_estudiante', ignore_index=True)
+
+
+def agregar_notas_por_bloques(path, tamano_bloque=None):
+    """
+    Lee el reporte de notas en bloques acotados y devuelve los mismos agregados por
+    estudiante que `agregar_notas`, con memoria acotada sin importar el tamaño del archivo.
+    """
+    tamano_bloque = tamano_bloque or getattr(settings, 'TAMANO_BLOQUE_NOTAS', 100000)
+    agregador = AgregadorNotas()
+    for bloque in leer_reporte_por_bloques(path, tamano_bloque, COLUMNAS_REPORTES['notas']):
+        bloque = estandarizar_id_estudiante(normalizar_columnas(bloque))
+        agregador.agregar(bloque)
+    return agregador.resultado()
+
+
+def cargar_notas_agregadas(path):
+    """
+    Agregados por estudiante del reporte de notas leído por bloques. En la caché se guarda
+    el resultado agregado (no el reporte completo) para no romper el límite de memoria.
+    """
+    huella = cache_reportes.huella_archivo(path)
+    df = cache_reportes.obtener('notas_agregadas', huella)
+    if df is not None:
+        print(" -> Agregados de 'notas' recuperados de la caché.")
+        return df
+
+    # La lectura por bloques va dentro de la agregación: se mide como una sola etapa
+    with instrumentacion.medir('carga.agregacion', reporte='notas') as medicion:
+        df = agregar_notas_por_bloques(path)
+        medicion.filas = len(df)
+    cache_reportes.guardar('notas_agregadas', huella, df)
+    return df
+
+
+@instrumentacion.instrumentado('carga.total')
+def procesar_y_guardar_datos_de_periodo(archivos_cargados, periodo_actual, reportar_progreso=None, reprocesar=False):
     """
     Orquesta todo el proceso de carga, limpieza, enriquecimiento y guardado de datos
     para un nuevo periodo, finalizando con el cálculo del riesgo inicial para cada estudiante.
+
+    Si el periodo ya tenía datos, solo se escriben y puntúan los estudiantes nuevos o cuyos
+    datos cambiaron; con `reprocesar` además se eliminan los que ya no aparecen en los reportes.
+    Devuelve un dict con cuántos estudiantes quedaron nuevos, modificados, eliminados y
+    sin cambios, o False si la carga falló.
+
+    `reportar_progreso`, si se indica, se llama como reportar_progreso(etapa, porcentaje, filas)
+    al inicio de cada etapa; lo usa el procesador de lotes en segundo plano (core/jobs.py).
     """
+    def reportar(etapa, porcentaje, filas=None):
+        if reportar_progreso is not None:
+            reportar_progreso(etapa, porcentaje, filas)
+
     print(f"Iniciando procesamiento para el periodo: {periodo_actual}")
 
     # 1. Carga y Estandarización de Archivos
+    # Cada reporte se normaliza (columnas, ID, estado del alumno) al cargarlo y se guarda en
+    # la caché por contenido, de modo que un reprocesamiento no vuelve a leer los archivos.
+    # El reporte de notas es el más grande (una fila por estudiante y materia); en modo por
+    # bloques no se carga completo, sino que se agrega bloque a bloque.
+    notas_por_bloques = getattr(settings, 'LECTURA_NOTAS_POR_BLOQUES', True)
     dataframes_nuevos = {}
-    for key, path in archivos_cargados.items():
+    notas_agregadas = None
+    for i, (key, path) in enumerate(archivos_cargados.items()):
+        reportar(f"Leyendo reporte de {key}", 5 + i * 10)
         try:
-            df_temp = pd.read_csv(path, sep=';', encoding='latin1', low_memory=False) if str(path).endswith('.csv') else pd.read_excel(path)
-            
-            # Estandarización robusta de nombres de columna
-            df_temp.columns = df_temp.columns.str.lower().str.strip()
-            if 'est_alum' in df_temp.columns:
-                df_temp.rename(columns={'est_alum': 'est_alum'}, inplace=True)
-            df_temp.columns = df_temp.columns.str.replace(' ', '_').str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
-
-            dataframes_nuevos[key] = df_temp
+            if key == 'notas' and notas_por_bloques:
+                notas_agregadas = cargar_notas_agregadas(path)
+            else:
+                dataframes_nuevos[key] = cargar_reporte_normalizado(key, path)
         except Exception as e:
             print(f"Error crítico cargando el archivo para '{key}': {e}")
             return False
 
-    # Estandarización de la columna de ID de estudiante en todos los dataframes
-    mapeo_id = {'ide_estudiante': 'id_estudiante', 'cedula': 'id_estudiante', 'num_identificacion': 'id_estudiante', 'identificacion': 'id_estudiante'}
-    for df in dataframes_nuevos.values():
-        df.rename(columns=mapeo_id, inplace=True)
-        if 'id_estudiante' in df.columns:
-            df['id_estudiante'] = df['id_estudiante'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
-
     # 2. Enriquecimiento de Datos (Feature Engineering)
-    if "notas" not in dataframes_nuevos or "caracterizacion" not in dataframes_nuevos:
+    if ("notas" not in dataframes_nuevos and notas_agregadas is None) or "caracterizacion" not in dataframes_nuevos:
         print("Error: Los reportes de 'Notas' y 'Caracterización' son esenciales y no se encontraron.")
         return False
-    
-    # Excluir estudiantes graduados/egresados ANTES de cualquier otro procesamiento
     caracterizacion_df = dataframes_nuevos["caracterizacion"]
-    if 'est_alum' in caracterizacion_df.columns:
-        estados_a_excluir = ['--', 'INACTIVO', 'GRADUADO', 'EGRESADO']
-        caracterizacion_df['est_alum'] = caracterizacion_df['est_alum'].astype(str).str.strip().str.upper()
-        caracterizacion_df = caracterizacion_df[~caracterizacion_df['est_alum'].isin(estados_a_excluir)]
-        dataframes_nuevos["caracterizacion"] = caracterizacion_df
-        print(f" -> Se han excluido estudiantes graduados/egresados. Población activa: {len(caracterizacion_df)}")
 
     # Iniciar la construcción del DataFrame final a partir de las notas
-    df_new = dataframes_nuevos["notas"].groupby('id_estudiante').agg(
-        promedio_semestral=('def_historia', 'mean'),
-        num_materias_cursadas=('nom_materia', 'nunique'),
-        num_materias_reprobadas=('def_historia', lambda x: (pd.to_numeric(x, errors='coerce') < 3.0).sum())
-    ).reset_index()
+    reportar("Agregando notas", 50)
+    if notas_agregadas is not None:
+        df_new = notas_agregadas
+    else:
+        with instrumentacion.medir('carga.agregacion', reporte='notas') as medicion:
+            df_new = agregar_notas(dataframes_nuevos["notas"])
+            medicion.filas = len(df_new)
 
     # Unir con datos de Caracterización
-    caracterizacion_df['es_foraneo'] = (~caracterizacion_df['lugar_residencia'].astype(str).str.upper().str.contains('CALI', na=False)).astype(int)
-    if 'experiencia_laboral' in caracterizacion_df.columns:
-        caracterizacion_df['experiencia_laboral'] = caracterizacion_df['experiencia_laboral'].astype(str).str.upper().map(
-            {'SI': 1, 'NO': 0}
-        ).fillna(-1)
-    
-    cols_a_unir = [
-        'id_estudiante', 'edad', 'genero', 'num_est_economico', 'etnia', 
-        'estado_civil', 'programa', 'periodo_ingreso', 'es_foraneo', 
-        'experiencia_laboral', 'num_grupo_fam', 'posicion_hermanos', 'est_alum'
-    ]
-    cols_existentes = [col for col in cols_a_unir if col in caracterizacion_df.columns]
-    demografia_unicos = caracterizacion_df[cols_existentes].groupby('id_estudiante').last().reset_index()
-    df_new = pd.merge(df_new, demografia_unicos, on='id_estudiante', how='left')
-
-    # Unir con datos de Discapacidad
-    if 'discapacidad' in dataframes_nuevos:
-        discapacidad_df = dataframes_nuevos['discapacidad']
-        if 'id_estudiante' in discapacidad_df.columns and 'discapacidad' in discapacidad_df.columns:
-            discapacidad_unicos = discapacidad_df[['id_estudiante', 'discapacidad']].groupby('id_estudiante').last().reset_index()
-            df_new = pd.merge(df_new, discapacidad_unicos, on='id_estudiante', how='left')
-
-    # Unir con datos Financieros
-    if 'pagos' in dataframes_nuevos:
-        pagos_df = dataframes_nuevos['pagos'].copy()
-        pagos_df['fecha_pago'] = pd.to_datetime(pagos_df['fecha_pago'], format='%d/%m/%Y', errors='coerce')
-        pagos_unicos = pagos_df.groupby('id_estudiante').last().reset_index()
-        year, sem = int(periodo_actual[:4]), periodo_actual[4]
-        fecha_vencimiento = datetime(year, 2, 28) if sem == 'A' else datetime(year, 8, 31)
-        pagos_unicos['pago_tardio'] = (pagos_unicos['fecha_pago'] > fecha_vencimiento).astype(int)
-        pagos_unicos['dias_retraso_pago'] = (pagos_unicos['fecha_pago'] - fecha_vencimiento).dt.days.clip(lower=0)
-        df_new = pd.merge(df_new, pagos_unicos[['id_estudiante', 'pago_tardio', 'dias_retraso_pago']], on='id_estudiante', how='left')
-
-    # Calcular características de Tendencia
-    df_new['diferencia_promedio_anterior'] = 0
-    def periodo_a_numero(p):
-        try: return int(p[:4]) * 2 + (1 if p[4] == 'A' else 2)
-        except: return np.nan
-        
-    if 'periodo_ingreso' in df_new.columns:
-        periodo_actual_num = periodo_a_numero(periodo_actual)
-        df_new['periodo_ingreso_num'] = df_new['periodo_ingreso'].astype(str).apply(periodo_a_numero)
-        df_new['antiguedad_estudiante'] = (periodo_actual_num - df_new['periodo_ingreso_num']) + 1
-        df_new.drop(columns=['periodo_ingreso_num'], inplace=True)
+    reportar("Uniendo reportes", 60, len(df_new))
+    with instrumentacion.medir('carga.union', len(df_new)):
+        caracterizacion_df['es_foraneo'] = (~caracterizacion_df['lugar_residencia'].astype(str).str.upper().str.contains('CALI', na=False)).astype(int)
+        if 'experiencia_laboral' in caracterizacion_df.columns:
+            caracterizacion_df['experiencia_laboral'] = caracterizacion_df['experiencia_laboral'].astype(str).str.upper().map(
+                {'SI': 1, 'NO': 0}
+            ).fillna(-1)
+
+        cols_a_unir = [
+            'id_estudiante', 'edad', 'genero', 'num_est_economico', 'etnia', 
+            'estado_civil', 'programa', 'periodo_ingreso', 'es_foraneo', 
+            'experiencia_laboral', 'num_grupo_fam', 'posicion_hermanos', 'est_alum'
+        ]
+        cols_existentes = [col for col in cols_a_unir if col in caracterizacion_df.columns]
+        demografia_unicos = caracterizacion_df[cols_existentes].groupby('id_estudiante').last().reset_index()
+        df_new = pd.merge(df_new, demografia_unicos, on='id_estudiante', how='left')
+
+        # Unir con datos de Discapacidad
+        if 'discapacidad' in dataframes_nuevos:
+            discapacidad_df = dataframes_nuevos['discapacidad']
+            if 'id_estudiante' in discapacidad_df.columns and 'discapacidad' in discapacidad_df.columns:
+                discapacidad_unicos = discapacidad_df[['id_estudiante', 'discapacidad']].groupby('id_estudiante').last().reset_index()
+                df_new = pd.merge(df_new, discapacidad_unicos, on='id_estudiante', how='left')
+
+        # Unir con datos Financieros
+        if 'pagos' in dataframes_nuevos:
+            pagos_df = dataframes_nuevos['pagos'].copy()
+            pagos_df['fecha_pago'] = pd.to_datetime(pagos_df['fecha_pago'], format='%d/%m/%Y', errors='coerce')
+            pagos_unicos = pagos_df.groupby('id_estudiante').last().reset_index()
+            year, sem = int(periodo_actual[:4]), periodo_actual[4]
+            fecha_vencimiento = datetime(year, 2, 28) if sem == 'A' else datetime(year, 8, 31)
+            pagos_unicos['pago_tardio'] = (pagos_unicos['fecha_pago'] > fecha_vencimiento).astype(int)
+            pagos_unicos['dias_retraso_pago'] = (pagos_unicos['fecha_pago'] - fecha_vencimiento).dt.days.clip(lower=0)
+            df_new = pd.merge(df_new, pagos_unicos[['id_estudiante', 'pago_tardio', 'dias_retraso_pago']], on='id_estudiante', how='left')
+
+    # Calcular características de Tendencia (una consulta al periodo anterior y un merge)
+    reportar("Calculando tendencia respecto al periodo anterior", 65, len(df_new))
+    with instrumentacion.medir('carga.tendencia', len(df_new)):
+        df_new = historial.agregar_features(df_new, periodo_actual)
+        def periodo_a_numero(p):
+            try: return int(p[:4]) * 2 + (1 if p[4] == 'A' else 2)
+            except: return np.nan
+
+        if 'periodo_ingreso' in df_new.columns:
+            periodo_actual_num = periodo_a_numero(periodo_actual)
+            df_new['periodo_ingreso_num'] = df_new['periodo_ingreso'].astype(str).apply(periodo_a_numero)
+            df_new['antiguedad_estudiante'] = (periodo_actual_num - df_new['periodo_ingreso_num']) + 1
+            df_new.drop(columns=['periodo_ingreso_num'], inplace=True)
 
     # 3. Limpieza Final antes de Guardar
     numeric_cols = df_new.select_dtypes(include=np.number).columns
     df_new[numeric_cols] = df_new[numeric_cols].fillna(0)
     print(" -> Valores NaN en columnas numéricas han sido reemplazados por 0.")
     
-    # 4. Guardar en Base de Datos y Calcular Riesgo
-    model_fields = [field.name for field in EstudiantePeriodo._meta.get_fields()]
-    print("Guardando estudiantes y calculando riesgo inicial...")
-    for _, row in df_new.iterrows():
-        defaults_data = {key: value for key, value in row.to_dict().items() if key in model_fields}
-        
-        obj, created = EstudiantePeriodo.objects.update_or_create(
-            id_estudiante=row['id_estudiante'],
-            periodo=periodo_actual,
-            defaults=defaults_data
+    # 4. Comparar con lo ya guardado del periodo: solo las filas nuevas o modificadas (y las
+    # que tienen un puntaje obsoleto) se vuelven a puntuar y a escribir
+    reportar("Comparando con los datos guardados", 70, len(df_new))
+    with instrumentacion.medir('carga.codificacion', len(df_new)):
+        df_new['huella_datos'] = huellas_datos(df_new)
+        # Columnas categóricas a códigos: los valores nuevos se registran en bloque antes de la
+        # transacción, y tanto el modelo como el guardado trabajan ya con los códigos
+        df_new = categorias.codificar(df_new)
+    paquete = PredictionService.paquete_activo()
+    with instrumentacion.medir('carga.comparacion', len(df_new)):
+        estado, puntaje_vigente, eliminados = comparar_con_periodo_guardado(
+            df_new, periodo_actual, paquete.version if paquete else None, eliminar_ausentes=reprocesar,
         )
+    a_escribir = (estado != SIN_CAMBIOS).to_numpy()
+    a_puntuar = a_escribir | ~puntaje_vigente
+
+    # 5. Calcular el Riesgo de esas filas en una sola pasada del modelo
+    print("Calculando riesgo de los estudiantes nuevos o modificados...")
+    reportar("Calculando riesgo", 75, int(a_puntuar.sum()))
+    with instrumentacion.medir('carga.puntaje', int(a_puntuar.sum())):
+        puntajes = PredictionService.puntuar_frame(df_new[a_puntuar], ya_codificado=True)
+    if puntajes is not None:
+        df_new[puntajes.columns] = puntajes  # Alinea por índice: las demás filas quedan en NaN
+    else:
+        print(" -> El modelo no está disponible; los estudiantes se guardarán sin riesgo calculado.")
+
+    # 6. Aplicar los cambios en una sola transacción: mientras tanto las consultas siguen viendo
+    # el periodo completo anterior
+    print("Guardando cambios...")
+    reportar("Guardando estudiantes", 80, int(a_escribir.sum()))
+    with transaction.atomic():
+        with instrumentacion.medir('carga.guardado', int(a_escribir.sum())):
+            guardar_estudiantes_en_bloque(df_new[a_escribir], periodo_actual, ya_codificado=True)
+            solo_puntaje = a_puntuar & ~a_escribir
+            if puntajes is not None and solo_puntaje.any():
+                guardar_estudiantes_en_bloque(
+                    df_new.loc[solo_puntaje, ['id_estudiante', *puntajes.columns]], periodo_actual, ya_codificado=True,
+                )
+            eliminar_estudiantes(periodo_actual, eliminados)
+
+        # 7. Materializar el resumen del periodo para el dashboard y el índice de búsqueda
+        reportar("Calculando resumen del periodo", 95, len(df_new))
+        with instrumentacion.medir('carga.resumen', len(df_new)):
+            actualizar_resumen_periodo(periodo_actual)
+            if a_escribir.any() or eliminados:
+                busqueda.indexar_periodo(periodo_actual)
+
+    cambios = {
+        NUEVOS: int((estado == NUEVOS).sum()),
+        MODIFICADOS: int((estado == MODIFICADOS).sum()),
+        'eliminados': len(eliminados),
+        SIN_CAMBIOS: int((estado == SIN_CAMBIOS).sum()),
+    }
+    print(" -> " + ", ".join(f"{cantidad} {nombre.replace('_', ' ')}" for nombre, cantidad in cambios.items()) + ".")
+
+    # 8. La tendencia del periodo siguiente (si ya estaba cargado) se calcula contra este periodo
+    if a_escribir.any() or eliminados:
+        siguiente, actualizados = actualizar_features_periodo_siguiente(periodo_actual)
+        if actualizados:
+            print(f" -> {actualizados} estudiantes de {siguiente} con tendencia recalculada.")
+        busqueda.optimizar()
 
-        prediccion = PredictionService.predict(obj.id_estudiante, obj.periodo)
-        if not prediccion.get('error'):
-            obj.ultima_prob_riesgo = prediccion.get('probabilidad')
-            obj.save()
-            
     print("¡Proceso de carga y cálculo de riesgo completado!")
-    return True
+    return cambios
+
+
+def guardar_estudiantes_en_bloque(df, periodo, tamano_lote=None, ya_codificado=False):
+    """
+    Inserta o actualiza (upsert) las filas de `df` como registros de EstudiantePeriodo del
+    periodo indicado, usando la restricción única (id_estudiante, periodo). Todo ocurre en
+    una sola transacción y los registros se arman y envían en lotes de `tamano_lote` (por
+    defecto settings.TAMANO_LOTE_CARGA), con hasta ese número de filas por INSERT; Django
+    parte cada lote en sentencias más pequeñas si el motor limita los parámetros (SQLite).
+    Las columnas categóricas se pasan a códigos en bloque (ver core/categorias.py), salvo que
+    `ya_codificado` indique que `df` ya los trae. Devuelve el número de registros escritos.
+    """
+    tamano_lote = tamano_lote or getattr(settings, 'TAMANO_LOTE_CARGA', 1000)
+    if not ya_codificado:
+        df = categorias.codificar(df)
+    campos_modelo = [field.name for field in EstudiantePeriodo._meta.concrete_fields if not field.primary_key]
+    columnas = [col for col in df.columns if col in campos_modelo and col not in ('id_estudiante', 'periodo')]
 
+    # Los NaN de pandas se guardan como NULL y no como el texto 'nan'
+    datos = df[['id_estudiante'] + columnas]
+    datos = datos.astype(object).where(datos.notna(), None)
 
+    with transaction.atomic():
+        for inicio in range(0, len(datos), tamano_lote):
+            lote = [
+                EstudiantePeriodo(periodo=periodo, **fila)
+                for fila in datos.iloc[inicio:inicio + tamano_lote].to_dict('records')
+            ]
+            EstudiantePeriodo.objects.bulk_create(
+                lote,
+                batch_size=tamano_lote,
+                update_conflicts=True,
+                unique_fields=['id_estudiante', 'periodo'],
+                update_fields=columnas,
+            )
+    return len(datos)
+
+
+def huellas_datos(df):
+    """
+    Huella (16 caracteres hex) de los datos de cada fila que se guardan en EstudiantePeriodo,
+    sin contar el puntaje. Se calcula vectorizada sobre todas las columnas a la vez.
+    """
+    campos_modelo = {field.name for field in EstudiantePeriodo._meta.concrete_fields}
+    excluidas = {'id', 'id_estudiante', 'periodo', 'huella_datos', *COLUMNAS_PUNTAJE}
+    columnas = sorted(col for col in df.columns if col in campos_modelo and col not in excluidas)
+    datos = df[columnas]
+    # Un mismo valor debe dar la misma huella aunque la columna pase de entero a flotante
+    # (por ejemplo, cuando un estudiante nuevo trae un NaN)
+    datos = datos.astype({col: 'float64' for col in datos.select_dtypes(include=[np.number, 'bool']).columns})
+    return pd.util.hash_pandas_object(datos, index=False).map('{:016x}'.format)
+
+
+def comparar_con_periodo_guardado(df, periodo, version_modelo, eliminar_ausentes=False):
+    """
+    Compara las filas de `df` (con su columna `huella_datos`) con lo guardado del periodo en
+    una sola consulta. Devuelve (estado de cada fila: NUEVOS, MODIFICADOS o SIN_CAMBIOS;
+    arreglo que indica si el puntaje guardado sigue vigente para `version_modelo`; lista de
+    IDs guardados que no están en `df`, vacía salvo con `eliminar_ausentes`).
+    """
+    guardados = pd.DataFrame.from_records(
+        list(EstudiantePeriodo.objects.filter(periodo=periodo).values_list(
+            'id_estudiante', 'huella_datos', 'version_modelo', 'ultima_prob_riesgo',
+        )),
+        columns=['id_estudiante', 'huella_guardada', 'version_guardada', 'prob_guardada'],
+    )
+    cruce = df[['id_estudiante', 'huella_datos']].merge(guardados, on='id_estudiante', how='left')
+    existe = cruce['id_estudiante'].isin(guardados['id_estudiante']).to_numpy()
+    igual = (cruce['huella_datos'] == cruce['huella_guardada']).to_numpy()
+    estado = pd.Series(
+        np.select([~existe, igual], [NUEVOS, SIN_CAMBIOS], MODIFICADOS), index=df.index,
+    )
+    puntaje_vigente = (
+        version_modelo is None
+        or (cruce['prob_guardada'].notna() & (cruce['version_guardada'] == version_modelo)).to_numpy()
+    )
+    puntaje_vigente = np.broadcast_to(puntaje_vigente, len(df))
+
+    eliminados = []
+    if eliminar_ausentes:
+        eliminados = guardados.loc[~guardados['id_estudiante'].isin(df['id_estudiante']), 'id_estudiante'].tolist()
+    return estado, puntaje_vigente, eliminados
+
+
+def eliminar_estudiantes(periodo, ids, tamano_lote=None):
+    """Elimina del periodo los estudiantes indicados, en lotes para no exceder los parámetros de la consulta."""
+    tamano_lote = tamano_lote or getattr(settings, 'TAMANO_LOTE_CARGA', 1000)
+    for inicio in range(0, len(ids), tamano_lote):
+        EstudiantePeriodo.objects.filter(periodo=periodo, id_estudiante__in=ids[inicio:inicio + tamano_lote]).delete()
+
+
+def actualizar_features_periodo_siguiente(periodo):
+    """
+    Recalcula las features de tendencia del periodo que sigue a `periodo` (por ejemplo, al
+    reprocesar un periodo antiguo) y vuelve a puntuar a los estudiantes cuyas features
+    cambiaron. Devuelve (periodo siguiente, filas actualizadas).
+    """
+    siguiente, cambios = historial.cambios_periodo_siguiente(periodo)
+    if siguiente is None or cambios.empty:
+        return siguiente, 0
+
+    # Sus datos guardados cambian: la huella de la carga ya no los describe
+    cambios = cambios.assign(huella_datos=None)
+    guardar_estudiantes_en_bloque(cambios, siguiente)
+    # Las filas actualizadas ya no coinciden con su huella de features: solo esas se recalculan
+    reevaluar_predicciones_obsoletas(periodo=siguiente)
+    actualizar_resumen_periodo(siguiente)
+    return siguiente, len(cambios)
+
+
+def reevaluar_predicciones_obsoletas(periodo=None, tamano_lote=None):
+    """
+    Recalcula en bloque el riesgo de los registros cuya predicción guardada ya no es válida:
+    sin puntaje, calculada con otra versión del modelo o con features distintas a las actuales.
+    Pensada para ejecutarse después de cambiar el modelo. Devuelve cuántos registros se
+    evaluaron y cuántos se recalcularon.
+    """
+    paquete = PredictionService.paquete_activo()
+    if paquete is None:
+        return {"error": "El modelo de predicción no está disponible."}
+
+    tamano_lote = tamano_lote or getattr(settings, 'TAMANO_LOTE_CARGA', 1000)
+    queryset = EstudiantePeriodo.objects.all()
+    if periodo:
+        queryset = queryset.filter(periodo=periodo)
+
+    evaluados = reevaluados = 0
+    periodos_afectados = set()
+    ultimo_id = 0
+    while True:
+        # Paginación por clave primaria: cada bloque es una consulta indexada
+        filas = list(queryset.filter(pk__gt=ultimo_id).order_by('pk').values()[:tamano_lote])
+        if not filas:
+            break
+        ultimo_id = filas[-1]['id']
+        df = pd.DataFrame(filas)
+
+        X = paquete.codificador.codificar_frame(df)
+        huellas = np.array([paquete.codificador.huella(fila) for fila in X])
+        obsoletos = (
+            df['ultima_prob_riesgo'].isna().to_numpy()
+            | (df['version_modelo'] != paquete.version).to_numpy()
+            | (df['huella_features'].to_numpy() != huellas)
+        )
+        evaluados += len(df)
+        if obsoletos.any():
+            probabilidades = paquete.predecir(X[obsoletos])
+            actualizados = [
+                EstudiantePeriodo(
+                    id_estudiante=id_est, periodo=periodo_est, ultima_prob_riesgo=float(prob),
+                    version_modelo=paquete.version, huella_features=huella,
+                )
+                for id_est, periodo_est, prob, huella in zip(
+                    df['id_estudiante'].to_numpy()[obsoletos], df['periodo'].to_numpy()[obsoletos],
+                    probabilidades, huellas[obsoletos],
+                )
+            ]
+            # Upsert por (id_estudiante, periodo): bulk_update arma un CASE por fila y con
+            # decenas de miles de filas tarda minutos
+            EstudiantePeriodo.objects.bulk_create(
+                actualizados,
+                batch_size=tamano_lote,
+                update_conflicts=True,
+                unique_fields=['id_estudiante', 'periodo'],
+                update_fields=['ultima_prob_riesgo', 'version_modelo', 'huella_features'],
+            )
+            reevaluados += len(actualizados)
+            periodos_afectados.update(df['periodo'].to_numpy()[obsoletos])
+
+    for periodo_afectado in sorted(periodos_afectados):
+        actualizar_resumen_periodo(periodo_afectado)
+
+    print(f" -> {reevaluados} de {evaluados} predicciones recalculadas.")
+    return {'evaluados': evaluados, 'reevaluados': reevaluados}
+
+
+def calcular_resumen_periodo(estudiantes, umbral):
+    """
+    Agrega en la BD los indicadores del dashboard para el queryset `estudiantes` de un periodo:
+    totales, estudiantes en riesgo, riesgo por antigüedad y por programa, y distribución por
+    deciles de probabilidad.
+    """
+    en_riesgo = Q(ultima_prob_riesgo__gte=umbral)
+    deciles = {
+        f'decil_{i}': Count('pk', filter=Q(ultima_prob_riesgo__gte=i / 10) & (
+            Q(ultima_prob_riesgo__lt=(i + 1) / 10) if i < 9 else Q()
+        ))
+        for i in range(10)
+    }
+    totales = estudiantes.aggregate(
+        total=Count('pk'), riesgo=Count('pk', filter=en_riesgo), **deciles,
+    )
+
+    por_antiguedad = (
+        estudiantes.filter(en_riesgo, antiguedad_estudiante__isnull=False)
+        .values_list('antiguedad_estudiante').annotate(n=Count('pk')).order_by('antiguedad_estudiante')
+    )
+    por_programa = (
+        estudiantes.values_list('programa')
+        .annotate(total=Count('pk'), riesgo=Count('pk', filter=en_riesgo)).order_by('programa')
+    )
+
+    return {
+        'umbral': umbral,
+        'total_estudiantes': totales['total'],
+        'riesgo_alto_count': totales['riesgo'],
+        'riesgo_por_antiguedad': {str(semestre): n for semestre, n in por_antiguedad},
+        'riesgo_por_programa': {
+            programa or 'SIN PROGRAMA': {'total': total, 'riesgo': riesgo}
+            for programa, total, riesgo in por_programa
+        },
+        'deciles_probabilidad': [totales[f'decil_{i}'] for i in range(10)],
+    }
+
+
+def actualizar_resumen_periodo(periodo):
+    """
+    Recalcula y guarda el PeriodoResumen de un periodo; si el periodo ya no tiene estudiantes
+    se elimina su resumen. Devuelve el resumen o None.
+    """
+    estudiantes = EstudiantePeriodo.objects.filter(periodo=periodo)
+    datos = calcular_resumen_periodo(estudiantes, settings.UMBRAL_PREDICCION)
+    if not datos['total_estudiantes']:
+        PeriodoResumen.objects.filter(periodo=periodo).delete()
+        return None
+    # Nueva versión de datos: invalida las entradas de caché de las vistas del periodo
+    datos['version_datos'] = generar_version_datos()
+    resumen, _ = PeriodoResumen.objects.update_or_create(periodo=periodo, defaults=datos)
+    return resumen
 
 
 def validar_predicciones_con_lista_activos(periodo_prediccion, ids_estudiantes_activos):
     """
     Compara las predicciones de un periodo contra una lista explícita de IDs de estudiantes
     que se consideran "activos" o que no desertaron.
+
+    Los IDs y probabilidades se leen en una sola consulta (`values_list`) a arreglos de NumPy
+    y todas las métricas se calculan vectorizadas (ver core/metricas.py): matriz de confusión
+    en el umbral vigente, barrido de umbrales, ROC-AUC, PR-AUC y calibración. Los estudiantes
+    de cada grupo de la matriz se devuelven como listas de (ID, probabilidad), ordenadas por
+    probabilidad descendente, para paginarlas sin cargar objetos.
     """
     umbral = settings.UMBRAL_PREDICCION
 
-    # 1. Obtener a todos los estudiantes que se predijeron en el periodo de interés
-    estudiantes_a_evaluar = EstudiantePeriodo.objects.filter(periodo=periodo_prediccion)
-
-    if not estudiantes_a_evaluar.exists():
+    # 1. IDs y probabilidades de todos los estudiantes que se predijeron en el periodo de interés
+    filas = list(
+        EstudiantePeriodo.objects.filter(periodo=periodo_prediccion).values_list('id_estudiante', 'ultima_prob_riesgo')
+    )
+    if not filas:
         return {"error": f"No se encontraron datos para el periodo de predicción {periodo_prediccion}."}
 
-    # 2. Clasificar a cada estudiante basado en la lista de IDs activos
-    verdaderos_positivos = [] # Predijimos riesgo, y desertaron (no están en la lista de activos)
-    falsos_positivos = []    # Predijimos riesgo, pero no desertaron (sí están en la lista de activos)
-    falsos_negativos = []    # No predijimos riesgo, pero desertaron (no están en la lista de activos)
-    verdaderos_negativos = [] # No predijimos riesgo, y no desertaron (sí están en la lista de activos)
-    
-    total_deserciones_reales = 0
-
-    for estudiante in estudiantes_a_evaluar:
-        prediccion_fue_riesgo = (estudiante.ultima_prob_riesgo is not None and estudiante.ultima_prob_riesgo >= umbral)
-        # El estudiante NO desertó si su ID está en la lista de activos que subimos
-        no_deserto_realmente = estudiante.id_estudiante in ids_estudiantes_activos
-
-        if not no_deserto_realmente:
-            total_deserciones_reales += 1
-
-        if prediccion_fue_riesgo and not no_deserto_realmente:
-            verdaderos_positivos.append(estudiante)
-        elif prediccion_fue_riesgo and no_deserto_realmente:
-            falsos_positivos.append(estudiante)
-        elif not prediccion_fue_riesgo and not no_deserto_realmente:
-            falsos_negativos.append(estudiante)
-        elif not prediccion_fue_riesgo and no_deserto_realmente:
-            verdaderos_negativos.append(estudiante)
-
-    # 3. Calcular Métricas
-    tp = len(verdaderos_positivos)
-    fp = len(falsos_positivos)
-    fn = len(falsos_negativos)
-    
-    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
+    ids, probabilidades = zip(*filas)
+    ids = np.array(ids, dtype=str)
+    probabilidades = np.array(probabilidades, dtype=float)  # None -> NaN (sin riesgo calculado)
+
+    # 2. El estudiante desertó si su ID NO está en la lista de activos que subimos
+    activos = np.array(list(ids_estudiantes_activos), dtype=str)
+    desertaron = ~np.isin(ids, activos)
+
+    # 3. Calcular métricas (NaN >= umbral es falso: sin probabilidad cuenta como "sin riesgo")
+    evaluacion = metricas.evaluar(desertaron, probabilidades, umbral)
+
+    prediccion_riesgo = probabilidades >= umbral
+    orden = np.argsort(-np.nan_to_num(probabilidades, nan=-1.0), kind='stable')
+    valores = probabilidades.astype(object)
+    valores[np.isnan(probabilidades)] = None
+
+    def grupo(mascara):
+        seleccion = orden[mascara[orden]]
+        return list(zip(ids[seleccion].tolist(), valores[seleccion].tolist()))
 
     return {
         'periodo_prediccion': periodo_prediccion,
-        'total_estudiantes_evaluados': len(estudiantes_a_evaluar),
-        'total_deserciones_reales': total_deserciones_reales,
-        'recall': recall * 100,
-        'precision': precision * 100,
-        'verdaderos_positivos': verdaderos_positivos,
-        'falsos_positivos': falsos_positivos,
-        'falsos_negativos': falsos_negativos,
-    }
\ No newline at end of file
+        'umbral': umbral,
+        'total_estudiantes_evaluados': len(ids),
+        'total_deserciones_reales': int(desertaron.sum()),
+        'sin_probabilidad': int(np.isnan(probabilidades).sum()),
+        'recall': evaluacion['recall'] * 100,
+        'precision': evaluacion['precision'] * 100,
+        'f1': evaluacion['f1'] * 100,
+        'matriz': evaluacion['matriz'],
+        'roc_auc': evaluacion['roc_auc'],
+        'pr_auc': evaluacion['pr_auc'],
+        'mejor_umbral_f1': evaluacion['mejor_umbral_f1'],
+        'barrido': evaluacion['barrido'],
+        'calibracion': evaluacion['calibracion'],
+        'verdaderos_positivos': grupo(prediccion_riesgo & desertaron),
+        'falsos_positivos': grupo(prediccion_riesgo & ~desertaron),
+        'falsos_negativos': grupo(~prediccion_riesgo & desertaron),
+    }
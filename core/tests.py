@@ -1,3 +1,1836 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import tracemalloc
+import zipfile
+from datetime import datetime
+from io import BytesIO, StringIO
+from unittest import addModuleCleanup, mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+import openpyxl
+import pandas as pd
+import xgboost as xgb
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import (
+    backtest, busqueda, cache_periodos, cache_reportes, categorias, datos_sinteticos, historial, instrumentacion,
+    lector_activos, lector_excel, paginacion, views,
+)
+from .consultas import PresupuestoConsultasExcedido, PresupuestoConsultasMixin
+from .jobs import encolar_lote, procesar_cola, tomar_siguiente_lote
+from .management.commands.benchmark_carga import generar_periodo_sintetico
+from .lector_activos import detectar_codificacion, detectar_separador, leer_ids_activos
+from .microbatch import MicroBatcher
+from .modelos import ARCHIVO_COLUMNAS, ARCHIVO_MODELO, ErrorModelo, RegistroModelos
+from .models import Categoria, EstudiantePeriodo, LoteCargaDatos, PeriodoResumen, ResultadoBacktest
+from .predictions import PredictionService
+from .services import (
+    actualizar_resumen_periodo,
+    agregar_notas,
+    agregar_notas_por_bloques,
+    estandarizar_id_estudiante,
+    guardar_estudiantes_en_bloque,
+    normalizar_columnas,
+    procesar_y_guardar_datos_de_periodo,
+    reevaluar_predicciones_obsoletas,
+    validar_predicciones_con_lista_activos,
+)
+
+
+GENEROS = ['Femenino', 'Masculino']
+ETNIAS = ['amarilla', 'blanca', 'indigena', 'mestiza', 'negra']
+ESTADOS_CIVILES = ['Casado', 'Pendiente', 'Soltero', 'Union_libre']
+
+
+def setUpModule():
+    # Las etapas de la carga se escriben en INFO: en las pruebas solo interesan las advertencias
+    registro = logging.getLogger('core.instrumentacion')
+    addModuleCleanup(registro.setLevel, registro.level)
+    registro.setLevel(logging.WARNING)
+
+
+def escribir_reportes(directorio, num_estudiantes, semilla=0):
+    """
+    Genera los cuatro reportes institucionales en CSV (separados por ';', latin1),
+    con las columnas que espera `procesar_y_guardar_datos_de_periodo`.
+    """
+    rng = np.random.default_rng(semilla)
+    ids = [str(1000000 + i) for i in range(num_estudiantes)]
+
+    caracterizacion = pd.DataFrame({
+        'Cedula': ids,
+        'Edad': rng.integers(16, 45, num_estudiantes),
+        'Genero': rng.choice(GENEROS, num_estudiantes),
+        'Num_Est_Economico': rng.integers(1, 6, num_estudiantes),
+        'Etnia': rng.choice(ETNIAS, num_estudiantes),
+        'Estado_Civil': rng.choice(ESTADOS_CIVILES, num_estudiantes),
+        'Programa': rng.choice(['SISTEMAS', 'DERECHO', 'CONTADURIA'], num_estudiantes),
+        'Periodo_Ingreso': rng.choice(['2022A', '2022B', '2023A', '2024B'], num_estudiantes),
+        'Lugar_Residencia': rng.choice(['CALI', 'PALMIRA', 'JAMUNDI'], num_estudiantes),
+        'Experiencia_Laboral': rng.choice(['SI', 'NO', ''], num_estudiantes),
+        'Num_Grupo_Fam': rng.integers(1, 8, num_estudiantes),
+        'Posicion_Hermanos': rng.integers(1, 5, num_estudiantes),
+        'Est_Alum': rng.choice(['ACTIVO', 'ACTIVO', 'ACTIVO', 'GRADUADO'], num_estudiantes),
+    })
+
+    materias = ['CALCULO', 'FISICA', 'ETICA', 'INGLES', 'PROGRAMACION']
+    filas_notas = []
+    for id_est in ids:
+        for materia in rng.choice(materias, rng.integers(1, len(materias) + 1), replace=False):
+            filas_notas.append((id_est, materia, round(float(rng.uniform(0, 5)), 1)))
+    notas = pd.DataFrame(filas_notas, columns=['Ide_Estudiante', 'Nom_Materia', 'Def_Historia'])
+
+    pagos = pd.DataFrame({
+        'Num_Identificacion': ids,
+        'Fecha_Pago': [f"{d:02d}/0{m}/2025" for d, m in zip(rng.integers(1, 28, num_estudiantes), rng.integers(1, 5, num_estudiantes))],
+    })
+
+    discapacidad = pd.DataFrame({
+        'Identificacion': ids[::7],
+        'Discapacidad': rng.choice(['VISUAL', 'AUDITIVA', 'NINGUNA'], len(ids[::7])),
+    })
+
+    rutas = {}
+    for nombre, df in [('caracterizacion', caracterizacion), ('notas', notas), ('pagos', pagos), ('discapacidad', discapacidad)]:
+        rutas[nombre] = os.path.join(directorio, f"{nombre}.csv")
+        df.to_csv(rutas[nombre], sep=';', encoding='latin1', index=False)
+    return rutas
+
+
+def codificar_fila_como_antes(datos, columnas_modelo):
+    """
+    Copia fija de la codificación por fila anterior al puntaje por lotes: un DataFrame de una
+    fila, get_dummies y reindex a las columnas del modelo. Sin drop_first, que con una sola
+    fila descartaba la única categoría presente; la categoría base no tiene columna en el
+    modelo, así que el reindex la descarta igual que en el entrenamiento.
+    """
+    df_pred = pd.get_dummies(pd.DataFrame([datos]), dtype=float)
+    return df_pred.reindex(columns=columnas_modelo, fill_value=0).apply(pd.to_numeric, errors='coerce').fillna(0)
+
+
+class PredictFrameTests(TestCase):
+    """El puntaje por lotes debe coincidir con el puntaje individual de cada estudiante."""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        for i in range(40):
+            EstudiantePeriodo.objects.create(
+                id_estudiante=str(i),
+                periodo='2025A',
+                promedio_semestral=float(rng.uniform(0, 5)),
+                num_materias_cursadas=int(rng.integers(1, 8)),
+                num_materias_reprobadas=int(rng.integers(0, 4)),
+                edad=int(rng.integers(16, 45)),
+                genero=GENEROS[i % 2],
+                etnia=ETNIAS[i % len(ETNIAS)],
+                estado_civil=ESTADOS_CIVILES[i % len(ESTADOS_CIVILES)],
+                es_foraneo=i % 2,
+                pago_tardio=int(i % 3 == 0),
+                dias_retraso_pago=int(rng.integers(0, 60)),
+                antiguedad_estudiante=int(rng.integers(1, 10)),
+                experiencia_laboral=[-1, 0, 1][i % 3],
+                programa='SISTEMAS',
+                # Algunas filas sin datos demográficos, como llegan en los reportes reales
+                num_grupo_fam=None if i % 5 == 0 else int(rng.integers(1, 8)),
+            )
+
+    def test_predict_frame_coincide_con_la_codificacion_por_fila(self):
+        df = pd.DataFrame(list(EstudiantePeriodo.objects.order_by('id').values()))
+        probabilidades = PredictionService.predict_frame(df)
+
+        self.assertEqual(len(probabilidades), len(df))
+        paquete = PredictionService.paquete_activo()
+        for fila, prob_lote in zip(df.to_dict('records'), probabilidades):
+            X = codificar_fila_como_antes(fila, paquete.columnas)
+            esperada = float(paquete.modelo.predict_proba(X)[:, 1][0])
+            self.assertAlmostEqual(prob_lote, esperada, places=6)
+            prediccion = PredictionService.predict(fila['id_estudiante'], fila['periodo'])
+            self.assertAlmostEqual(prediccion['probabilidad'], esperada, places=6)
+
+    def test_predict_frame_vacio(self):
+        self.assertEqual(len(PredictionService.predict_frame(pd.DataFrame())), 0)
+
+
+class CodificadorFeaturesTests(TestCase):
+
+    def setUp(self):
+        self.paquete = PredictionService.paquete_activo()
+        self.codificador = self.paquete.codificador
+
+    def datos_de_entrenamiento(self):
+        """Frame con todas las categorías, incluida la base que drop_first descarta en el entrenamiento."""
+        rng = np.random.default_rng(5)
+        filas = 200
+        return pd.DataFrame({
+            'promedio_semestral': rng.uniform(0, 5, filas),
+            'num_materias_cursadas': rng.integers(1, 8, filas),
+            'edad': rng.integers(16, 45, filas),
+            'antiguedad_estudiante': rng.integers(1, 10, filas),
+            'genero': rng.choice(GENEROS, filas),
+            'etnia': rng.choice(['afrocolombiana'] + ETNIAS, filas),
+            'estado_civil': rng.choice(ESTADOS_CIVILES, filas),
+        })
+
+    def test_coincide_con_la_codificacion_de_entrenamiento(self):
+        df = self.datos_de_entrenamiento()
+        esperado = pd.get_dummies(df, drop_first=True).reindex(columns=self.paquete.columnas, fill_value=0)
+        np.testing.assert_array_equal(self.codificador.codificar_frame(df), esperado.to_numpy(dtype=float))
+
+    def test_fila_y_frame_codifican_igual(self):
+        df = self.datos_de_entrenamiento()
+        df.loc[3, 'genero'] = None
+        df.loc[4, 'edad'] = np.nan
+        matriz = self.codificador.codificar_frame(df)
+        for i, fila in enumerate(df.to_dict('records')):
+            np.testing.assert_array_equal(self.codificador.codificar_fila(fila)[0], matriz[i])
+
+    def test_una_sola_fila_conserva_su_categoria(self):
+        fila = self.codificador.codificar_fila({'genero': 'Masculino', 'etnia': 'negra', 'estado_civil': 'Soltero', 'edad': 20})
+        columnas = self.paquete.columnas
+        for columna in ('genero_Masculino', 'etnia_negra', 'estado_civil_Soltero'):
+            self.assertEqual(fila[0, columnas.index(columna)], 1.0)
+        self.assertEqual(fila[0, columnas.index('edad')], 20.0)
+        self.assertEqual(fila.sum(), 23.0)
+
+    def test_valores_desconocidos_quedan_en_cero(self):
+        fila = self.codificador.codificar_fila({'genero': 'Otro', 'etnia': None, 'edad': 'N/A'})
+        self.assertFalse(fila.any())
+
+    def test_codigos_de_categoria_codifican_igual_que_los_textos(self):
+        df = self.datos_de_entrenamiento()
+        df.loc[3, 'genero'] = None
+        df.loc[5, 'etnia'] = 'sin columna en el modelo'
+        codificado = categorias.codificar(df)
+        self.assertEqual(str(codificado['genero'].dtype), 'Int64')
+        np.testing.assert_array_equal(
+            self.codificador.codificar_frame(codificado, ya_codificado=True), self.codificador.codificar_frame(df),
+        )
+
+    def test_enteros_sin_codificar_se_toman_como_texto(self):
+        df = self.datos_de_entrenamiento()
+        categorias.codificar(df)  # Registra códigos que un entero del reporte podría confundir
+        df['genero'] = np.arange(len(df)) % 3
+        self.assertEqual(str(df['genero'].dtype), 'int64')
+        X = self.codificador.codificar_frame(df)
+        columnas_genero = [i for i, c in enumerate(self.paquete.columnas) if c.startswith('genero_')]
+        self.assertFalse(X[:, columnas_genero].any())
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class ProcesarPeriodoTests(TestCase):
+
+    def test_carga_guarda_el_riesgo_calculado_por_lotes(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = escribir_reportes(directorio, 60)
+            self.assertTrue(procesar_y_guardar_datos_de_periodo(rutas, '2025A'))
+
+        estudiantes = EstudiantePeriodo.objects.filter(periodo='2025A')
+        self.assertGreater(estudiantes.count(), 0)
+        self.assertFalse(estudiantes.filter(est_alum='GRADUADO').exists())
+        for estudiante in estudiantes:
+            prediccion = PredictionService.predict(estudiante.id_estudiante, estudiante.periodo)
+            self.assertAlmostEqual(estudiante.ultima_prob_riesgo, prediccion['probabilidad'], places=6)
+
+
+class GuardarEnBloqueTests(TestCase):
+
+    def test_upsert_inserta_y_actualiza_sin_duplicar(self):
+        df = generar_periodo_sintetico(25)
+        EstudiantePeriodo.objects.create(id_estudiante='1000003', periodo='2025A', promedio_semestral=1.0)
+        EstudiantePeriodo.objects.create(id_estudiante='1000003', periodo='2024B', promedio_semestral=2.0)
+
+        self.assertEqual(guardar_estudiantes_en_bloque(df, '2025A'), 25)
+
+        self.assertEqual(EstudiantePeriodo.objects.filter(periodo='2025A').count(), 25)
+        actualizado = EstudiantePeriodo.objects.get(id_estudiante='1000003', periodo='2025A')
+        self.assertAlmostEqual(actualizado.promedio_semestral, df.loc[3, 'promedio_semestral'])
+        self.assertAlmostEqual(actualizado.ultima_prob_riesgo, df.loc[3, 'ultima_prob_riesgo'])
+        # Otros periodos del mismo estudiante no se tocan
+        self.assertEqual(EstudiantePeriodo.objects.get(id_estudiante='1000003', periodo='2024B').promedio_semestral, 2.0)
+
+    def test_nan_se_guarda_como_null(self):
+        df = generar_periodo_sintetico(5)
+        df['discapacidad'] = np.nan
+        guardar_estudiantes_en_bloque(df, '2025A')
+        self.assertEqual(EstudiantePeriodo.objects.filter(discapacidad__isnull=True).count(), 5)
+
+    def test_respeta_el_tamano_de_lote(self):
+        df = generar_periodo_sintetico(20)
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_estudiantes_en_bloque(df, '2025A', tamano_lote=7)
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "core_estudianteperiodo"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_el_motor_limita_las_filas_por_insert(self):
+        df = generar_periodo_sintetico(100)
+        campos = [f for f in EstudiantePeriodo._meta.concrete_fields if not f.primary_key]
+        maximo = connection.ops.bulk_batch_size(campos, [None] * len(df))
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_estudiantes_en_bloque(df, '2025A', tamano_lote=1000)
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "core_estudianteperiodo"')]
+        self.assertEqual(len(inserts), -(-len(df) // min(maximo, 1000)))
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class ColaDeLotesTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def crear_lote(self, periodo='2025A', num_estudiantes=30):
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = escribir_reportes(directorio, num_estudiantes)
+            archivos = {}
+            for nombre, ruta in rutas.items():
+                with open(ruta, 'rb') as f:
+                    archivos[f'reporte_{nombre}'] = SimpleUploadedFile(f'{nombre}.csv', f.read())
+        return LoteCargaDatos.objects.create(periodo=periodo, **archivos)
+
+    def test_worker_procesa_el_lote_encolado(self):
+        lote = self.crear_lote()
+        encolar_lote(lote)
+        self.assertEqual(EstudiantePeriodo.objects.count(), 0)
+
+        call_command('procesar_lotes', '--una-vez', stdout=StringIO())
+
+        lote.refresh_from_db()
+        self.assertEqual(lote.estado, LoteCargaDatos.Estado.COMPLETADO)
+        self.assertTrue(lote.procesado)
+        self.assertEqual(lote.progreso, 100)
+        self.assertEqual(lote.filas_procesadas, 30)
+        self.assertIsNotNone(lote.tiempo_transcurrido)
+        self.assertEqual(EstudiantePeriodo.objects.filter(periodo='2025A').count(), 30)
+
+    def test_reprocesar_reemplaza_los_datos_del_periodo(self):
+        lote = self.crear_lote()
+        EstudiantePeriodo.objects.create(id_estudiante='obsoleto', periodo='2025A')
+        encolar_lote(lote, reprocesar=True)
+
+        self.assertEqual(procesar_cola(), 1)
+
+        self.assertFalse(EstudiantePeriodo.objects.filter(id_estudiante='obsoleto').exists())
+        self.assertEqual(EstudiantePeriodo.objects.filter(periodo='2025A').count(), 30)
+
+    def test_lote_identico_no_se_vuelve_a_ingerir(self):
+        primero = self.crear_lote()
+        encolar_lote(primero)
+        procesar_cola()
+        EstudiantePeriodo.objects.filter(id_estudiante='1000000').delete()
+
+        segundo = self.crear_lote()
+        encolar_lote(segundo)
+        procesar_cola()
+
+        segundo.refresh_from_db()
+        self.assertEqual(segundo.estado, LoteCargaDatos.Estado.COMPLETADO)
+        self.assertEqual(segundo.huella_contenido, LoteCargaDatos.objects.get(pk=primero.pk).huella_contenido)
+        self.assertIn('idéntico', segundo.etapa)
+        self.assertFalse(EstudiantePeriodo.objects.filter(id_estudiante='1000000').exists())
+
+        # Reprocesar explícitamente sí vuelve a cargar los datos
+        encolar_lote(segundo, reprocesar=True)
+        procesar_cola()
+        self.assertTrue(EstudiantePeriodo.objects.filter(id_estudiante='1000000').exists())
+
+    def test_un_lote_solo_se_toma_una_vez(self):
+        encolar_lote(self.crear_lote())
+        self.assertIsNotNone(tomar_siguiente_lote())
+        self.assertIsNone(tomar_siguiente_lote())
+
+    def test_error_queda_registrado_en_el_lote(self):
+        lote = self.crear_lote()
+        os.remove(lote.reporte_notas.path)
+        encolar_lote(lote)
+
+        procesar_cola()
+
+        lote.refresh_from_db()
+        self.assertEqual(lote.estado, LoteCargaDatos.Estado.ERROR)
+        self.assertFalse(lote.procesado)
+        self.assertTrue(lote.mensaje_error)
+
+    def test_admin_encola_sin_procesar_en_la_peticion(self):
+        usuario = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+        lote = self.crear_lote()
+
+        respuesta = self.client.post(
+            reverse('admin:core_lotecargadatos_changelist'),
+            {'action': 'reprocesar_lotes_seleccionados', '_selected_action': [lote.pk]},
+        )
+
+        self.assertEqual(respuesta.status_code, 302)
+        lote.refresh_from_db()
+        self.assertEqual(lote.estado, LoteCargaDatos.Estado.EN_COLA)
+        self.assertTrue(lote.reprocesar)
+        self.assertEqual(EstudiantePeriodo.objects.count(), 0)
+
+        listado = self.client.get(reverse('admin:core_lotecargadatos_changelist'))
+        self.assertContains(listado, 'data-activo="si"')
+        progreso = self.client.get(reverse('admin:core_lotecargadatos_progreso'), {'ids': str(lote.pk)}).json()
+        self.assertEqual(progreso['lotes'][0]['estado'], 'EN_COLA')
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class NotasPorBloquesTests(TestCase):
+
+    def notas_de_prueba(self):
+        rng = np.random.default_rng(3)
+        filas = 500
+        notas = pd.DataFrame({
+            'Ide_Estudiante': rng.choice([f"{i}" for i in range(60)] + ['7.0'], filas),
+            'Nom_Materia': rng.choice(['CALCULO', 'FISICA', 'ETICA', 'INGLES', None], filas),
+            'Def_Historia': rng.uniform(0, 5, filas).round(1),
+        })
+        notas.loc[rng.choice(filas, 40, replace=False), 'Def_Historia'] = np.nan
+        # Un estudiante sin ninguna nota válida
+        notas.loc[len(notas)] = ['sin_notas', 'CALCULO', np.nan]
+        return notas
+
+    def agregado_completo(self, ruta):
+        df = pd.read_csv(ruta, sep=';', encoding='latin1', low_memory=False) if ruta.endswith('.csv') else pd.read_excel(ruta)
+        return agregar_notas(estandarizar_id_estudiante(normalizar_columnas(df)))
+
+    def test_csv_por_bloques_coincide_con_groupby(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'notas.csv')
+            self.notas_de_prueba().to_csv(ruta, sep=';', encoding='latin1', index=False)
+            esperado = self.agregado_completo(ruta)
+            for tamano_bloque in (7, 64, 10000):
+                pd.testing.assert_frame_equal(agregar_notas_por_bloques(ruta, tamano_bloque), esperado, rtol=1e-12)
+
+    def test_excel_por_bloques_coincide_con_groupby(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'notas.xlsx')
+            self.notas_de_prueba().to_excel(ruta, index=False)
+            esperado = self.agregado_completo(ruta)
+            pd.testing.assert_frame_equal(agregar_notas_por_bloques(ruta, 50), esperado, rtol=1e-12)
+
+    def test_carga_completa_igual_en_ambos_modos(self):
+        campos = ['id_estudiante', 'promedio_semestral', 'num_materias_cursadas', 'num_materias_reprobadas', 'ultima_prob_riesgo']
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = escribir_reportes(directorio, 40)
+            with self.settings(LECTURA_NOTAS_POR_BLOQUES=False):
+                procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+            completo = list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos))
+            EstudiantePeriodo.objects.all().delete()
+            with self.settings(LECTURA_NOTAS_POR_BLOQUES=True, TAMANO_BLOQUE_NOTAS=13):
+                procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+            por_bloques = list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos))
+
+        self.assertEqual(len(completo), 40)
+        self.assertEqual(len(por_bloques), 40)
+        for fila_completa, fila_bloques in zip(completo, por_bloques):
+            self.assertEqual(fila_completa[0], fila_bloques[0])
+            for a, b in zip(fila_completa[1:], fila_bloques[1:]):
+                self.assertAlmostEqual(a, b, places=9)
+
+
+class CacheReportesTests(TestCase):
+
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache.cleanup)
+        override = override_settings(CACHE_REPORTES_ACTIVA=True, CACHE_REPORTES_DIR=self.cache.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_reprocesar_no_vuelve_a_parsear_los_reportes(self):
+        campos = ['id_estudiante', 'promedio_semestral', 'edad', 'genero', 'est_alum', 'pago_tardio', 'ultima_prob_riesgo']
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = escribir_reportes(directorio, 30)
+            procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+            primera = list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos))
+            EstudiantePeriodo.objects.all().delete()
+
+            with mock.patch('core.services.pd.read_csv', side_effect=AssertionError("no debería parsear")), \
+                    mock.patch('core.services.pd.read_excel', side_effect=AssertionError("no debería parsear")):
+                self.assertTrue(procesar_y_guardar_datos_de_periodo(rutas, '2025A'))
+
+        self.assertEqual(list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos)), primera)
+
+    def test_cambio_de_version_invalida_las_entradas(self):
+        df = pd.DataFrame({'id_estudiante': ['1', '2'], 'edad': [20, 30]})
+        cache_reportes.guardar('caracterizacion', 'abc', df)
+        pd.testing.assert_frame_equal(cache_reportes.obtener('caracterizacion', 'abc'), df)
+
+        with mock.patch.object(cache_reportes, 'VERSION_NORMALIZACION', cache_reportes.VERSION_NORMALIZACION + 1):
+            self.assertIsNone(cache_reportes.obtener('caracterizacion', 'abc'))
+            cache_reportes.purgar()
+        self.assertEqual(os.listdir(self.cache.name), [])
+
+    def test_desaloja_las_entradas_menos_usadas(self):
+        df = pd.DataFrame({'valor': np.arange(1000)})
+        for i, huella in enumerate(['a', 'b', 'c']):
+            cache_reportes.guardar('notas', huella, df)
+            ruta = os.path.join(self.cache.name, f"notas-{huella}-v{cache_reportes.VERSION_NORMALIZACION}.parquet")
+            os.utime(ruta, (1000 + i, 1000 + i))
+        tamano = os.path.getsize(ruta)
+
+        cache_reportes.purgar(max_bytes=2 * tamano)
+
+        self.assertIsNone(cache_reportes.obtener('notas', 'a'))
+        self.assertIsNotNone(cache_reportes.obtener('notas', 'b'))
+        self.assertIsNotNone(cache_reportes.obtener('notas', 'c'))
+
+    def test_columnas_con_tipos_mezclados_se_conservan(self):
+        df = pd.DataFrame({'id_estudiante': ['1', '2', '3'], 'edad': [20, 'N/A', np.nan]})
+        cache_reportes.guardar('caracterizacion', 'mixto', df)
+        pd.testing.assert_frame_equal(cache_reportes.obtener('caracterizacion', 'mixto'), df)
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class ReutilizarPrediccionTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, 20), '2025A')
+        self.usuario = User.objects.create_user('analista', password='clave')
+        self.client.force_login(self.usuario)
+
+    def test_la_carga_guarda_version_y_huella(self):
+        self.assertFalse(EstudiantePeriodo.objects.filter(version_modelo__isnull=True).exists())
+        self.assertFalse(EstudiantePeriodo.objects.filter(huella_features__isnull=True).exists())
+        self.assertTrue(EstudiantePeriodo.objects.filter(version_modelo=PredictionService.paquete_activo().version).exists())
+
+    def test_detalle_reutiliza_el_puntaje_guardado(self):
+        estudiante = EstudiantePeriodo.objects.first()
+        with mock.patch.object(PredictionService.paquete_activo().modelo, 'predict_proba', side_effect=AssertionError("no debería puntuar")):
+            respuesta = self.client.get(reverse('detalle_estudiante', args=[estudiante.id_estudiante]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.context['prediccion']['reutilizada'])
+        self.assertAlmostEqual(respuesta.context['prediccion']['probabilidad'], estudiante.ultima_prob_riesgo)
+
+    def test_features_modificadas_se_vuelven_a_puntuar(self):
+        estudiante = EstudiantePeriodo.objects.first()
+        EstudiantePeriodo.objects.filter(pk=estudiante.pk).update(
+            promedio_semestral=0.5, num_materias_reprobadas=6, ultima_prob_riesgo=0.123456,
+        )
+
+        prediccion = PredictionService.predict(estudiante.id_estudiante, estudiante.periodo)
+
+        self.assertFalse(prediccion['reutilizada'])
+        self.assertNotAlmostEqual(prediccion['probabilidad'], 0.123456)
+        # La predicción no se guarda: eso queda para reevaluar_riesgo
+        estudiante.refresh_from_db()
+        self.assertEqual(estudiante.ultima_prob_riesgo, 0.123456)
+        reevaluar_predicciones_obsoletas()
+        estudiante.refresh_from_db()
+        self.assertAlmostEqual(estudiante.ultima_prob_riesgo, prediccion['probabilidad'])
+        self.assertTrue(PredictionService.predict_estudiante(estudiante)['reutilizada'])
+
+    def test_detalle_con_puntaje_obsoleto_no_escribe_ni_invalida_la_cache(self):
+        estudiante = EstudiantePeriodo.objects.first()
+        EstudiantePeriodo.objects.filter(pk=estudiante.pk).update(version_modelo='anterior')
+        version_datos = PeriodoResumen.objects.get(periodo=estudiante.periodo).version_datos
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('detalle_estudiante', args=[estudiante.id_estudiante]))
+
+        self.assertFalse(respuesta.context['prediccion']['reutilizada'])
+        self.assertFalse([q for q in consultas.captured_queries if not q['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))])
+        self.assertEqual(PeriodoResumen.objects.get(periodo=estudiante.periodo).version_datos, version_datos)
+        self.assertEqual(EstudiantePeriodo.objects.get(pk=estudiante.pk).version_modelo, 'anterior')
+
+    def test_reevaluar_solo_recalcula_las_obsoletas(self):
+        EstudiantePeriodo.objects.filter(id_estudiante__in=['1000001', '1000002']).update(version_modelo='anterior')
+        EstudiantePeriodo.objects.filter(id_estudiante='1000003').update(ultima_prob_riesgo=None)
+
+        resultado = reevaluar_predicciones_obsoletas(tamano_lote=7)
+
+        self.assertEqual(resultado, {'evaluados': 20, 'reevaluados': 3})
+        self.assertFalse(EstudiantePeriodo.objects.exclude(version_modelo=PredictionService.paquete_activo().version).exists())
+        self.assertEqual(reevaluar_predicciones_obsoletas()['reevaluados'], 0)
+
+
+class RegistroModelosTests(TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        # Al terminar se vuelve a cargar el modelo real, ya sin la carpeta temporal
+        self.addCleanup(PredictionService.load_model, forzar=True)
+        override = override_settings(MODELOS_DIR=self.directorio.name, INTERVALO_VERIFICACION_MODELO=0)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.base = os.path.join(settings.BASE_DIR, 'ml_models')
+        self.registro = RegistroModelos()
+        self.version_base = self.registro.registrar(
+            os.path.join(self.base, ARCHIVO_MODELO), os.path.join(self.base, ARCHIVO_COLUMNAS), 'tesis',
+        )
+
+    def registrar_modelo_alternativo(self):
+        """Entrena un modelo pequeño con las mismas columnas para tener una segunda versión."""
+        columnas = joblib.load(os.path.join(self.base, ARCHIVO_COLUMNAS))
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 5, (200, len(columnas)))
+        modelo = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        modelo.fit(X, (X[:, 0] < 2.5).astype(int))
+        ruta = os.path.join(self.directorio.name, 'alternativo.json')
+        modelo.save_model(ruta)
+        return self.registro.registrar(ruta, os.path.join(self.base, ARCHIVO_COLUMNAS), 'alternativo')
+
+    def test_promover_cambia_el_modelo_en_caliente(self):
+        self.registro.promover(self.version_base)
+        PredictionService.load_model(forzar=True)
+        self.assertEqual(PredictionService.paquete_activo().version, self.version_base)
+
+        alternativo = self.registrar_modelo_alternativo()
+        # Promoción hecha por "otro proceso": solo cambia el registro en disco
+        RegistroModelos().promover(alternativo)
+
+        self.assertEqual(PredictionService.paquete_activo().version, alternativo)
+
+    def test_precarga_en_el_worker_de_lotes(self):
+        with mock.patch.object(PredictionService, 'load_model') as cargar:
+            call_command('procesar_lotes', '--una-vez', stdout=StringIO())
+            self.assertEqual(cargar.call_count, 1)
+            with override_settings(PRECARGAR_MODELO=False):
+                call_command('procesar_lotes', '--una-vez', stdout=StringIO())
+            self.assertEqual(cargar.call_count, 1)
+
+    def test_checksum_invalido_no_se_carga(self):
+        ruta = os.path.join(self.directorio.name, 'versiones', self.version_base, ARCHIVO_MODELO)
+        with open(ruta, 'a') as f:
+            f.write(' ')
+        with self.assertRaises(ErrorModelo):
+            self.registro.cargar(self.version_base)
+        with self.assertRaises(ErrorModelo):
+            self.registro.promover(self.version_base)
+
+    def test_sin_registro_usa_el_modelo_de_la_raiz(self):
+        registro = RegistroModelos(self.base)
+        self.assertEqual(registro.cargar_activo().version, self.version_base)
+
+    def test_puntuacion_en_sombra_no_altera_el_resultado(self):
+        self.registro.promover(self.version_base)
+        PredictionService.load_model(forzar=True)
+        df = generar_periodo_sintetico(50)
+        esperado = PredictionService.predict_frame(df)
+
+        self.registro.fijar_candidata(self.registrar_modelo_alternativo())
+        PredictionService.load_model(forzar=True)
+        antes = PredictionService.ESTADISTICAS_SOMBRA['predicciones']
+
+        np.testing.assert_array_equal(PredictionService.predict_frame(df), esperado)
+        self.assertEqual(PredictionService.ESTADISTICAS_SOMBRA['predicciones'] - antes, 50)
+
+    def test_intercambio_seguro_entre_hilos(self):
+        alternativo = self.registrar_modelo_alternativo()
+        df = generar_periodo_sintetico(30)
+        esperados = {}
+        for version in (self.version_base, alternativo):
+            esperados[version] = self.registro.cargar(version)
+        resultados_validos = [p.predecir(p.codificador.codificar_frame(df)) for p in esperados.values()]
+
+        errores = []
+        detener = threading.Event()
+
+        def puntuar():
+            while not detener.is_set():
+                try:
+                    resultado = PredictionService.predict_frame(df)
+                    if not any(np.array_equal(resultado, valido) for valido in resultados_validos):
+                        errores.append("resultado de un paquete mezclado")
+                except Exception as e:
+                    errores.append(repr(e))
+
+        hilos = [threading.Thread(target=puntuar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for i in range(10):
+            PredictionService.promover(alternativo if i % 2 == 0 else self.version_base)
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+
+    def test_comando_promover(self):
+        alternativo = self.registrar_modelo_alternativo()
+        salida = StringIO()
+        call_command('modelos', 'promover', alternativo, stdout=salida)
+        self.assertEqual(self.registro.leer()['activa'], alternativo)
+        call_command('modelos', 'listar', stdout=salida)
+        self.assertIn('[activa]', salida.getvalue())
+
+
+class MicroBatcherTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        self.paquete = PredictionService.paquete_activo()
+        self.df = generar_periodo_sintetico(40)
+        self.X = self.paquete.codificador.codificar_frame(self.df)
+
+    def test_agrupa_peticiones_concurrentes(self):
+        llamadas = []
+
+        def funcion_lote(clave, X):
+            llamadas.append(len(X))
+            return clave.predecir(X)
+
+        batcher = MicroBatcher(funcion_lote, espera_maxima=0.05, tamano_maximo=len(self.X))
+        futuros = [batcher.enviar(self.paquete, self.X[i:i + 1]) for i in range(len(self.X))]
+        resultados = np.concatenate([f.result(timeout=10) for f in futuros])
+
+        np.testing.assert_allclose(resultados, self.paquete.predecir(self.X), rtol=1e-6)
+        self.assertLess(len(llamadas), len(self.X))
+        self.assertEqual(sum(llamadas), len(self.X))
+
+    def test_error_se_entrega_a_cada_llamador(self):
+        def funcion_lote(clave, X):
+            raise ValueError("modelo roto")
+
+        batcher = MicroBatcher(funcion_lote)
+        with self.assertRaises(ValueError):
+            batcher.predecir(self.paquete, self.X[:1], timeout=10)
+
+    def test_ruta_asincrona(self):
+        batcher = MicroBatcher(lambda clave, X: clave.predecir(X), espera_maxima=0.01)
+
+        async def varias():
+            return await asyncio.gather(*(batcher.apredecir(self.paquete, self.X[i:i + 1]) for i in range(10)))
+
+        resultados = np.concatenate(asyncio.run(varias()))
+        np.testing.assert_allclose(resultados, self.paquete.predecir(self.X[:10]), rtol=1e-6)
+
+    @override_settings(MICROBATCH_ACTIVO=True)
+    def test_prediccion_en_linea_con_micro_batching(self):
+        self.addCleanup(setattr, PredictionService, '_batcher', None)
+        campos = {field.name for field in EstudiantePeriodo._meta.concrete_fields}
+        fila = {k: v for k, v in self.df.iloc[0].to_dict().items() if k in campos}
+        fila['ultima_prob_riesgo'] = None
+        EstudiantePeriodo.objects.create(periodo='2025A', **fila)
+
+        usuario = User.objects.create_user('analista', password='clave')
+        self.client.force_login(usuario)
+        respuesta = self.client.get(reverse('prediccion_estudiante_api', args=[fila['id_estudiante']]))
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.json()['reutilizada'])
+        self.assertAlmostEqual(respuesta.json()['probabilidad'], float(self.paquete.predecir(self.X[:1])[0]), places=6)
+        self.assertGreater(PredictionService.batcher().estadisticas['lotes'], 0)
+        self.assertEqual(self.client.get(reverse('prediccion_estudiante_api', args=['no-existe'])).status_code, 404)
+
+    def test_sin_micro_batching_la_ruta_asincrona_no_bloquea_el_bucle(self):
+        campos = {field.name for field in EstudiantePeriodo._meta.concrete_fields}
+        fila = {k: v for k, v in self.df.iloc[0].to_dict().items() if k in campos}
+        fila['ultima_prob_riesgo'] = None
+        estudiante = EstudiantePeriodo.objects.create(periodo='2025A', **fila)
+        estudiante.refresh_from_db()
+        hilos = []
+        preparar = PredictionService._preparar_estudiante.__func__
+
+        def preparar_registrando(cls, estudiante_obj):
+            hilos.append(threading.get_ident())
+            return preparar(cls, estudiante_obj)
+
+        async def predecir():
+            return threading.get_ident(), await PredictionService.apredict_estudiante(estudiante)
+
+        with mock.patch.object(PredictionService, '_preparar_estudiante', classmethod(preparar_registrando)):
+            hilo_bucle, prediccion = asyncio.run(predecir())
+
+        self.assertFalse(prediccion['reutilizada'])
+        self.assertAlmostEqual(prediccion['probabilidad'], float(self.paquete.predecir(self.X[:1])[0]), places=6)
+        self.assertEqual(len(hilos), 1)
+        self.assertNotEqual(hilos[0], hilo_bucle)
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class PeriodoResumenTests(TestCase):
+
+    def setUp(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, 60), '2025A')
+
+    def test_resumen_coincide_con_los_estudiantes(self):
+        resumen = PeriodoResumen.objects.get(periodo='2025A')
+        estudiantes = list(EstudiantePeriodo.objects.filter(periodo='2025A'))
+        en_riesgo = [e for e in estudiantes if e.ultima_prob_riesgo >= settings.UMBRAL_PREDICCION]
+
+        self.assertEqual(resumen.total_estudiantes, len(estudiantes))
+        self.assertEqual(resumen.riesgo_alto_count, len(en_riesgo))
+        self.assertEqual(sum(resumen.deciles_probabilidad), len(estudiantes))
+        self.assertEqual(sum(resumen.riesgo_por_antiguedad.values()), len(en_riesgo))
+        self.assertEqual(sum(c['total'] for c in resumen.riesgo_por_programa.values()), len(estudiantes))
+        for programa, conteos in resumen.riesgo_por_programa.items():
+            self.assertEqual(conteos['riesgo'], sum(1 for e in en_riesgo if e.programa == programa))
+
+    def test_dashboard_con_consultas_constantes(self):
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.context['periodo_seleccionado'], '2025A')
+        self.assertEqual(respuesta.context['total_estudiantes'], EstudiantePeriodo.objects.count())
+
+    def test_cambio_de_umbral_recalcula_el_resumen(self):
+        # Recalcular el resumen excede el presupuesto de la vista: queda como advertencia
+        with override_settings(UMBRAL_PREDICCION=0.0), self.assertLogs('core.consultas', 'WARNING'):
+            respuesta = self.client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.context['riesgo_alto_count'], EstudiantePeriodo.objects.count())
+        self.assertEqual(PeriodoResumen.objects.get(periodo='2025A').umbral, 0.0)
+
+    def test_periodo_vacio_elimina_el_resumen(self):
+        EstudiantePeriodo.objects.filter(periodo='2025A').delete()
+        self.assertIsNone(actualizar_resumen_periodo('2025A'))
+        self.assertFalse(PeriodoResumen.objects.exists())
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class CachePeriodosTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with tempfile.TemporaryDirectory() as directorio:
+            procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, 40), '2025A')
+        self.usuario = User.objects.create_user('analista', password='clave')
+        self.client.force_login(self.usuario)
+
+    def test_segunda_visita_sale_de_la_cache(self):
+        with CaptureQueriesContext(connection) as primera:
+            self.client.get(reverse('dashboard'))
+        aciertos = cache_periodos.ESTADISTICAS['aciertos']
+        with CaptureQueriesContext(connection) as segunda:
+            self.client.get(reverse('dashboard'))
+        # Ya no se lee el resumen: solo la sesión y las versiones de datos
+        self.assertEqual(len(segunda), len(primera) - 1)
+        self.assertEqual(cache_periodos.ESTADISTICAS['aciertos'], aciertos + 1)
+
+    def test_la_carga_invalida_solo_su_periodo(self):
+        version_a = PeriodoResumen.objects.get(periodo='2025A').version_datos
+        self.client.get(reverse('dashboard'))
+
+        with tempfile.TemporaryDirectory() as directorio:
+            procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, 10, semilla=1), '2025B')
+        self.assertEqual(PeriodoResumen.objects.get(periodo='2025A').version_datos, version_a)
+
+        EstudiantePeriodo.objects.filter(periodo='2025A', id_estudiante='1000000').delete()
+        actualizar_resumen_periodo('2025A')
+        self.assertNotEqual(PeriodoResumen.objects.get(periodo='2025A').version_datos, version_a)
+        respuesta = self.client.get(reverse('dashboard'), {'periodo': '2025A'})
+        self.assertEqual(respuesta.context['total_estudiantes'], EstudiantePeriodo.objects.filter(periodo='2025A').count())
+
+    def test_etag_y_get_condicional(self):
+        respuesta = self.client.get(reverse('lista_estudiantes'))
+        etag = respuesta['ETag']
+        self.assertEqual(self.client.get(reverse('lista_estudiantes'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(reverse('lista_estudiantes'), {'page': 2}, HTTP_IF_NONE_MATCH=etag).status_code, 200,
+        )
+
+        # Un puntaje en línea no se guarda ni cambia la versión; guardarlo al reevaluar sí
+        estudiante = EstudiantePeriodo.objects.filter(periodo='2025A').first()
+        EstudiantePeriodo.objects.filter(pk=estudiante.pk).update(promedio_semestral=0.1)
+        estudiante.refresh_from_db()
+        PredictionService.predict_estudiante(estudiante)
+        self.assertEqual(self.client.get(reverse('lista_estudiantes'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        reevaluar_predicciones_obsoletas()
+        self.assertEqual(self.client.get(reverse('lista_estudiantes'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pagina_en_cache_coincide_con_la_consulta(self):
+        primera = self.client.get(reverse('lista_estudiantes'), {'riesgo': 'con_riesgo'})
+        segunda = self.client.get(reverse('lista_estudiantes'), {'riesgo': 'con_riesgo'})
+        esperados = list(
+            EstudiantePeriodo.objects.filter(periodo='2025A', ultima_prob_riesgo__gte=settings.UMBRAL_PREDICCION)
+            .order_by('-ultima_prob_riesgo').values_list('id_estudiante', flat=True)[:15]
+        )
+        for respuesta in (primera, segunda):
+            self.assertEqual([e.id_estudiante for e in respuesta.context['page_obj']], esperados)
+
+
+class PaginacionKeysetTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        df = generar_periodo_sintetico(53)
+        # Empates de riesgo y estudiantes sin riesgo calculado
+        df.loc[5:9, 'ultima_prob_riesgo'] = 0.5
+        df.loc[40:45, 'ultima_prob_riesgo'] = np.nan
+        guardar_estudiantes_en_bloque(df, '2025A')
+        self.queryset = EstudiantePeriodo.objects.filter(periodo='2025A')
+        self.esperado = [e.pk for e in self.queryset.order_by(*paginacion.ORDEN)]
+
+    def test_recorrido_hacia_adelante_y_hacia_atras(self):
+        pagina = paginacion.paginar_por_riesgo(self.queryset, tamano=10)
+        self.assertFalse(pagina.has_previous())
+        adelante = [e.pk for e in pagina]
+        while pagina.has_next():
+            pagina = paginacion.paginar_por_riesgo(self.queryset, despues=pagina.cursor_siguiente, tamano=10)
+            adelante.extend(e.pk for e in pagina)
+        self.assertEqual(adelante, self.esperado)
+
+        pagina = paginacion.paginar_por_riesgo(self.queryset, antes=paginacion.ULTIMA, tamano=10)
+        self.assertFalse(pagina.has_next())
+        atras = [e.pk for e in pagina]
+        while pagina.has_previous():
+            pagina = paginacion.paginar_por_riesgo(self.queryset, antes=pagina.cursor_anterior, tamano=10)
+            atras = [e.pk for e in pagina] + atras
+        self.assertEqual(atras, self.esperado)
+
+    def test_pagina_profunda_con_una_consulta(self):
+        ultima_con_riesgo = self.queryset.filter(ultima_prob_riesgo__isnull=False).order_by(*paginacion.ORDEN)[20]
+        with self.assertNumQueries(1):
+            pagina = paginacion.paginar_por_riesgo(
+                self.queryset, despues=paginacion.codificar_cursor(ultima_con_riesgo), tamano=5,
+            )
+        self.assertEqual([e.pk for e in pagina], self.esperado[21:26])
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        pagina = paginacion.paginar_por_riesgo(self.queryset, despues='basura', tamano=10)
+        self.assertEqual([e.pk for e in pagina], self.esperado[:10])
+
+    def test_vista_de_lista_navega_por_cursor(self):
+        actualizar_resumen_periodo('2025A')
+        self.client.force_login(User.objects.create_user('analista', password='clave'))
+        respuesta = self.client.get(reverse('lista_estudiantes'))
+        self.assertEqual(respuesta.context['total_estudiantes'], 53)
+        siguiente = respuesta.context['page_obj'].cursor_siguiente
+        respuesta = self.client.get(reverse('lista_estudiantes'), {'despues': siguiente})
+        self.assertEqual([e.pk for e in respuesta.context['page_obj']], self.esperado[15:30])
+
+
+class ExportacionTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        df = generar_periodo_sintetico(4500)
+        df.loc[0, 'ultima_prob_riesgo'] = np.nan
+        guardar_estudiantes_en_bloque(df, '2025A')
+        actualizar_resumen_periodo('2025A')
+        self.client.force_login(User.objects.create_user('analista', password='clave'))
+        self.esperado = list(
+            EstudiantePeriodo.objects.filter(periodo='2025A').order_by(*paginacion.ORDEN)
+            .values_list('id_estudiante', 'ultima_prob_riesgo', 'edad')
+        )
+
+    def exportar(self, formato, columnas='id_estudiante,ultima_prob_riesgo,edad'):
+        return self.client.get(reverse('lista_estudiantes'), {'export': formato, 'columnas': columnas})
+
+    def test_csv_en_streaming(self):
+        respuesta = self.exportar('csv')
+        self.assertTrue(respuesta.streaming)
+        df = pd.read_csv(BytesIO(b''.join(respuesta.streaming_content)), dtype={'ID Estudiante': str})
+        self.assertEqual(list(df.columns), ['ID Estudiante', 'Prob. Riesgo', 'edad'])
+        self.assertEqual(df['ID Estudiante'].tolist(), [fila[0] for fila in self.esperado])
+
+    def test_csv_comprimido(self):
+        respuesta = self.exportar('csv.gz')
+        contenido = gzip.decompress(b''.join(respuesta.streaming_content))
+        self.assertEqual(len(contenido.decode('utf-8').splitlines()), len(self.esperado) + 1)
+
+    def test_xlsx_y_parquet(self):
+        xlsx = pd.read_excel(BytesIO(b''.join(self.exportar('xlsx').streaming_content)), dtype={'ID Estudiante': str})
+        self.assertEqual(len(xlsx), len(self.esperado))
+
+        parquet = pd.read_parquet(BytesIO(b''.join(self.exportar('parquet').streaming_content)))
+        self.assertEqual(list(parquet.columns), ['id_estudiante', 'ultima_prob_riesgo', 'edad'])
+        self.assertEqual(parquet['id_estudiante'].tolist(), [fila[0] for fila in self.esperado])
+        self.assertTrue(np.isnan(parquet['ultima_prob_riesgo'].iloc[-1]))
+        self.assertEqual(parquet['edad'].dtype, np.int64)
+
+    def test_columnas_desconocidas_usan_las_por_defecto(self):
+        respuesta = self.exportar('csv', columnas='huella_features,no_existe')
+        encabezado = next(iter(respuesta.streaming_content)).decode('utf-8').splitlines()[0]
+        self.assertEqual(encabezado, 'ID Estudiante,Periodo,Prob. Riesgo,Programa,Promedio,Género')
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class BusquedaEstudiantesTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, 120), '2025A')
+        self.client.force_login(User.objects.create_user('analista', password='clave'))
+
+    def esperado(self, texto):
+        return set(
+            EstudiantePeriodo.objects.filter(periodo='2025A', id_estudiante__icontains=texto)
+            .values_list('pk', flat=True)
+        )
+
+    def test_indice_coincide_con_icontains(self):
+        self.assertTrue(busqueda.disponible())
+        queryset = EstudiantePeriodo.objects.filter(periodo='2025A')
+        for texto in ('000', '0011', '1000105', '99', '5', 'xyz'):
+            self.assertEqual(set(busqueda.filtrar(queryset, texto, '2025A').values_list('pk', flat=True)), self.esperado(texto))
+
+    def test_el_indice_se_consulta_al_usar_el_queryset(self):
+        esperado = self.esperado('000')
+        with self.assertNumQueries(0):
+            filtrado = busqueda.filtrar(EstudiantePeriodo.objects.filter(periodo='2025A'), '000', '2025A')
+        # Una consulta al índice, compartida por el conteo y las filas
+        with self.assertNumQueries(3):
+            self.assertEqual(filtrado.count(), len(esperado))
+            self.assertEqual({e.pk for e in filtrado}, esperado)
+
+    def test_otros_periodos_no_ocupan_la_lista_de_ids(self):
+        EstudiantePeriodo.objects.bulk_create([
+            EstudiantePeriodo(id_estudiante=id_estudiante, periodo='2024B')
+            for id_estudiante in EstudiantePeriodo.objects.values_list('id_estudiante', flat=True)
+        ])
+        busqueda.indexar_periodo('2024B')
+        esperado = self.esperado('000')
+        with mock.patch.object(busqueda, 'MAXIMO_IDS', len(esperado)), CaptureQueriesContext(connection) as consultas:
+            encontrados = busqueda.filtrar(EstudiantePeriodo.objects.filter(periodo='2025A'), '000', '2025A')
+            self.assertEqual(set(encontrados.values_list('pk', flat=True)), esperado)
+        # Se filtró por la lista de ids, no por la subconsulta sobre el índice
+        self.assertNotIn('MATCH', consultas[-1]['sql'])
+
+    def test_busqueda_por_programa(self):
+        programa = EstudiantePeriodo.objects.exclude(programa=None).values_list('programa', flat=True).first()
+        encontrados = busqueda.filtrar(EstudiantePeriodo.objects.all(), programa[1:5].lower(), '2025A', incluir_programa=True)
+        self.assertTrue(encontrados.filter(programa=programa).exists())
+
+    def test_reproceso_reconstruye_el_indice(self):
+        EstudiantePeriodo.objects.filter(periodo='2025A').delete()
+        busqueda.indexar_periodo('2025A')
+        EstudiantePeriodo.objects.create(id_estudiante='ABC123', periodo='2025A', ultima_prob_riesgo=0.9)
+        busqueda.indexar_periodo('2025A')
+        resultado = busqueda.filtrar(EstudiantePeriodo.objects.all(), 'c12', '2025A')
+        self.assertEqual([e.id_estudiante for e in resultado], ['ABC123'])
+
+    def test_autocompletado_ordenado_por_riesgo(self):
+        respuesta = self.client.get(reverse('buscar_estudiantes'), {'q': '0010', 'limite': 5})
+        resultados = respuesta.json()['resultados']
+        esperados = list(
+            EstudiantePeriodo.objects.filter(pk__in=self.esperado('0010')).order_by(*paginacion.ORDEN)
+            .values_list('id_estudiante', flat=True)[:5]
+        )
+        self.assertEqual([r['id_estudiante'] for r in resultados], esperados)
+        self.assertEqual(self.client.get(reverse('buscar_estudiantes')).json(), {'resultados': []})
+
+
+class ValidacionTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        df = generar_periodo_sintetico(3000)
+        df.loc[:9, 'ultima_prob_riesgo'] = np.nan
+        guardar_estudiantes_en_bloque(df, '2025A')
+        actualizar_resumen_periodo('2025A')
+        rng = np.random.default_rng(1)
+        filas = list(EstudiantePeriodo.objects.filter(periodo='2025A').values_list('id_estudiante', 'ultima_prob_riesgo'))
+        # Los de mayor riesgo desertan con más frecuencia, para que las curvas tengan forma
+        self.activos = {
+            id_est for id_est, prob in filas if rng.random() > (0.6 * (prob or 0))
+        }
+        self.filas = filas
+        self.client.force_login(User.objects.create_user('analista', password='clave'))
+
+    def test_coincide_con_la_clasificacion_estudiante_por_estudiante(self):
+        umbral = settings.UMBRAL_PREDICCION
+        grupos = {'verdaderos_positivos': set(), 'falsos_positivos': set(), 'falsos_negativos': set()}
+        for id_est, prob in self.filas:
+            riesgo = prob is not None and prob >= umbral
+            deserto = id_est not in self.activos
+            if riesgo and deserto:
+                grupos['verdaderos_positivos'].add(id_est)
+            elif riesgo:
+                grupos['falsos_positivos'].add(id_est)
+            elif deserto:
+                grupos['falsos_negativos'].add(id_est)
+
+        resultado = validar_predicciones_con_lista_activos('2025A', self.activos)
+        for clave, esperados in grupos.items():
+            self.assertEqual({id_est for id_est, _ in resultado[clave]}, esperados)
+        tp, fp, fn = (len(grupos[c]) for c in ('verdaderos_positivos', 'falsos_positivos', 'falsos_negativos'))
+        self.assertEqual(resultado['matriz']['tp'], tp)
+        self.assertEqual(resultado['matriz']['tn'], len(self.filas) - tp - fp - fn)
+        self.assertAlmostEqual(resultado['recall'], tp / (tp + fn) * 100)
+        self.assertAlmostEqual(resultado['precision'], tp / (tp + fp) * 100)
+        self.assertEqual(resultado['sin_probabilidad'], 10)
+        # Listas ordenadas por probabilidad descendente, sin objetos del ORM
+        probs = [prob for _, prob in resultado['falsos_positivos']]
+        self.assertEqual(probs, sorted(probs, reverse=True))
+
+    def test_curvas_coinciden_con_el_calculo_directo(self):
+        resultado = validar_predicciones_con_lista_activos('2025A', self.activos)
+        con_prob = [(id_est not in self.activos, prob) for id_est, prob in self.filas if prob is not None]
+        y = np.array([d for d, _ in con_prob], dtype=bool)
+        p = np.array([prob for _, prob in con_prob])
+
+        # ROC-AUC: probabilidad de que un desertor tenga más riesgo que uno que continuó (empates valen 1/2)
+        positivos, negativos = p[y][:, None], p[~y][None, :]
+        auc = ((positivos > negativos).sum() + 0.5 * (positivos == negativos).sum()) / (positivos.size * negativos.size)
+        self.assertAlmostEqual(resultado['roc_auc'], auc)
+
+        # PR-AUC: precisión promedio evaluando cada umbral por separado
+        def metricas_en(umbral):
+            prediccion = p >= umbral
+            tp = np.count_nonzero(prediccion & y)
+            precision = tp / np.count_nonzero(prediccion)
+            recall = tp / np.count_nonzero(y)
+            f1 = 2 * precision * recall / (precision + recall) if tp else 0.0
+            return precision, recall, f1
+
+        ap, recall_anterior = 0.0, 0.0
+        for umbral in np.unique(p)[::-1]:
+            precision, recall, _ = metricas_en(umbral)
+            ap += (recall - recall_anterior) * precision
+            recall_anterior = recall
+        self.assertAlmostEqual(resultado['pr_auc'], ap)
+
+        for punto in resultado['barrido'][::10]:
+            candidatos = p[p >= punto['umbral']]
+            if not len(candidatos):
+                continue
+            # El barrido evalúa en la probabilidad más baja que supera el punto de la grilla
+            precision, recall, f1 = metricas_en(candidatos.min())
+            self.assertAlmostEqual(punto['precision'], precision)
+            self.assertAlmostEqual(punto['recall'], recall)
+            self.assertAlmostEqual(punto['f1'], f1)
+
+        calibracion = resultado['calibracion']
+        self.assertEqual(sum(b['estudiantes'] for b in calibracion), len(p))
+        mejor = resultado['mejor_umbral_f1']
+        self.assertGreaterEqual(mejor['f1'], max(punto['f1'] for punto in resultado['barrido']) - 1e-12)
+
+    def test_vista_pagina_los_ids(self):
+        contenido = 'cedula;est_alum\n' + ''.join(f'{id_est};ACTIVO\n' for id_est in sorted(self.activos))
+        archivo = SimpleUploadedFile('activos.csv', contenido.encode('latin1'), content_type='text/csv')
+        respuesta = self.client.post(reverse('validacion'), {'periodo_prediccion': '2025A', 'archivo_activos': archivo})
+        self.assertEqual(respuesta.status_code, 302)
+
+        cache.clear()  # Como si otro worker atendiera la página: la caché en memoria es de cada proceso
+        pagina = self.client.get(respuesta['Location'])
+        resultados = pagina.context['resultados']
+        grupo = pagina.context['grupos_validacion'][0]
+        self.assertEqual(grupo['clave'], 'falsos_negativos')
+        self.assertEqual(len(grupo['filas']), min(50, grupo['total']))
+        self.assertEqual(grupo['total'], resultados['matriz']['fn'])
+
+        if grupo['url_siguiente']:
+            siguiente = self.client.get(reverse('validacion') + grupo['url_siguiente'])
+            filas = siguiente.context['grupos_validacion'][0]['filas']
+            self.assertEqual(filas[0]['id_estudiante'], resultados['falsos_negativos'][50][0])
+
+        expirado = self.client.get(reverse('validacion'), {'resultado': 'no-existe'})
+        self.assertIn('expiraron', expirado.context['error'])
+        with override_settings(CACHE_VISTAS_TIMEOUT=0):
+            self.assertIn('expiraron', self.client.get(respuesta['Location']).context['error'])
+
+
+class BacktestTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        # Tres periodos: en cada uno continúa una parte de los estudiantes del anterior
+        base = generar_periodo_sintetico(1200)
+        for i, periodo in enumerate(['2024A', '2024B', '2025A']):
+            df = base.iloc[i * 200:].copy()
+            df['ultima_prob_riesgo'] = np.random.default_rng(i).random(len(df))
+            guardar_estudiantes_en_bloque(df, periodo)
+
+    def test_pares_consecutivos(self):
+        self.assertEqual(backtest.pares_consecutivos(), [('2024A', '2024B'), ('2024B', '2025A')])
+
+    def test_coincide_con_la_validacion_con_lista_de_activos(self):
+        totales = backtest.ejecutar_backtest(procesos=1)
+        self.assertEqual([fila.periodo for fila in totales], ['2024A', '2024B'])
+        self.assertEqual([fila.desertores for fila in totales], [200, 200])
+
+        for fila in totales:
+            activos = set(
+                EstudiantePeriodo.objects.filter(periodo=fila.periodo_siguiente).values_list('id_estudiante', flat=True)
+            )
+            esperado = validar_predicciones_con_lista_activos(fila.periodo, activos)
+            self.assertEqual(fila.desertores, esperado['total_deserciones_reales'])
+            self.assertEqual(fila.verdaderos_positivos, esperado['matriz']['tp'])
+            self.assertEqual(fila.falsos_negativos, esperado['matriz']['fn'])
+            self.assertAlmostEqual(fila.roc_auc, esperado['roc_auc'])
+
+        # Las filas por programa suman el periodo completo
+        for periodo in ('2024A', '2024B'):
+            por_programa = ResultadoBacktest.objects.filter(periodo=periodo).exclude(programa=backtest.PROGRAMA_TOTAL)
+            total = ResultadoBacktest.objects.get(periodo=periodo, programa=backtest.PROGRAMA_TOTAL)
+            self.assertEqual(sum(f.total_estudiantes for f in por_programa), total.total_estudiantes)
+            self.assertEqual(sum(f.desertores for f in por_programa), total.desertores)
+
+    def test_reejecutar_reemplaza_los_resultados(self):
+        backtest.ejecutar_backtest(procesos=1)
+        cantidad = ResultadoBacktest.objects.count()
+        backtest.ejecutar_backtest(periodos=['2024B'], procesos=1, umbral=0.9)
+        self.assertEqual(ResultadoBacktest.objects.count(), cantidad)
+        self.assertEqual(ResultadoBacktest.objects.get(periodo='2024B', programa='').umbral, 0.9)
+        self.assertEqual(ResultadoBacktest.objects.get(periodo='2024A', programa='').umbral, settings.UMBRAL_PREDICCION)
+
+    def test_comando_y_vista(self):
+        salida = StringIO()
+        call_command('backtest', '--procesos', '1', stdout=salida)
+        self.assertIn('2 periodo(s) evaluado(s)', salida.getvalue())
+
+        self.client.force_login(User.objects.create_user('analista', password='clave'))
+        respuesta = self.client.get(reverse('backtest'), {'periodo': '2024A'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['periodo_seleccionado'], '2024A')
+        self.assertTrue(respuesta.context['por_programa'])
+
+
+class LectorActivosTests(TestCase):
+
+    FILAS = [
+        ('Cedula', 'Programa', 'Est_Alum'),
+        ('1001', 'INGENIERÍA', 'ACTIVO'),
+        ('1002', 'DERECHO', ' graduado '),
+        ('1003', 'CONTADURÍA', 'INACTIVO'),
+        ('1004.0', 'DERECHO', 'Egresado'),
+        ('', 'DERECHO', 'ACTIVO'),
+    ]
+
+    def csv(self, separador=';', codificacion='cp1252'):
+        return '\n'.join(separador.join(fila) for fila in self.FILAS).encode(codificacion)
+
+    def test_detecta_codificacion_y_separador(self):
+        self.assertEqual(detectar_codificacion('ñandú'.encode('utf-8')), 'utf-8')
+        self.assertEqual(detectar_codificacion(b'\xef\xbb\xbfcedula'), 'utf-8-sig')
+        self.assertEqual(detectar_codificacion('ñandú'.encode('cp1252')), 'cp1252')
+        self.assertEqual(detectar_codificacion(b'cedula\x81'), 'latin1')
+        # Un carácter de varios bytes cortado al final de la muestra sigue siendo UTF-8
+        self.assertEqual(detectar_codificacion('ñandú'.encode('utf-8')[:-1]), 'utf-8')
+        for separador in (';', ',', '\t', '|'):
+            self.assertEqual(detectar_separador(self.csv(separador).decode('cp1252')), separador)
+
+    def test_csv_en_varias_codificaciones(self):
+        esperado = {'1001', '1002', '1004'}
+        for separador, codificacion in ((';', 'cp1252'), (',', 'utf-8'), ('\t', 'utf-8-sig')):
+            archivo = SimpleUploadedFile('activos.csv', self.csv(separador, codificacion))
+            self.assertEqual(leer_ids_activos(archivo), esperado)
+
+    def test_subida_en_disco_se_lee_desde_su_ruta(self):
+        archivo = TemporaryUploadedFile('activos.csv', 'text/csv', 0, None)
+        archivo.write(self.csv())
+        archivo.flush()
+        with mock.patch.object(lector_activos.pacsv, 'open_csv', wraps=lector_activos.pacsv.open_csv) as open_csv:
+            self.assertEqual(leer_ids_activos(archivo), {'1001', '1002', '1004'})
+        self.assertEqual(open_csv.call_args.args[0], archivo.temporary_file_path())
+        archivo.close()
+
+    def test_xlsx(self):
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['CEDULA', 'Est_Alum'])
+        hoja.append([1001, 'ACTIVO'])
+        hoja.append([1002.0, 'GRADUADO'])
+        hoja.append([1003, None])
+        buffer = BytesIO()
+        libro.save(buffer)
+        self.assertEqual(leer_ids_activos(SimpleUploadedFile('activos.xlsx', buffer.getvalue())), {'1001', '1002'})
+
+    def test_columnas_faltantes_y_formato_no_soportado(self):
+        with self.assertRaisesMessage(ValueError, "'est_alum'"):
+            leer_ids_activos(SimpleUploadedFile('activos.csv', b'cedula;programa\n1;X\n'))
+        with self.assertRaisesMessage(ValueError, 'Formato de archivo no soportado'):
+            leer_ids_activos(SimpleUploadedFile('activos.txt', b'cedula;est_alum\n'))
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class FeaturesTendenciaTests(TestCase):
+
+    def cargar(self, periodo, semilla, num_estudiantes=80):
+        with tempfile.TemporaryDirectory() as directorio:
+            self.assertTrue(procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, num_estudiantes, semilla), periodo))
+
+    def valores(self, periodo, *campos):
+        return {
+            fila[0]: fila[1:]
+            for fila in EstudiantePeriodo.objects.filter(periodo=periodo).values_list('id_estudiante', *campos)
+        }
+
+    def test_diferencias_respecto_al_periodo_anterior(self):
+        self.cargar('2024B', semilla=0, num_estudiantes=60)
+        self.cargar('2025A', semilla=1)
+
+        anterior = self.valores('2024B', 'promedio_semestral', 'num_materias_reprobadas')
+        actual = self.valores('2025A', 'promedio_semestral', 'num_materias_reprobadas',
+                              'diferencia_promedio_anterior', 'diferencia_reprobadas_anterior', 'curso_periodo_anterior')
+        self.assertTrue(any(v[4] == 0 for v in actual.values()))
+        for id_est, (promedio, reprobadas, dif_promedio, dif_reprobadas, curso) in actual.items():
+            if id_est in anterior:
+                self.assertEqual(curso, 1)
+                self.assertAlmostEqual(dif_promedio, promedio - anterior[id_est][0])
+                self.assertEqual(dif_reprobadas, reprobadas - anterior[id_est][1])
+            else:
+                self.assertEqual((dif_promedio, dif_reprobadas, curso), (0, 0, 0))
+
+        # El primer periodo no tiene anterior
+        self.assertEqual({v for v in self.valores('2024B', 'curso_periodo_anterior').values()}, {(0,)})
+
+    def test_consultas_independientes_del_tamano_del_periodo(self):
+        EstudiantePeriodo.objects.bulk_create([
+            EstudiantePeriodo(id_estudiante=str(i), periodo='2024B', promedio_semestral=3.0, num_materias_reprobadas=1)
+            for i in range(5000)
+        ])
+        df = pd.DataFrame({'id_estudiante': [str(i) for i in range(5000)], 'promedio_semestral': 3.5, 'num_materias_reprobadas': 0})
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = historial.agregar_features(df, '2025A')
+        self.assertLessEqual(len(consultas), 2)
+        self.assertTrue(np.allclose(resultado['diferencia_promedio_anterior'], 0.5))
+        self.assertTrue((resultado['diferencia_reprobadas_anterior'] == -1).all())
+
+    def test_reprocesar_un_periodo_antiguo_recalcula_el_siguiente(self):
+        self.cargar('2024B', semilla=0)
+        self.cargar('2025A', semilla=1)
+        antes = self.valores('2025A', 'diferencia_promedio_anterior')
+
+        # Se vuelve a cargar 2024B con otras notas
+        self.cargar('2024B', semilla=2)
+        anterior = self.valores('2024B', 'promedio_semestral')
+        actual = self.valores('2025A', 'promedio_semestral', 'diferencia_promedio_anterior', 'ultima_prob_riesgo')
+        self.assertNotEqual(antes, {k: v[1:2] for k, v in actual.items()})
+        for id_est, (promedio, diferencia, riesgo) in actual.items():
+            self.assertAlmostEqual(diferencia, promedio - anterior[id_est][0])
+
+        # El riesgo guardado corresponde a las features nuevas
+        for estudiante in EstudiantePeriodo.objects.filter(periodo='2025A')[:10]:
+            prediccion = PredictionService.predict(estudiante.id_estudiante, estudiante.periodo)
+            self.assertAlmostEqual(estudiante.ultima_prob_riesgo, prediccion['probabilidad'], places=6)
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class ReprocesamientoIncrementalTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.rutas = escribir_reportes(directorio.name, 50)
+        self.assertEqual(
+            procesar_y_guardar_datos_de_periodo(self.rutas, '2025A', reprocesar=True),
+            {'nuevos': 50, 'modificados': 0, 'eliminados': 0, 'sin_cambios': 0},
+        )
+
+    def leer(self, nombre):
+        return pd.read_csv(self.rutas[nombre], sep=';', encoding='latin1', dtype=str, keep_default_na=False)
+
+    def escribir(self, nombre, df):
+        df.to_csv(self.rutas[nombre], sep=';', encoding='latin1', index=False)
+
+    def test_reprocesar_sin_cambios_no_escribe_estudiantes(self):
+        with CaptureQueriesContext(connection) as consultas:
+            cambios = procesar_y_guardar_datos_de_periodo(self.rutas, '2025A', reprocesar=True)
+
+        self.assertEqual(cambios, {'nuevos': 0, 'modificados': 0, 'eliminados': 0, 'sin_cambios': 50})
+        escrituras = [
+            q['sql'] for q in consultas.captured_queries
+            if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'core_estudianteperiodo' in q['sql']
+        ]
+        self.assertEqual(escrituras, [])
+
+    def test_solo_se_aplican_y_puntuan_las_diferencias(self):
+        caracterizacion = self.leer('caracterizacion')
+        notas = self.leer('notas')
+        # Los graduados se excluyen de la caracterización: se modifican estudiantes activos
+        modificados = caracterizacion.loc[caracterizacion['Est_Alum'] == 'ACTIVO', 'Cedula'].iloc[1:4].tolist()
+        caracterizacion.loc[caracterizacion['Cedula'].isin(modificados), 'Edad'] = '60'
+        nuevo = caracterizacion.iloc[[0]].assign(Cedula='2000000')
+        self.escribir('caracterizacion', pd.concat([caracterizacion, nuevo]))
+        notas = notas[~notas['Ide_Estudiante'].isin(['1000010', '1000011'])]
+        self.escribir('notas', pd.concat([notas, notas.iloc[[0]].assign(Ide_Estudiante='2000000')]))
+        antes = dict(EstudiantePeriodo.objects.filter(periodo='2025A').values_list('id_estudiante', 'id'))
+
+        with mock.patch.object(PredictionService, 'puntuar_frame', wraps=PredictionService.puntuar_frame) as puntuar:
+            cambios = procesar_y_guardar_datos_de_periodo(self.rutas, '2025A', reprocesar=True)
+
+        self.assertEqual(cambios, {'nuevos': 1, 'modificados': 3, 'eliminados': 2, 'sin_cambios': 45})
+        self.assertEqual(sorted(puntuar.call_args.args[0]['id_estudiante']), sorted([*modificados, '2000000']))
+        estudiantes = EstudiantePeriodo.objects.filter(periodo='2025A')
+        self.assertEqual(estudiantes.count(), 49)
+        self.assertFalse(estudiantes.filter(id_estudiante__in=['1000010', '1000011']).exists())
+        # Las filas que no cambiaron conservan su registro
+        self.assertEqual(estudiantes.get(id_estudiante='1000020').id, antes['1000020'])
+        for estudiante in estudiantes.filter(id_estudiante__in=modificados):
+            self.assertEqual(estudiante.edad, 60)
+            prediccion = PredictionService.predict(estudiante.id_estudiante, '2025A')
+            self.assertAlmostEqual(estudiante.ultima_prob_riesgo, prediccion['probabilidad'], places=6)
+        self.assertEqual(PeriodoResumen.objects.get(periodo='2025A').total_estudiantes, 49)
+
+    def test_sin_reprocesar_no_se_eliminan_estudiantes(self):
+        notas = self.leer('notas')
+        self.escribir('notas', notas[notas['Ide_Estudiante'] != '1000010'])
+
+        cambios = procesar_y_guardar_datos_de_periodo(self.rutas, '2025A')
+
+        self.assertEqual(cambios['eliminados'], 0)
+        self.assertTrue(EstudiantePeriodo.objects.filter(id_estudiante='1000010').exists())
+
+
+class LectorExcelTests(TestCase):
+
+    def escribir_libro(self, ruta, write_only):
+        # write_only guarda los textos en línea; el modo normal, como Excel, en la tabla compartida
+        libro = openpyxl.Workbook(write_only=write_only)
+        hoja = libro.create_sheet() if write_only else libro.active
+        for fila in [
+            ['Cedula', 'Edad', 'Nota', 'Fecha_Pago', 'Programa', 'Becado', None, 'Cedula', 'Observaciones'],
+            [1001, 20, 3.5, datetime(2025, 3, 1), 'A & B', True, None, 5, 'x'],
+            ['00123', 21.0, 4, datetime(2025, 1, 5), '123', False, None, None, None],
+            [None, None, None, None, None, None, None, None, 'solo una columna no usada'],
+            [1003, 'NA', 2.25, '01/02/2025', 'n/a', None, 'sin encabezado', 7, None],
+        ]:
+            hoja.append(fila)
+        if not write_only:
+            hoja['A7'] = 1007
+            hoja['C7'] = '=1+1'
+            hoja['I9'] = 'fila final solo en una columna no usada'
+        libro.save(ruta)
+
+    def test_mismo_dataframe_que_read_excel(self):
+        usadas = {'cedula', 'edad', 'nota', 'fecha_pago', 'programa', 'becado'}
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'reporte.xlsx')
+            for write_only in (False, True):
+                self.escribir_libro(ruta, write_only)
+                for usecols in (None, lambda nombre: str(nombre).lower() in usadas):
+                    with self.subTest(write_only=write_only, usecols=usecols):
+                        pd.testing.assert_frame_equal(
+                            lector_excel.leer_xlsx(ruta, usecols), pd.read_excel(ruta, usecols=usecols),
+                        )
+
+    def test_hoja_con_prefijo_de_espacio_de_nombres(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            original = os.path.join(directorio, 'original.xlsx')
+            ruta = os.path.join(directorio, 'reporte.xlsx')
+            self.escribir_libro(original, write_only=False)
+            # Como el SDK de OpenXML de .NET: <x:worksheet xmlns:x="...">, <x:row>, <x:c>
+            with zipfile.ZipFile(original) as fuente, zipfile.ZipFile(ruta, 'w') as destino:
+                for item in fuente.infolist():
+                    contenido = fuente.read(item.filename)
+                    if item.filename == 'xl/worksheets/sheet1.xml':
+                        contenido = re.sub(rb'<(/?)([A-Za-z]\w*)\b', rb'<\1x:\2', contenido)
+                        contenido = contenido.replace(b'<x:worksheet xmlns=', b'<x:worksheet xmlns:x=')
+                    destino.writestr(item, contenido)
+
+            esperado = pd.read_excel(ruta)
+            self.assertEqual(esperado.shape, pd.read_excel(original).shape)
+            pd.testing.assert_frame_equal(lector_excel.leer_xlsx(ruta), esperado)
+            bloques = list(lector_excel.leer_xlsx_por_bloques(ruta, 2, lambda nombre: nombre in ('Cedula', 'Nota')))
+            self.assertEqual(sum(len(b) for b in bloques), 4)
+
+    def test_celdas_con_otro_orden_de_atributos(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            original = os.path.join(directorio, 'original.xlsx')
+            ruta = os.path.join(directorio, 'reporte.xlsx')
+            self.escribir_libro(original, write_only=True)
+            # <c t="inlineStr" r="A2"> en lugar de <c r="A2" t="inlineStr">, también en las filas de datos
+            with zipfile.ZipFile(original) as fuente, zipfile.ZipFile(ruta, 'w') as destino:
+                for item in fuente.infolist():
+                    contenido = fuente.read(item.filename)
+                    if item.filename.startswith('xl/worksheets/sheet'):
+                        contenido = re.sub(rb'<c r="(\w+)"( [^>]*?)(/?)>', rb'<c\2 r="\1"\3>', contenido)
+                    destino.writestr(item, contenido)
+
+            esperado = pd.read_excel(ruta)
+            pd.testing.assert_frame_equal(esperado, pd.read_excel(original))
+            pd.testing.assert_frame_equal(lector_excel.leer_xlsx(ruta), esperado)
+            bloques = list(lector_excel.leer_xlsx_por_bloques(ruta, 2, lambda nombre: nombre in ('Cedula', 'Nota')))
+            self.assertEqual(sum(len(b) for b in bloques), 3)
+
+    def test_por_bloques_omite_filas_vacias(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'reporte.xlsx')
+            self.escribir_libro(ruta, write_only=False)
+            bloques = list(lector_excel.leer_xlsx_por_bloques(ruta, 2, lambda nombre: nombre in ('Cedula', 'Nota')))
+
+        self.assertEqual([len(b) for b in bloques], [2, 2])
+        self.assertEqual(list(bloques[0].columns), ['Cedula', 'Nota'])
+        self.assertEqual(pd.concat(bloques)['Cedula'].astype(str).tolist(), ['1001', '123', '1003', '1007'])
+
+    @override_settings(CACHE_REPORTES_ACTIVA=False, LECTURA_NOTAS_POR_BLOQUES=False)
+    def test_carga_desde_excel_igual_que_con_read_excel(self):
+        campos = [f.name for f in EstudiantePeriodo._meta.concrete_fields if f.name not in ('id', 'huella_datos')]
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = {}
+            for nombre, ruta in escribir_reportes(directorio, 40).items():
+                rutas[nombre] = ruta.replace('.csv', '.xlsx')
+                pd.read_csv(ruta, sep=';', encoding='latin1').to_excel(rutas[nombre], index=False)
+
+            # La ruta anterior: pd.read_excel de cada reporte completo
+            with mock.patch('core.services.leer_reporte', side_effect=lambda path, columnas=None: pd.read_excel(path)):
+                procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+            esperado = list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos))
+            EstudiantePeriodo.objects.all().delete()
+
+            with mock.patch('core.services.pd.read_excel', side_effect=AssertionError("no debería usarse")):
+                procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+            obtenido = list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos))
+
+        self.assertEqual(len(obtenido), 40)
+        self.assertEqual(obtenido, esperado)
+
+
+class PerfilSQLiteTests(TransactionTestCase):
+    # La BD de pruebas está en memoria (sin WAL): se usa un archivo temporal con las mismas OPTIONS
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'db.sqlite3')
+        with connection.schema_editor(collect_sql=True) as editor:
+            editor.create_model(EstudiantePeriodo)
+        conexion = self.conexion()
+        with conexion.cursor() as cursor:
+            for sql in editor.collected_sql:
+                cursor.execute(sql)
+        conexion.close()
+
+    def conexion(self):
+        base = connections['default']
+        return base.__class__({**base.settings_dict, 'NAME': self.ruta}, alias='perfil_sqlite')
+
+    def test_pragmas_en_cada_conexion(self):
+        conexion = self.conexion()
+        with conexion.cursor() as cursor:
+            valores = {}
+            for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {pragma}')
+                valores[pragma] = cursor.fetchone()[0]
+        conexion.close()
+
+        self.assertEqual(valores, {
+            'journal_mode': 'wal', 'synchronous': 1, 'mmap_size': 256 * 1024 ** 2,
+            'cache_size': -64 * 1024, 'busy_timeout': 5000,
+        })
+        self.assertGreater(settings.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+    def test_lecturas_no_esperan_a_una_carga_completa(self):
+        campos = ['id_estudiante', 'periodo', 'promedio_semestral', 'programa', 'ultima_prob_riesgo']
+        insertar = (
+            f"INSERT INTO core_estudianteperiodo ({', '.join(campos)}) VALUES ({', '.join(['%s'] * len(campos))})"
+        )
+        conexion = self.conexion()
+        with conexion.cursor() as cursor:
+            cursor.executemany(insertar, [(str(i), '2024B', 3.5, 'SISTEMAS', i / 5000) for i in range(5000)])
+        conexion.close()
+
+        # Consultas del dashboard y del listado de estudiantes en riesgo
+        consultas = [
+            EstudiantePeriodo.objects.filter(periodo='2024B').order_by('-ultima_prob_riesgo')[:50].query.sql_with_params(),
+            EstudiantePeriodo.objects.filter(periodo='2025A').values('programa').annotate(n=Count('id'))
+            .query.sql_with_params(),
+        ]
+        num_filas = 50000
+        escribiendo, fin = threading.Event(), threading.Event()
+        errores, vistos = [], set()
+
+        def cargar():
+            conexion = self.conexion()
+            try:
+                conexion.set_autocommit(False)
+                with conexion.cursor() as cursor:
+                    for inicio in range(0, num_filas, 1000):
+                        cursor.executemany(insertar, [
+                            (str(i), '2025A', 3.0, 'DERECHO', 0.5) for i in range(inicio, inicio + 1000)
+                        ])
+                        escribiendo.set()
+                conexion.commit()
+            except Exception as e:
+                errores.append(e)
+            finally:
+                escribiendo.set()
+                fin.set()
+                conexion.close()
+
+        def leer():
+            conexion = self.conexion()
+            escribiendo.wait()
+            while not fin.is_set():
+                try:
+                    with conexion.cursor() as cursor:
+                        for sql, params in consultas:
+                            cursor.execute(sql, params)
+                            filas = cursor.fetchall()
+                        vistos.add(sum(n for _, n in filas))
+                except Exception as e:
+                    errores.append(e)
+            conexion.close()
+
+        hilos = [threading.Thread(target=cargar), *(threading.Thread(target=leer) for _ in range(2))]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        # Ni la carga ni las lecturas fallan con "database is locked"
+        self.assertEqual([str(e) for e in errores], [])
+        # Las lecturas ven el periodo completo o nada, nunca una carga a medias
+        self.assertLessEqual(vistos, {0, num_filas})
+
+
+class CategoriasTests(TestCase):
+
+    def test_se_guardan_como_codigos_y_se_leen_como_texto(self):
+        guardar_estudiantes_en_bloque(generar_periodo_sintetico(30), '2025A')
+        EstudiantePeriodo.objects.create(id_estudiante='x', periodo='2025A', programa='MEDICINA', genero=None)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT typeof(programa) FROM core_estudianteperiodo")
+            self.assertEqual(cursor.fetchall(), [('integer',)])
+        programas = set(EstudiantePeriodo.objects.values_list('programa', flat=True))
+        self.assertEqual(programas, {'SISTEMAS', 'DERECHO', 'CONTADURIA', 'PSICOLOGIA', 'MEDICINA'})
+        self.assertEqual(EstudiantePeriodo.objects.get(id_estudiante='x').programa, 'MEDICINA')
+        self.assertEqual(EstudiantePeriodo.objects.filter(programa='MEDICINA').count(), 1)
+        self.assertEqual(EstudiantePeriodo.objects.filter(programa__icontains='medic').count(), 1)
+        self.assertFalse(EstudiantePeriodo.objects.filter(programa='NO EXISTE').exists())
+        self.assertTrue(EstudiantePeriodo.objects.filter(genero__isnull=True).exists())
+
+    def test_la_carga_registra_los_valores_en_bloque(self):
+        df = generar_periodo_sintetico(200)
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_estudiantes_en_bloque(df, '2025A')
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT') and 'core_categoria' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        # Un valor por campo y texto, aunque se repita en muchas filas
+        self.assertEqual(Categoria.objects.filter(campo='programa').count(), 4)
+
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_estudiantes_en_bloque(df, '2025B')
+        self.assertFalse([q for q in consultas.captured_queries if q['sql'].startswith('INSERT') and 'core_categoria' in q['sql']])
+
+    def test_columnas_enteras_de_un_reporte_se_guardan_como_texto(self):
+        reportes = datos_sinteticos.generar_reportes(60)
+        caracterizacion = reportes['caracterizacion']
+        caracterizacion['Estado Civil'] = np.arange(len(caracterizacion), dtype=np.int64) % 2 + 1
+        caracterizacion['Género'] = np.where(np.arange(len(caracterizacion)) % 2, 'F', 'M')
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = {}
+            for nombre, df in reportes.items():
+                rutas[nombre] = os.path.join(directorio, f"{nombre}.csv")
+                datos_sinteticos.escribir_reporte(df, rutas[nombre])
+            procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+
+        guardados = EstudiantePeriodo.objects.exclude(estado_civil=None)
+        self.assertTrue(guardados.exists())
+        # La carga trata la columna como numérica (unión y relleno de faltantes): '1.0', '2.0' y '0.0'
+        estados = set(guardados.values_list('estado_civil', flat=True))
+        self.assertEqual({float(estado) for estado in estados} - {0.0}, {1.0, 2.0})
+        self.assertEqual(set(guardados.values_list('genero', flat=True)) - {None}, {'F', 'M'})
+
+        guardar_estudiantes_en_bloque(pd.DataFrame({'id_estudiante': ['a', 'b'], 'estado_civil': [1, 2]}), '2025B')
+        self.assertEqual(
+            list(EstudiantePeriodo.objects.filter(periodo='2025B').order_by('id_estudiante').values_list('estado_civil', flat=True)),
+            ['1', '2'],
+        )
+
+    def test_filtro_del_admin_usa_la_tabla_de_categorias(self):
+        guardar_estudiantes_en_bloque(generar_periodo_sintetico(40), '2025A')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        url = reverse('admin:core_estudianteperiodo_changelist')
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url, {'programa': 'DERECHO', '_facets': 'True'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            respuesta.context['cl'].result_count, EstudiantePeriodo.objects.filter(programa='DERECHO').count(),
+        )
+        self.assertContains(respuesta, 'PSICOLOGIA (')
+        # Solo el filtro de periodo (un CharField) recorre los estudiantes para armar sus opciones
+        distintos = [q['sql'] for q in consultas.captured_queries if 'DISTINCT' in q['sql']]
+        self.assertEqual(len(distintos), 1)
+        self.assertIn('"periodo"', distintos[0])
+
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False)
+class DatosSinteticosTests(TestCase):
+
+    def test_misma_semilla_mismos_reportes(self):
+        primeros = datos_sinteticos.generar_reportes(300, semilla=3)
+        segundos = datos_sinteticos.generar_reportes(300, semilla=3)
+        for nombre, df in primeros.items():
+            pd.testing.assert_frame_equal(df, segundos[nombre])
+        self.assertFalse(primeros['notas'].equals(datos_sinteticos.generar_reportes(300, semilla=4)['notas']))
+
+    def test_la_carga_es_igual_desde_csv_y_xlsx(self):
+        campos = [f.name for f in EstudiantePeriodo._meta.concrete_fields if f.name != 'id']
+        obtenidos = {}
+        with tempfile.TemporaryDirectory() as directorio:
+            for formato in ('csv', 'xlsx'):
+                rutas = datos_sinteticos.escribir_reportes(directorio, 300, '2025A', formato=formato)
+                procesar_y_guardar_datos_de_periodo(rutas, '2025A')
+                obtenidos[formato] = list(EstudiantePeriodo.objects.order_by('id_estudiante').values_list(*campos))
+                EstudiantePeriodo.objects.all().delete()
+
+        self.assertEqual(obtenidos['csv'], obtenidos['xlsx'])
+        # Todos los estudiantes con notas, sin los graduados, egresados ni inactivos
+        estados = {fila[campos.index('est_alum')] for fila in obtenidos['csv']}
+        self.assertEqual(estados, {'ACTIVO', None})
+        self.assertEqual(len(obtenidos['csv']), 300)
+
+    def test_excel_rechaza_reportes_que_no_caben_en_una_hoja(self):
+        with tempfile.TemporaryDirectory() as directorio, mock.patch.object(datos_sinteticos, 'MAX_FILAS_EXCEL', 100):
+            with self.assertRaises(ValueError):
+                datos_sinteticos.escribir_reportes(directorio, 50, formato='xlsx')
+
+    def test_benchmark_guarda_los_resultados_en_json(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'resultados.json')
+            call_command('benchmark_sipde', '--estudiantes', '200', '--repeticiones', '1', '--salida', ruta, stdout=StringIO())
+            with open(ruta, encoding='utf-8') as archivo:
+                resultados = json.load(archivo)
+
+        medicion, = resultados['tamanos']
+        self.assertEqual(medicion['estudiantes'], 200)
+        self.assertIn('Guardando estudiantes', medicion['carga']['etapas'])
+        self.assertEqual(
+            set(medicion['vistas']),
+            {'dashboard', 'lista_primera_pagina', 'lista_pagina_media', 'lista_ultima_pagina', 'exportacion_csv', 'detalle', 'validacion'},
+        )
+        # El periodo temporal y el usuario de la prueba se eliminan al terminar
+        self.assertFalse(EstudiantePeriodo.objects.exists())
+        self.assertFalse(PeriodoResumen.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(CACHE_REPORTES_ACTIVA=False, INSTRUMENTACION_ACTIVA=True, INSTRUMENTACION_TRACEMALLOC=False)
+class InstrumentacionTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        instrumentacion.reiniciar()
+        self.addCleanup(instrumentacion.reiniciar)
+
+    def mediciones(self):
+        return {(m['etapa'], tuple(sorted(m['etiquetas'].items()))): m for m in instrumentacion.resumen()}
+
+    def test_la_carga_registra_cada_etapa_con_sus_filas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            procesar_y_guardar_datos_de_periodo(escribir_reportes(directorio, 30), '2025A')
+
+        mediciones = self.mediciones()
+        for etapa in ('union', 'tendencia', 'codificacion', 'comparacion', 'puntaje', 'guardado', 'resumen'):
+            self.assertEqual(mediciones[(f'carga.{etapa}', ())]['filas'], 30, etapa)
+        self.assertEqual(mediciones[('carga.agregacion', (('reporte', 'notas'),))]['filas'], 30)
+        self.assertEqual(mediciones[('carga.lectura', (('reporte', 'caracterizacion'),))]['filas'], 30)
+        self.assertIn(('carga.normalizacion', (('reporte', 'pagos'),)), mediciones)
+        total = mediciones[('carga.total', ())]
+        self.assertEqual(total['conteo'], 1)
+        self.assertGreater(total['memoria_pico'], 0)
+        self.assertGreaterEqual(total['segundos'], mediciones[('carga.guardado', ())]['segundos'])
+
+        texto = instrumentacion.exportar_prometheus()
+        self.assertIn('# TYPE sipde_etapa_segundos histogram', texto)
+        self.assertIn('sipde_etapa_segundos_count{etapa="carga.total"} 1', texto)
+        self.assertIn('sipde_etapa_segundos_bucket{etapa="carga.total",le="+Inf"} 1', texto)
+        self.assertIn('sipde_etapa_filas_total{etapa="carga.lectura",reporte="caracterizacion"} 30', texto)
+        self.assertIn('sipde_etapa_filas_total{etapa="carga.guardado"} 30', texto)
+
+    def test_desactivada_no_registra_nada(self):
+        with override_settings(INSTRUMENTACION_ACTIVA=False):
+            with instrumentacion.medir('prueba', 10) as medicion:
+                medicion.filas = 20
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(instrumentacion.resumen(), [])
+
+    def test_middleware_mide_cada_vista(self):
+        self.client.force_login(User.objects.create_user('usuario', password='clave'))
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('lista_estudiantes'))
+
+        mediciones = self.mediciones()
+        self.assertEqual(mediciones[('vista', (('estado', '200'), ('metodo', 'GET'), ('vista', 'dashboard')))]['conteo'], 2)
+        self.assertIn(('vista', (('estado', '200'), ('metodo', 'GET'), ('vista', 'lista_estudiantes'))), mediciones)
+
+    def test_tracemalloc_atribuye_el_pico_a_la_etapa_que_lo_causa(self):
+        with override_settings(INSTRUMENTACION_TRACEMALLOC=True):
+            with instrumentacion.medir('externa'):
+                with instrumentacion.medir('interna'):
+                    bloque = np.ones(2 * 1024 ** 2)  # 16 MB
+                    del bloque
+                with instrumentacion.medir('despues'):
+                    pass
+        tracemalloc.stop()
+
+        mediciones = self.mediciones()
+        self.assertGreater(mediciones[('interna', ())]['memoria_pico'], 16 * 1024 ** 2)
+        self.assertGreater(mediciones[('externa', ())]['memoria_pico'], 16 * 1024 ** 2)
+        self.assertLess(mediciones[('despues', ())]['memoria_pico'], 8 * 1024 ** 2)
+
+    def test_sin_modulo_resource_mide_con_tracemalloc(self):
+        # Como en Windows, donde no existe el módulo resource
+        with mock.patch.object(instrumentacion, 'resource', None):
+            with instrumentacion.medir('etapa'):
+                bloque = np.ones(2 * 1024 ** 2)  # 16 MB
+                del bloque
+        tracemalloc.stop()
+
+        self.assertGreater(self.mediciones()[('etapa', ())]['memoria_pico'], 16 * 1024 ** 2)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_endpoint_de_metricas(self):
+        instrumentacion.registrar('prueba', 0.2, 5, etiqueta='a"b')
+        url = reverse('metricas')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+
+        respuesta = self.client.get(url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = respuesta.content.decode()
+        self.assertIn('sipde_etapa_segundos_bucket{etapa="prueba",etiqueta="a\\"b",le="0.25"} 1', texto)
+        self.assertIn('sipde_etapa_segundos_bucket{etapa="prueba",etiqueta="a\\"b",le="0.1"} 0', texto)
+        self.assertIn('sipde_etapa_filas_total{etapa="prueba",etiqueta="a\\"b"} 5', texto)
+
+        self.client.force_login(User.objects.create_user('admin', password='clave', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class PresupuestoConsultasTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for periodo in ('2024B', '2025A'):
+            guardar_estudiantes_en_bloque(generar_periodo_sintetico(300), periodo)
+        # Riesgos calculados con el modelo vigente: el detalle los reutiliza sin escribir
+        reevaluar_predicciones_obsoletas()
+        self.client.force_login(User.objects.create_user('analista', password='clave'))
+
+    def test_consultas_constantes_por_vista(self):
+        # Las dos primeras consultas de cada petición son la sesión y el usuario
+        self.assertConsultas(self.client.get(reverse('dashboard')), 4)
+        self.assertConsultas(self.client.get(reverse('lista_estudiantes')), 5)
+        self.assertConsultas(self.client.get(reverse('lista_estudiantes'), {'antes': paginacion.ULTIMA}), 5)
+        # El historial de varios periodos y el estudiante actual salen de una sola consulta
+        self.assertConsultas(self.client.get(reverse('detalle_estudiante', args=['1000010'])), 3)
+
+    def test_la_exportacion_cuenta_las_consultas_del_streaming(self):
+        respuesta = self.client.get(reverse('lista_estudiantes'), {'export': 'csv'})
+        self.assertConsultas(respuesta, 4)
+
+    def test_exceder_el_presupuesto_falla(self):
+        with mock.patch.object(views.detalle_estudiante_view, 'presupuesto_consultas', 2):
+            with self.assertRaisesMessage(PresupuestoConsultasExcedido, 'hizo 3 consultas; su presupuesto es 2'):
+                self.client.get(reverse('detalle_estudiante', args=['1000010']))
+
+        # Fuera del modo estricto solo queda la advertencia en el log
+        with override_settings(CONSULTAS_PRESUPUESTO_ESTRICTO=False), \
+                mock.patch.object(views.detalle_estudiante_view, 'presupuesto_consultas', 2), \
+                self.assertLogs('core.consultas', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('detalle_estudiante', args=['1000010'])).status_code, 200)
+
+    def test_encabezados_en_modo_depuracion(self):
+        self.assertNotIn('X-Consultas-SQL', self.client.get(reverse('dashboard')))
+
+        with override_settings(DEBUG=True):
+            respuesta = self.client.get(reverse('detalle_estudiante', args=['1000010']))
+        self.assertEqual(respuesta['X-Consultas-SQL'], '3')
+        self.assertGreater(float(respuesta['X-Tiempo-SQL-ms']), 0)
+        self.assertIn('SELECT', respuesta['X-Consulta-SQL-Mas-Lenta'])
+        self.assertRegex(respuesta['Server-Timing'], r'^sql;dur=[\d.]+;desc="3 consultas"$')
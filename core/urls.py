@@ -9,9 +9,24 @@ urlpatterns = [
     # URL para la lista de todos los estudiantes
     path('estudiantes/', views.lista_estudiantes_view, name='lista_estudiantes'),
 
+    # Autocompletado de IDs (JSON, ordenado por riesgo); va antes del detalle para no confundirse con un ID
+    path('estudiantes/buscar/', views.buscar_estudiantes_api, name='buscar_estudiantes'),
+
     # URL para ver el detalle de un estudiante específico
     path('estudiantes/<str:id_estudiante>/', views.detalle_estudiante_view, name='detalle_estudiante'),
 
+    # Riesgo actual de un estudiante en JSON (vista asíncrona, apta para micro-batching)
+    path('estudiantes/<str:id_estudiante>/prediccion/', views.prediccion_estudiante_api, name='prediccion_estudiante_api'),
+
     #URL para el modulo de validacion experimental de la prediccion.
     path('validacion/', views.validacion_view, name='validacion'),
+
+    # Métricas del modelo en todos los periodos, calculadas con `python manage.py backtest`
+    path('validacion/backtest/', views.backtest_view, name='backtest'),
+
+    # Contadores de la caché de vistas por periodo (solo personal administrativo)
+    path('cache/estadisticas/', views.estadisticas_cache_view, name='estadisticas_cache'),
+
+    # Tiempos, filas y memoria pico por etapa y por vista, en formato Prometheus
+    path('metricas/', views.metricas_view, name='metricas'),
 ]
\ No newline at end of file
@@ -1,29 +1,86 @@
 # core/views.py
 
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.core.paginator import Paginator
 import json
+from datetime import timedelta
 from django.shortcuts import redirect
 
 from django.contrib.auth import logout
 
-import csv
-from django.http import HttpResponse
-from .models import EstudiantePeriodo
-import pandas as pd
+from django.core.paginator import Paginator
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+import uuid
+from .backtest import PROGRAMA_TOTAL
+from .models import EstudiantePeriodo, PeriodoResumen, ResultadoBacktest, ResultadoValidacion
+from . import cache_periodos
+from . import busqueda, exportacion, instrumentacion, paginacion
+from .cache_periodos import respuesta_condicional
+from .consultas import presupuesto_consultas
+from .lector_activos import leer_ids_activos
 from .predictions import PredictionService
-from .services import validar_predicciones_con_lista_activos
+from .services import actualizar_resumen_periodo, validar_predicciones_con_lista_activos
 
 def Logout(request):
     logout(request)
     return redirect('/login/')  # Redirige a la página de login después de cerrar sesión
 
 
+def _contexto_dashboard(periodo):
+    """Indicadores y gráficos del dashboard a partir del PeriodoResumen del periodo."""
+    resumen = PeriodoResumen.objects.filter(periodo=periodo).first()
+    if resumen is not None and resumen.umbral != settings.UMBRAL_PREDICCION:
+        # El umbral cambió desde que se calculó el resumen
+        resumen = actualizar_resumen_periodo(periodo)
+
+    if resumen is None or resumen.total_estudiantes == 0:
+        return {}
+
+    riesgo_bajo_count = resumen.total_estudiantes - resumen.riesgo_alto_count
+
+    chart_distribucion_data = {
+        'labels': ['En Riesgo', 'Sin Riesgo'],
+        'data': [resumen.riesgo_alto_count, riesgo_bajo_count],
+    }
+
+    semestres = sorted(resumen.riesgo_por_antiguedad, key=int)
+    chart_antiguedad_data = {
+        'labels': [f"Sem {sem}" for sem in semestres],
+        'data': [resumen.riesgo_por_antiguedad[sem] for sem in semestres],
+    }
+
+    programas = sorted(resumen.riesgo_por_programa.items(), key=lambda p: -p[1]['riesgo'])
+    chart_programa_data = {
+        'labels': [programa for programa, _ in programas],
+        'data': [conteos['riesgo'] for _, conteos in programas],
+    }
+
+    chart_deciles_data = {
+        'labels': [f"{i * 10}-{(i + 1) * 10}%" for i in range(10)],
+        'data': resumen.deciles_probabilidad,
+    }
+
+    return {
+        'total_estudiantes': resumen.total_estudiantes,
+        'riesgo_alto_count': resumen.riesgo_alto_count,
+        'tasa_retencion': f"{resumen.tasa_retencion:.1f}%",
+        'chart_distribucion_data': json.dumps(chart_distribucion_data),
+        'chart_antiguedad_data': json.dumps(chart_antiguedad_data),
+        'chart_programa_data': json.dumps(chart_programa_data),
+        'chart_deciles_data': json.dumps(chart_deciles_data),
+    }
+
+
+@presupuesto_consultas(4)
+@respuesta_condicional
 def dashboard_view(request):
-    # Obtener todos los periodos únicos que existen en la base de datos para el desplegable
-    periodos_disponibles = EstudiantePeriodo.objects.values_list('periodo', flat=True).distinct().order_by('-periodo')
+    # Los periodos y sus indicadores salen de PeriodoResumen, que se materializa al terminar
+    # cada carga; el costo de la vista no depende del número de estudiantes del periodo.
+    periodos_disponibles = cache_periodos.periodos_disponibles(request)
 
     # === INICIO DE LA LÓGICA DE SELECCIÓN DE PERIODO ===
     # 1. Determinar el periodo a mostrar
@@ -40,112 +97,37 @@ def dashboard_view(request):
         'tasa_retencion': "N/A",
         'chart_distribucion_data': json.dumps({'labels': [], 'data': []}),
         'chart_antiguedad_data': json.dumps({'labels': [], 'data': []}),
+        'chart_programa_data': json.dumps({'labels': [], 'data': []}),
+        'chart_deciles_data': json.dumps({'labels': [], 'data': []}),
     }
 
     if periodo_seleccionado:
-        # 2. Cargar los datos del periodo seleccionado
-        estudiantes = EstudiantePeriodo.objects.filter(periodo=periodo_seleccionado)
-        
-        total_estudiantes = estudiantes.count()
-
-        if total_estudiantes > 0:
-            riesgo_alto_count = estudiantes.filter(
-                ultima_prob_riesgo__gte=settings.UMBRAL_PREDICCION
-            ).count()
-            riesgo_bajo_count = total_estudiantes - riesgo_alto_count
-
-            chart_distribucion_data = {
-                'labels': ['En Riesgo', 'Sin Riesgo'],
-                'data': [riesgo_alto_count, riesgo_bajo_count],
-            }
-
-            antiguedad_data = {}
-            for est in estudiantes.filter(ultima_prob_riesgo__gte=settings.UMBRAL_PREDICCION, antiguedad_estudiante__isnull=False):
-                sem = f"Sem {int(est.antiguedad_estudiante)}"
-                antiguedad_data[sem] = antiguedad_data.get(sem, 0) + 1
-            
-            sorted_keys = sorted(antiguedad_data.keys(), key=lambda x: int(x.split(' ')[1]))
-            chart_antiguedad_data = {
-                'labels': sorted_keys,
-                'data': [antiguedad_data[key] for key in sorted_keys]
-            }
-
-            context.update({
-                'total_estudiantes': total_estudiantes,
-                'riesgo_alto_count': riesgo_alto_count,
-                'tasa_retencion': f"{(riesgo_bajo_count / total_estudiantes * 100):.1f}%",
-                'chart_distribucion_data': json.dumps(chart_distribucion_data),
-                'chart_antiguedad_data': json.dumps(chart_antiguedad_data),
-            })
-
-    return render(request, 'dashboard.html', context)
-
-    latest_period_obj = EstudiantePeriodo.objects.order_by('-periodo').first()
-    context = {
-        'periodo_analizado': "N/A",
-        'total_estudiantes': 0,
-        'riesgo_alto_count': 0,
-        'tasa_retencion': "N/A",
-        'chart_distribucion_data': json.dumps({'labels': [], 'data': []}),
-        'chart_antiguedad_data': json.dumps({'labels': [], 'data': []}),
-    }
-
-    if latest_period_obj:
-        latest_period = latest_period_obj.periodo
-        estudiantes = EstudiantePeriodo.objects.filter(periodo=latest_period)
-        
-        total_estudiantes = estudiantes.count()
-
-        if total_estudiantes > 0:
-            riesgo_alto_count = estudiantes.filter(
-                ultima_prob_riesgo__gte=settings.UMBRAL_PREDICCION
-            ).count()
-            riesgo_bajo_count = total_estudiantes - riesgo_alto_count
-
-            # Datos para gráfico de distribución
-            chart_distribucion_data = {
-                'labels': ['En Riesgo', 'Sin Riesgo'],
-                'data': [riesgo_alto_count, riesgo_bajo_count],
-            }
-
-            # Datos para gráfico de riesgo por antigüedad
-            antiguedad_data = {}
-            for est in estudiantes.filter(ultima_prob_riesgo__gte=settings.UMBRAL_PREDICCION, antiguedad_estudiante__isnull=False):
-                sem = f"Sem {int(est.antiguedad_estudiante)}"
-                antiguedad_data[sem] = antiguedad_data.get(sem, 0) + 1
-            
-            sorted_keys = sorted(antiguedad_data.keys(), key=lambda x: int(x.split(' ')[1]))
-            chart_antiguedad_data = {
-                'labels': sorted_keys,
-                'data': [antiguedad_data[key] for key in sorted_keys]
-            }
-
-            context.update({
-                'periodo_analizado': latest_period,
-                'total_estudiantes': total_estudiantes,
-                'riesgo_alto_count': riesgo_alto_count,
-                'tasa_retencion': f"{(riesgo_bajo_count / total_estudiantes * 100):.1f}%",
-                'chart_distribucion_data': json.dumps(chart_distribucion_data),
-                'chart_antiguedad_data': json.dumps(chart_antiguedad_data),
-            })
+        # 2. Indicadores del periodo seleccionado (en caché hasta la próxima carga del periodo)
+        context.update(cache_periodos.obtener_o_calcular(
+            'dashboard', periodo_seleccionado, (settings.UMBRAL_PREDICCION,),
+            lambda: _contexto_dashboard(periodo_seleccionado), request,
+        ))
 
     return render(request, 'dashboard.html', context)
 
 
+@presupuesto_consultas(6)
 @login_required
+@respuesta_condicional
 def lista_estudiantes_view(request):
-    latest_period_obj = EstudiantePeriodo.objects.order_by('-periodo').first()
+    periodos = cache_periodos.periodos_disponibles(request)
+    periodo_actual = periodos[0] if periodos else None
     
-    if latest_period_obj:
+    if periodo_actual:
         queryset = EstudiantePeriodo.objects.filter(
-            periodo=latest_period_obj.periodo
-        ).order_by('-ultima_prob_riesgo')
+            periodo=periodo_actual
+        ).order_by(*paginacion.ORDEN)
         
         query_id = request.GET.get('q')
         filtro_riesgo = request.GET.get('riesgo')
         
         if query_id:
-            queryset = queryset.filter(id_estudiante__icontains=query_id)
+            queryset = busqueda.filtrar(queryset, query_id, periodo_actual)
             
         if filtro_riesgo == 'con_riesgo':
             queryset = queryset.filter(ultima_prob_riesgo__gte=settings.UMBRAL_PREDICCION)
@@ -154,40 +136,42 @@ def lista_estudiantes_view(request):
     else:
         queryset = EstudiantePeriodo.objects.none()
 
-    # --- LÓGICA PARA EXPORTAR A CSV (CORREGIDA) ---
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="lista_estudiantes.csv"'
-        
-        writer = csv.writer(response)
-        
-        # 1. ENCABEZADOS CORREGIDOS: Personaliza las columnas que necesites.
-        writer.writerow(['ID Estudiante', 'Periodo', 'Prob. Riesgo', 'Programa', 'Promedio', 'Género'])
-        
-        # 2. CAMPOS DEL MODELO CORREGIDOS: Usa los nombres de campo reales.
-        # Asegúrate que el orden coincida con los encabezados de arriba.
-        estudiantes_a_exportar = queryset.values_list(
-            'id_estudiante', 
-            'periodo', 
-            'ultima_prob_riesgo', 
-            'programa', 
-            'promedio_semestral',
-            'genero'
+    # --- EXPORTACIÓN EN STREAMING (CSV, CSV.GZ, XLSX, PARQUET) ---
+    if request.GET.get('export'):
+        columnas = exportacion.columnas_solicitadas(request.GET.getlist('columnas'))
+        return exportacion.respuesta_exportacion(queryset, columnas, request.GET['export'])
+
+    # --- FIN EXPORTACIÓN ---
+
+    # Paginación por cursor sobre (riesgo, id): cada página cuesta lo mismo sin importar su
+    # profundidad. El total y las filas de cada página se guardan en caché por periodo.
+    filtros = (request.GET.get('q'), request.GET.get('riesgo'), settings.UMBRAL_PREDICCION)
+    despues = request.GET.get('despues')
+    antes = request.GET.get('antes')
+    if periodo_actual:
+        total_estudiantes = cache_periodos.obtener_o_calcular(
+            'lista_total', periodo_actual, filtros, queryset.count, request,
         )
+        page_obj = cache_periodos.obtener_o_calcular(
+            'lista_pagina', periodo_actual, filtros + (despues, antes),
+            lambda: paginacion.paginar_por_riesgo(queryset, despues=despues, antes=antes), request,
+        )
+    else:
+        total_estudiantes = 0
+        page_obj = paginacion.PaginaKeyset([], None, None)
 
-        for estudiante in estudiantes_a_exportar:
-            writer.writerow(estudiante)
-            
-        return response
-
-    # --- FIN LÓGICA CSV ---
-
-    paginator = Paginator(queryset, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Parámetros de los filtros, sin los cursores, para armar los enlaces de navegación
+    parametros_filtros = request.GET.copy()
+    for parametro in ('despues', 'antes', 'page'):
+        parametros_filtros.pop(parametro, None)
 
     context = {
         'page_obj': page_obj,
+        'total_estudiantes': total_estudiantes,
+        'cursor_ultima': paginacion.ULTIMA,
+        'parametros_filtros': parametros_filtros.urlencode(),
+        'columnas_exportables': exportacion.COLUMNAS_EXPORTABLES,
+        'columnas_por_defecto': exportacion.COLUMNAS_POR_DEFECTO,
         'umbral': settings.UMBRAL_PREDICCION,
         'filtros_aplicados': request.GET 
     }
@@ -195,16 +179,55 @@ def lista_estudiantes_view(request):
     return render(request, 'lista_estudiantes.html', context)
 
 
+@presupuesto_consultas(5)
+@login_required
+def buscar_estudiantes_api(request):
+    """
+    Autocompletado: estudiantes del periodo (por defecto el más reciente) cuyo ID contiene el
+    texto buscado, de mayor a menor riesgo. Con `programa=1` también busca en el programa.
+    """
+    texto = request.GET.get('q', '').strip()
+    if not texto:
+        return JsonResponse({'resultados': []})
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 10)), 50))
+    except ValueError:
+        limite = 10
+
+    periodo = request.GET.get('periodo')
+    if not periodo:
+        periodos = cache_periodos.periodos_disponibles(request)
+        periodo = periodos[0] if periodos else None
+
+    estudiantes = busqueda.filtrar(
+        EstudiantePeriodo.objects.filter(periodo=periodo), texto, periodo, incluir_programa=request.GET.get('programa') == '1',
+    ).order_by(*paginacion.ORDEN).values('id_estudiante', 'periodo', 'programa', 'ultima_prob_riesgo')[:limite]
+
+    return JsonResponse({'resultados': [
+        {
+            'id_estudiante': e['id_estudiante'],
+            'periodo': e['periodo'],
+            'programa': e['programa'],
+            'probabilidad': e['ultima_prob_riesgo'],
+            'en_riesgo': e['ultima_prob_riesgo'] is not None and e['ultima_prob_riesgo'] >= settings.UMBRAL_PREDICCION,
+        }
+        for e in estudiantes
+    ]})
+
+
+@presupuesto_consultas(5)
 @login_required
 def detalle_estudiante_view(request, id_estudiante):
-    historial_estudiante = EstudiantePeriodo.objects.filter(id_estudiante=id_estudiante).order_by('-periodo')
+    # Una sola consulta: el periodo más reciente es el primero del historial
+    historial_estudiante = list(EstudiantePeriodo.objects.filter(id_estudiante=id_estudiante).order_by('-periodo'))
     
-    if not historial_estudiante.exists():
+    if not historial_estudiante:
         return render(request, 'detalle_estudiante.html', {'error': 'Estudiante no encontrado.'})
 
-    estudiante_actual = historial_estudiante.first()
+    estudiante_actual = historial_estudiante[0]
     
-    prediccion = PredictionService.predict(id_estudiante, estudiante_actual.periodo)
+    # Reutiliza el riesgo guardado en la carga si el modelo y las features no cambiaron
+    prediccion = PredictionService.predict_estudiante(estudiante_actual)
 
     prob_porcentaje = 0
     umbral_porcentaje = 0
@@ -224,13 +247,104 @@ def detalle_estudiante_view(request, id_estudiante):
 
 
 
+@presupuesto_consultas(2)
+@staff_member_required
+def estadisticas_cache_view(request):
+    """Contadores de aciertos, fallos y respuestas 304 de la caché de vistas de este proceso."""
+    return JsonResponse(cache_periodos.ESTADISTICAS)
+
+
+@presupuesto_consultas(2)
+def metricas_view(request):
+    """
+    Métricas de instrumentación de este proceso en el formato de texto de Prometheus. Acceso
+    para el personal administrativo o con `Authorization: Bearer <METRICAS_TOKEN>`.
+    """
+    if not (request.user.is_staff or instrumentacion.token_valido(request)):
+        return HttpResponseForbidden()
+    return HttpResponse(instrumentacion.exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@presupuesto_consultas(5)
+@login_required
+async def prediccion_estudiante_api(request, id_estudiante):
+    """
+    Riesgo actual de un estudiante en JSON. Es una vista asíncrona para que, bajo ASGI, las
+    peticiones concurrentes esperen la predicción sin ocupar hilos y el micro-batching pueda
+    agruparlas; bajo WSGI Django la ejecuta igual que una vista síncrona.
+    """
+    estudiante_actual = await EstudiantePeriodo.objects.filter(id_estudiante=id_estudiante).order_by('-periodo').afirst()
+    if estudiante_actual is None:
+        return JsonResponse({'error': 'Estudiante no encontrado.'}, status=404)
+
+    prediccion = await PredictionService.apredict_estudiante(estudiante_actual)
+    if prediccion.get('error'):
+        return JsonResponse(prediccion, status=503)
+    prediccion['periodo'] = estudiante_actual.periodo
+    return JsonResponse(prediccion)
+
+
+TAMANO_PAGINA_VALIDACION = 50
+_GRUPOS_VALIDACION = [
+    # (clave, título, color del badge)
+    ('falsos_negativos', 'Falsos Negativos (No predichos, pero desertaron)', 'bg-danger'),
+    ('falsos_positivos', 'Falsos Positivos (Predichos, pero NO desertaron)', 'bg-warning text-dark'),
+    ('verdaderos_positivos', 'Verdaderos Positivos (Predichos y desertaron)', 'bg-success'),
+]
+
+
+def _vencimiento_validacion():
+    """Fecha de creación de los resultados de validación más antiguos que siguen vigentes."""
+    return timezone.now() - timedelta(seconds=getattr(settings, 'CACHE_VISTAS_TIMEOUT', 3600))
+
+
+def _grupos_validacion(request, resultados):
+    """
+    Una página de (ID, probabilidad) por cada grupo de la matriz de confusión. Cada grupo se
+    pagina con su propio parámetro (`pagina_<grupo>`) sobre la lista ya calculada.
+    """
+    grupos = []
+    for clave, titulo, badge in _GRUPOS_VALIDACION:
+        parametro = f'pagina_{clave}'
+        pagina = Paginator(resultados[clave], TAMANO_PAGINA_VALIDACION).get_page(request.GET.get(parametro))
+
+        def url_pagina(numero, parametro=parametro):
+            parametros = request.GET.copy()
+            parametros[parametro] = numero
+            return f"?{parametros.urlencode()}"
+
+        grupos.append({
+            'clave': clave,
+            'titulo': titulo,
+            'badge': badge,
+            'total': pagina.paginator.count,
+            'pagina': pagina,
+            'filas': [
+                {'id_estudiante': id_estudiante, 'riesgo_porcentaje': None if prob is None else prob * 100}
+                for id_estudiante, prob in pagina
+            ],
+            'url_anterior': url_pagina(pagina.previous_page_number()) if pagina.has_previous() else None,
+            'url_siguiente': url_pagina(pagina.next_page_number()) if pagina.has_next() else None,
+        })
+    return grupos
+
+
+@presupuesto_consultas(5)
 @login_required
 def validacion_view(request):
-    periodos_disponibles = EstudiantePeriodo.objects.values_list('periodo', flat=True).distinct().order_by('-periodo')
-    
-    context = {
-        'periodos_disponibles': periodos_disponibles,
-    }
+    context = {}
+
+    # Resultado guardado de una validación anterior (GET tras el POST, o al cambiar de página)
+    token = request.GET.get('resultado')
+    if request.method == 'GET' and token:
+        guardado = ResultadoValidacion.objects.filter(token=token, fecha_creacion__gte=_vencimiento_validacion()).first()
+        if guardado is None:
+            context['error'] = "Los resultados de la validación expiraron. Vuelve a subir el archivo."
+        else:
+            resultados = guardado.resultados
+            context['resultados'] = resultados
+            context['grupos_validacion'] = _grupos_validacion(request, resultados)
+            context['barrido_json'] = json.dumps(resultados.get('barrido', []))
 
     if request.method == 'POST':
         periodo_prediccion = request.POST.get('periodo_prediccion')
@@ -238,69 +352,56 @@ def validacion_view(request):
 
         if periodo_prediccion and archivo_activos:
             try:
-                # === INICIO DE LA SOLUCIÓN DEFINITIVA PARA LECTURA DE ARCHIVOS ===
-                archivo_nombre = archivo_activos.name
-                df_activos = None # Inicializar el DataFrame como Nulo
-
-                #carga html o csv
-                if archivo_nombre.lower().endswith('.csv'):
-
-                    # Lista de codificaciones comunes a probar en orden de probabilidad
-                    encodings_to_try = ['cp1252', 'latin1', 'utf-8']
-                    
-                    for encoding in encodings_to_try:
-                        try:
-                            print(f"Intentando leer CSV con codificación: '{encoding}'...")
-                            # Es crucial resetear el puntero del archivo en cada intento
-                            archivo_activos.seek(0)
-                            df_activos = pd.read_csv(archivo_activos, sep=';', encoding=encoding, low_memory=False)
-                            print(f"¡Éxito! Archivo leído correctamente con '{encoding}'.")
-                            break # Si la lectura es exitosa, salimos del bucle
-                        except UnicodeDecodeError:
-                            print(f"Falló la lectura con '{encoding}'. Probando siguiente...")
-                            continue # Si falla, continuamos con la siguiente codificación
-
-                    # Si después de todos los intentos el DataFrame sigue siendo Nulo, lanzamos un error
-                    if df_activos is None:
-                        raise ValueError("No se pudo decodificar el archivo con las codificaciones comunes (cp1252, latin1, utf-8).")
-
-                elif archivo_nombre.lower().endswith(('.xls', '.xlsx')):
-                    df_activos = pd.read_excel(archivo_activos)
-                else:
-                    raise ValueError("Formato de archivo no soportado. Por favor, sube un archivo .csv o .xlsx.")
-                # === FIN DE LA SOLUCIÓN DEFINITIVA ===
-                
-                # Estandarizar nombres de columna para consistencia
-                df_activos.columns = df_activos.columns.str.lower().str.strip()
-                if 'est_alum' in df_activos.columns:
-                    df_activos.rename(columns={'est_alum': 'est_alum'}, inplace=True)
-                if 'cedula' not in df_activos.columns:
-                     raise ValueError("La columna 'cedula' no se encontró en el archivo.")
-
-                # Filtrar por estado del alumno
-                ids_activos = set()
-                if 'est_alum' in df_activos.columns:
-                    estados_continuidad = ['ACTIVO', 'EGRESADO', 'GRADUADO']
-                    df_activos['est_alum'] = df_activos['est_alum'].astype(str).str.strip().str.upper()
-                    df_filtrado = df_activos[df_activos['est_alum'].isin(estados_continuidad)]
-                    ids_activos = set(df_filtrado['cedula'].astype(str).str.strip())
-                    print(f"Se encontraron {len(ids_activos)} estudiantes con estado de continuidad en el archivo subido.")
-                else:
-                    raise ValueError("La columna 'est_alum' es necesaria para la validación y no se encontró en el archivo.")
+                # Solo se leen 'cedula' y 'est_alum', en una pasada y sin copiar el archivo a memoria
+                ids_activos = leer_ids_activos(archivo_activos)
 
                 # Llamar al servicio de validación con la lista de IDs filtrada
                 resultados_validacion = validar_predicciones_con_lista_activos(periodo_prediccion, ids_activos)
-                context['resultados'] = resultados_validacion
 
-                # Línea de diagnóstico adicional
-                print("\n--- RESULTADOS DE LA VALIDACIÓN ---")
-                print({k: v for k, v in resultados_validacion.items() if not isinstance(v, list)})
-                print("---------------------------------\n")
+                # Los resultados se guardan para paginar las listas de IDs sin volver a subir el
+                # archivo; de paso se eliminan los vencidos
+                ResultadoValidacion.objects.filter(fecha_creacion__lt=_vencimiento_validacion()).delete()
+                guardado = ResultadoValidacion.objects.create(
+                    token=uuid.uuid4().hex, periodo=periodo_prediccion, resultados=resultados_validacion,
+                )
+                return redirect(f"{reverse('validacion')}?resultado={guardado.token}")
 
             except Exception as e:
                 context['error'] = f"Error al procesar el archivo: {e}."
         else:
             context['error'] = "Por favor, selecciona un periodo y sube el archivo de activos."
 
+    context['periodos_disponibles'] = cache_periodos.periodos_disponibles(request)
     return render(request, 'validacion.html', context)
 
+
+@presupuesto_consultas(4)
+@login_required
+def backtest_view(request):
+    """
+    Resultados guardados del backtest (`python manage.py backtest`): evolución de las métricas
+    por periodo y, para el periodo elegido, el detalle por programa.
+    """
+    totales = list(ResultadoBacktest.objects.filter(programa=PROGRAMA_TOTAL).order_by('periodo'))
+    periodos = [fila.periodo for fila in totales]
+    periodo = request.GET.get('periodo')
+    if periodo not in periodos:
+        periodo = periodos[-1] if periodos else None
+
+    por_programa = []
+    if periodo:
+        por_programa = ResultadoBacktest.objects.filter(periodo=periodo).exclude(programa=PROGRAMA_TOTAL).order_by('-f1')
+
+    chart_backtest_data = {
+        'labels': periodos,
+        'f1': [fila.f1 for fila in totales],
+        'roc_auc': [fila.roc_auc for fila in totales],
+        'pr_auc': [fila.pr_auc for fila in totales],
+    }
+    context = {
+        'totales': totales,
+        'periodo_seleccionado': periodo,
+        'por_programa': por_programa,
+        'chart_backtest_data': json.dumps(chart_backtest_data),
+    }
+    return render(request, 'backtest.html', context)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sipde_project.settings')
 
 application = get_asgi_application()
+
+# Precarga del modelo para que ninguna petición pague el costo de cargarlo
+from core.predictions import PredictionService
+
+PredictionService.precargar()
@@ -41,6 +41,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que el tiempo de cada vista incluya el de los demás middleware
+    'core.instrumentacion.MetricasMiddleware',
+    # Antes de sesión y autenticación, para contar también sus consultas
+    'core.consultas.ConsultasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,10 +77,34 @@ WSGI_APPLICATION = 'sipde_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil de SQLite para producción. Con WAL las lecturas (dashboard, listados) leen la última
+# versión confirmada mientras una carga escribe, en lugar de bloquearse hasta que termine; con
+# WAL, synchronous=NORMAL no puede corromper la base (un corte de energía puede perder solo las
+# últimas transacciones confirmadas). mmap_size y cache_size (en KiB si es negativo) mantienen
+# en memoria las páginas más leídas, y busy_timeout (ms) hace que una escritura que encuentra
+# otra en curso espere en lugar de fallar con "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 ** 2,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Conexiones persistentes: los PRAGMA se aplican una vez por conexión y no en cada petición
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(f'PRAGMA {nombre} = {valor}' for nombre, valor in SQLITE_PRAGMAS.items()),
+            # Las transacciones toman el bloqueo de escritura al empezar: si otra escritura está en
+            # curso esperan (busy_timeout) en lugar de fallar al intentar escribir a mitad de camino
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -128,3 +156,75 @@ LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = '/login/'
 
 UMBRAL_PREDICCION = 0.515
+
+# Registros por lote al guardar un periodo: se convierten a objetos y se envían a la BD de a
+# este número, y es el máximo de filas por sentencia INSERT. Django divide además cada
+# sentencia según el límite de parámetros del motor: en SQLite (999 parámetros) son unas 35
+# filas de EstudiantePeriodo por INSERT, así que ahí el valor solo acota la memoria del lote
+TAMANO_LOTE_CARGA = 1000
+
+# Lectura del reporte de notas en bloques acotados (memoria constante) y filas por bloque
+LECTURA_NOTAS_POR_BLOQUES = True
+TAMANO_BLOQUE_NOTAS = 100000
+
+# Caché por contenido de los reportes normalizados (ver core/cache_reportes.py)
+CACHE_REPORTES_ACTIVA = True
+CACHE_REPORTES_DIR = BASE_DIR / 'cache_reportes'
+CACHE_REPORTES_MAX_BYTES = 1024 ** 3
+
+# Registro de modelos (ver core/modelos.py): carpeta, precarga al iniciar el servidor o el
+# worker de lotes (no en las demás órdenes de manage.py), cada cuántos segundos se revisa si se
+# promovió otra versión y si se puntúa en sombra la candidata
+MODELOS_DIR = BASE_DIR / 'ml_models'
+PRECARGAR_MODELO = True
+INTERVALO_VERIFICACION_MODELO = 5
+PUNTUACION_SOMBRA = True
+
+# Micro-batching de predicciones en línea (ver core/microbatch.py): ventana máxima de espera
+# en milisegundos y filas máximas por llamada al modelo
+MICROBATCH_ACTIVO = False
+MICROBATCH_ESPERA_MAXIMA_MS = 0
+MICROBATCH_TAMANO_MAXIMO = 64
+
+# Caché de vistas por periodo (ver core/cache_periodos.py). La invalidación se basa en la
+# versión de datos guardada en la BD, así que es correcta con cualquier backend; uno compartido
+# (Redis, Memcached) evita además que cada worker tenga que recalcular sus propias entradas.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sipde',
+    }
+}
+CACHE_VISTAS_ACTIVA = True
+CACHE_VISTAS_TIMEOUT = 3600
+
+# Instrumentación (ver core/instrumentacion.py): tiempo, filas y memoria pico de cada etapa de
+# la carga, del modelo y de cada vista, en el log y en /metricas/ (formato Prometheus). Con
+# INSTRUMENTACION_TRACEMALLOC la memoria pico de cada etapa es exacta, pero la carga es más
+# lenta. METRICAS_TOKEN permite a Prometheus leer /metricas/ sin sesión (Bearer). Las métricas
+# se acumulan con cualquier nivel de log: con 'INFO' cada etapa de la carga y del modelo
+# también se escribe en la consola, con 'DEBUG' además cada petición y con 'WARNING' ninguna.
+INSTRUMENTACION_ACTIVA = True
+INSTRUMENTACION_TRACEMALLOC = False
+INSTRUMENTACION_NIVEL_LOG = 'INFO'
+METRICAS_TOKEN = None
+
+# Consultas SQL por petición (ver core/consultas.py): encabezados con el conteo, el tiempo y la
+# consulta más lenta (None: solo con DEBUG), y si exceder el presupuesto de consultas de una
+# vista lanza una excepción en lugar de solo registrar una advertencia (lo usan las pruebas)
+CONSULTAS_ENCABEZADOS = None
+CONSULTAS_PRESUPUESTO_ESTRICTO = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Las etapas de la carga y del modelo se registran en INFO; cada vista, en DEBUG
+        'core.instrumentacion': {'handlers': ['consola'], 'level': INSTRUMENTACION_NIVEL_LOG, 'propagate': False},
+        # Las vistas que exceden su presupuesto de consultas (WARNING); el detalle de cada petición va en DEBUG
+        'core.consultas': {'handlers': ['consola'], 'level': 'WARNING', 'propagate': False},
+    },
+}
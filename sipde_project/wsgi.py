@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sipde_project.settings')
 
 application = get_wsgi_application()
+
+# Precarga del modelo para que ninguna petición pague el costo de cargarlo
+from core.predictions import PredictionService
+
+PredictionService.precargar()